@@ -0,0 +1,3 @@
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("gui", "journal", "recovery", "structures"))
\ No newline at end of file
@@ -0,0 +1,471 @@
+
+
+from tkinter import filedialog, ttk
+import tkinter as tk
+import time
+
+from src import common
+from src.common import virtual_list
+from src.EXT import journal
+from src.EXT import recovery
+from src.EXT import structures
+
+
+# The time in milliseconds between checks for new results from a background scan.
+SCAN_POLL_INTERVAL = 100
+
+# The orders in which the deleted inodes can be listed: the key function of an inode tuple to sort by, and whether to reverse.
+# The deletion time is the last element of the inode tuples of both journaling and non-journaling filesystems.
+SORT_ORDERS = {
+    "deletion time": (lambda inode: inode[-1], True),
+    "scan order": (None, False)}
+
+
+class App:
+
+    """
+    Initializes all GUI aspects
+    and contains handlers for GUI events
+
+    Attributes
+    ----------
+    master : tk.Tk
+        The master window for the GUI.
+    numRecovered : int
+        A running total of all successfully recovered files.
+    recoveryExecutor : recovery_executor.RecoveryExecutor
+        Recovers the selected files in parallel.
+    transactions : list[journal.Transaction]
+        A list of all transactions in the journal.
+        This is only used if the selected disk is a journaling filesystem.
+    blockIndex : dict[int, list[tuple]]
+        Maps filesystem block numbers to their copies in the journal, for transactions.
+        This is only used if the selected disk is a journaling filesystem.
+    currentDisk : disks.Disk
+        Contains the disk object corresponding to the disk currently in use.
+    outputDirectory : str
+        Contains the path for the selected output directory.
+    scan : background_scan.BackgroundScan
+        The scan for deleted inodes in progress. None if no scan is in progress.
+
+    topFrame : tk.Frame
+        The frame in which all GUI widgets reside.
+    fileList : virtual_list.VirtualList
+        Lists the deleted inodes found within the currently selected disk. The user can select files from this list to recover.
+
+        if the currently selected disk is a journaling filesystem (ext3, ext4) then its items are tuples
+        of the form (block num of inode table, offset within inode table, deletion time).
+
+        if it is not a journaling filesystem (ext2) then
+        its items are tuples of the form (inode num, inode deletion time).
+
+        Each row shows an identifier containing the date and time of deletion.
+    outputDirectoryLabel : tk.Label
+        A label which displays the current selected output directory path.
+    recoveredLabel : tk.Label
+        A label which displays numRecovered.
+    progressBar : ttk.Progressbar
+        Shows the progress of the scan for deleted inodes.
+    scanLabel : tk.Label
+        A label which displays the state of the scan and the number of deleted inodes found.
+    cancelButton : tk.Button
+        Stops the scan. The deleted inodes found so far can still be recovered.
+    filterEntry : tk.Entry
+        Text to filter the identifiers in fileList by (for example a date), applied when Return is pressed.
+
+    Methods
+    -------
+    getDeletedFiles(disk)
+        When the selected disk changes, this function is called.
+        Updates currentDisk, and starts a scan of the disk for deleted inodes in the background.
+    iterJournaledScan(disk)
+        Reads the journal of a journaling filesystem, then yields the deleted inodes it contains.
+        Is run by the background scan.
+    pollScan(scan)
+        Called from the event loop while a scan is in progress.
+        Adds the deleted inodes found since the last call to fileList.
+    cancelScan()
+        Called when cancelButton is pushed. Stops the scan in progress.
+    getFileName(inode)
+        Gets the identifier shown for a deleted inode.
+    sortFiles(sortOrder)
+        Called when a sort order is selected. Sorts fileList.
+    getOutputDirectory()
+        Prompts the user to select an output directory for recovered files.
+        Updates outputDirectory
+    recover()
+        Called when recoveryButton is pushed.
+        Recovers the selected files to outputDirectory.
+        updates numRecovered and numRecoveredLabel
+    selectAll()
+        Called when selectAll button is pushed.
+        When there are no files selected, this function selects all files.
+        When there are files selected, this function deselects all files.
+    """
+
+
+    def __init__(self, master: tk.Tk):
+
+        """
+        Parameters
+        ----------
+        master : tk.Tk
+            The master window for the GUI
+        """
+
+        master.title("FDRecover")
+
+        # initialize attributes
+        self.master: tk.Tk = master
+        self.numRecovered: int = 0
+        self.recoveryExecutor: common.recovery_executor.RecoveryExecutor = common.recovery_executor.RecoveryExecutor()
+        self.transactions: list[journal.journal.Transaction] = None
+        self.blockIndex: dict = None
+
+        allDisks: list[structures.disks.Disk] = structures.disks.getDisks()
+        self.currentDisk: structures.disks.Disk = structures.disks.Disk
+
+        self.outputDirectory: str = ""
+
+        self.scan: common.background_scan.BackgroundScan = None
+
+        self.topFrame: tk.Frame = tk.Frame(master=master, height=50)
+        self.topFrame.columnconfigure([0, 1, 2], weight=1)
+        self.topFrame.rowconfigure([0, 1, 2, 3, 4], weight=1)
+        self.topFrame.pack(fill=tk.BOTH, side=tk.TOP, expand=True)
+
+        # Disk selector
+        diskVar: tk.StringVar = tk.StringVar(master, "select disk")
+        diskOptions: tk.OptionMenu = tk.OptionMenu(self.topFrame, diskVar, *allDisks, command=self.getDeletedFiles)
+        diskOptions.grid(column=0, row=0, columnspan=2, sticky="w")
+
+        labelSelect: tk.Label = tk.Label(master=self.topFrame, anchor=tk.CENTER, text="Select Files to Recover:")
+        labelSelect.grid(column=1, row=0, sticky="nsew")
+
+        # Shows the deleted inodes, most recently deleted first. Only the rows in view are drawn, so it can hold millions of inodes.
+        self.fileList: virtual_list.VirtualList = virtual_list.VirtualList(self.topFrame, height=30)
+        self.fileList.grid(column=0, row=1, columnspan=3, sticky="nesw")
+        self.sortFiles("deletion time")
+
+        selectAllButton: tk.Button = tk.Button(master=self.topFrame, text="Select/Deselect All", command=self.selectAll)
+        selectAllButton.grid(column=2, row=0, sticky="e")
+
+        # When pressed, user can select output directory.
+        getOutputDirectoryButton: tk.Button = tk.Button(master=self.topFrame, text="Select output directory", command=self.getOutputDirectory)
+        getOutputDirectoryButton.grid(column=0, row=2, sticky="w")
+
+        # Displays current output directory.
+        self.outputDirectoryLabel: tk.Label = tk.Label(master=self.topFrame, text="Output dir: ")
+        self.outputDirectoryLabel.grid(column=1, row=2, sticky = "w")
+
+        recoveryButton: tk.Button = tk.Button(master=self.topFrame, text="Recover", command=self.recover)
+        recoveryButton.grid(column=2, row=2, sticky="e")
+
+        # Displays the number of recovered files.
+        self.recoveredLabel: tk.Label = tk.Label(master=self.topFrame, text=f"Recovered {self.numRecovered} files")
+        self.recoveredLabel.grid(column=1, row=3, sticky="w")
+
+        # Shows the progress of the scan for deleted inodes.
+        self.progressBar: ttk.Progressbar = ttk.Progressbar(master=self.topFrame, orient=tk.HORIZONTAL, mode="determinate")
+        self.progressBar.grid(column=0, row=3, sticky="ew")
+
+        self.scanLabel: tk.Label = tk.Label(master=self.topFrame, text="")
+        self.scanLabel.grid(column=0, row=4, sticky="w")
+
+        # Stops the scan for deleted inodes.
+        self.cancelButton: tk.Button = tk.Button(master=self.topFrame, text="Cancel scan", command=self.cancelScan, state=tk.DISABLED)
+        self.cancelButton.grid(column=2, row=3, sticky="e")
+
+        # Sorts and filters the deleted inodes.
+        viewFrame: tk.Frame = tk.Frame(master=self.topFrame)
+        viewFrame.grid(column=1, row=4, columnspan=2, sticky="e")
+
+        sortVar: tk.StringVar = tk.StringVar(master, "deletion time")
+        sortOptions: tk.OptionMenu = tk.OptionMenu(viewFrame, sortVar, *SORT_ORDERS, command=self.sortFiles)
+        tk.Label(master=viewFrame, text="Sort by:").pack(side=tk.LEFT)
+        sortOptions.pack(side=tk.LEFT)
+
+        self.filterEntry: tk.Entry = tk.Entry(master=viewFrame)
+        self.filterEntry.bind("<Return>", lambda event: self.fileList.filterBy(self.filterEntry.get()))
+        tk.Label(master=viewFrame, text="Filter:").pack(side=tk.LEFT)
+        self.filterEntry.pack(side=tk.LEFT)
+
+
+    def getDeletedFiles(self, disk: structures.disks.Disk):
+
+        """
+        When the selected disk changes, this function is called.
+        Updates currentDisk, and starts a scan of the disk for deleted inodes in the background.
+        The deleted inodes are added to fileList by pollScan as they are found.
+
+        Parameters
+        ----------
+        disk : disks.Disk
+            The disk that has just been selected
+
+        returns
+        -------
+        Explicit:
+        None
+
+        Implicit:
+        scan : background_scan.BackgroundScan
+            Cancels any previous scan, and updates this value to the new scan.
+        fileList : virtual_list.VirtualList
+            Empties this list, until pollScan adds the deleted inodes found.
+        """
+
+        if self.currentDisk != disk:
+            self.currentDisk = disk
+
+            # The scan of the previously selected disk is no longer needed.
+            self.cancelScan()
+
+            self.fileList.clear()
+
+            # ext4 and ext3 have journals, which are used for recovery
+            if disk.diskType == "ext3" or disk.diskType == "ext4":
+                self.scan = common.background_scan.BackgroundScan(self.iterJournaledScan, disk)
+
+            # ext2 does not have a journal
+            elif disk.diskType == "ext2":
+                fileRecovery: recovery.recovery_no_journal.FileRecoveryNoJournal = recovery.recovery_no_journal.FileRecoveryNoJournal()
+                self.scan = common.background_scan.BackgroundScan(fileRecovery.iterDeletedInodeBatches, disk, True, True)
+
+            self.cancelButton.config(state=tk.NORMAL)
+            self.scanLabel.config(text="Scanning...")
+            self.master.after(SCAN_POLL_INTERVAL, self.pollScan, self.scan)
+
+        else:
+            return
+
+
+    def iterJournaledScan(self, disk: structures.disks.Disk):
+
+        """
+        Reads the journal of a journaling filesystem (ext3, ext4), yielding the deleted inodes it contains as they are found.
+        Is run by the background scan, on its worker thread.
+
+        Parameters
+        ----------
+        disk : disks.Disk
+            The disk to scan.
+
+        Returns
+        -------
+        Explicit:
+        batches : iterator[tuple]
+            Tuples (deleted inodes, fraction), see recovery_journaled.FileRecoveryJournaled.iterJournalInodeBatches.
+
+        Implicit:
+        transactions : list[journal.Transaction]
+            Set to the transactions read from the journal, which are added to it as the journal is read.
+        blockIndex : dict[int, list[tuple]]
+            Set to the index of the copies of blocks in transactions, which is built as the journal is read.
+        """
+
+        fileRecovery: recovery.recovery_journaled.FileRecoveryJournaled = recovery.recovery_journaled.FileRecoveryJournaled()
+
+        # Another disk may have been selected before the scan started.
+        if self.currentDisk is not disk:
+            return
+
+        self.transactions = []
+        self.blockIndex = {}
+
+        yield from fileRecovery.iterJournalInodeBatches(disk, self.transactions, self.blockIndex, useCache=True)
+
+
+    def pollScan(self, scan: common.background_scan.BackgroundScan):
+
+        """
+        Called from the event loop while a scan is in progress.
+        Adds the deleted inodes found since the last call to fileList, and updates progressBar and scanLabel.
+        Inodes are added to the end of fileList as they are found, and are sorted once the scan is complete.
+
+        Parameters
+        ----------
+        scan : background_scan.BackgroundScan
+            The scan to check. If it has been replaced by another scan, nothing is done.
+
+        Returns
+        -------
+        Explicit:
+        None
+
+        Implicit:
+        fileList : virtual_list.VirtualList
+            Adds the deleted inodes found, and sorts the list once the scan is complete.
+        Schedules another call while the scan is running.
+        """
+
+        if scan is not self.scan:
+            return
+
+        results = scan.poll()
+        if len(results) > 0:
+            self.fileList.appendItems(results, [self.getFileName(inode) for inode in results])
+
+        if scan.state == "running":
+            if scan.fraction is None:
+                self.progressBar.config(mode="indeterminate")
+                self.progressBar.step()
+            else:
+                self.progressBar.config(mode="determinate", value=scan.fraction * 100)
+            self.scanLabel.config(text=f"Scanning... found {len(self.fileList.items)} files")
+            self.master.after(SCAN_POLL_INTERVAL, self.pollScan, scan)
+            return
+
+        self.scan = None
+        self.cancelButton.config(state=tk.DISABLED)
+        self.progressBar.config(mode="determinate", value=100 if scan.state == "done" else 0)
+        if self.fileList.sortKey is not None:
+            self.fileList.updateView()
+        if scan.state == "done":
+            self.scanLabel.config(text=f"Found {len(self.fileList.items)} files")
+        elif scan.state == "cancelled":
+            self.scanLabel.config(text=f"Scan cancelled, found {len(self.fileList.items)} files")
+        else:
+            self.scanLabel.config(text=f"Scan failed: {scan.error}")
+
+
+    def cancelScan(self):
+
+        """
+        Called when cancelButton is pushed, and when another disk is selected.
+        Stops the scan in progress, if any. The deleted inodes found so far are kept.
+        """
+
+        if self.scan is not None:
+            self.scan.cancel()
+
+
+    def getFileName(self, inode: tuple) -> str:
+
+        """
+        Gets the identifier shown for a deleted inode, which contains the date and time of deletion.
+
+        Parameters
+        ----------
+        inode : tuple
+            An item of fileList.
+
+        Returns
+        -------
+        fileName : str
+            The identifier.
+        """
+
+        if self.currentDisk.diskType == "ext3" or self.currentDisk.diskType == "ext4":
+            return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(inode[2])) + f"_inode{inode[0]}_{inode[1]}"
+        else:
+            return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(inode[1])) + f"_inode{inode[0]}"
+
+
+    def sortFiles(self, sortOrder: str):
+
+        """
+        Called when a sort order is selected. Sorts fileList.
+        Selected inodes stay selected.
+
+        Parameters
+        ----------
+        sortOrder : str
+            A key of SORT_ORDERS.
+        """
+
+        sortKey, reverse = SORT_ORDERS[sortOrder]
+        self.fileList.sortBy(sortKey, reverse)
+
+
+    def getOutputDirectory(self):
+
+        """
+        Prompts the user to select an output directory for recovered files.
+        Updates outputDirectory
+
+        Returns
+        -------
+        Explicit:
+        None
+
+        Implicit:
+        outputDirectory : str
+            Gets the output directory from the user and updates it
+        """
+
+        self.outputDirectory = tk.filedialog.askdirectory(title="Select Output Directory", initialdir="/home")
+        self.outputDirectoryLabel.config(text=f"Output dir: {self.outputDirectory}")
+
+    def selectAll(self):
+
+        """
+        Called when selectAll button is pushed.
+        When there are no files selected, this function selects all files shown.
+        When there are files selected, this function deselects all files.
+
+        Returns
+        -------
+        Explicit:
+        None
+
+        Implicit:
+        fileList : virtual_list.VirtualList
+            Either selects all items shown, or deselects all items.
+        """
+
+        self.fileList.selectAll()
+
+
+    def recover(self):
+
+        """
+        Called when recoveryButton is pushed.
+        Recovers the selected files to outputDirectory.
+        updates numRecovered and numRecoveredLabel
+
+        Returns
+        -------
+        Explicit:
+            None
+
+        Implicit:
+        numRecovered : int
+            Adds the number of recovered files to this attribute
+        numRecoveredLabel : tk.Label
+            Updates to reflect the change to numRecovered, and reports the files which could not be recovered
+        """
+
+        if self.currentDisk.diskType == "ext3" or self.currentDisk.diskType == "ext4":
+            fileRecovery = recovery.recovery_journaled.FileRecoveryJournaled()
+        elif self.currentDisk.diskType == "ext2":
+            fileRecovery = recovery.recovery_no_journal.FileRecoveryNoJournal()
+
+        toRecover = self.fileList.getSelected()
+
+        if self.currentDisk.diskType == "ext3" or self.currentDisk.diskType == "ext4":
+            futures = fileRecovery.submitFiles(self.recoveryExecutor, self.currentDisk, self.transactions, toRecover, len(toRecover),
+            self.outputDirectory, self.blockIndex)
+        elif self.currentDisk.diskType == "ext2":
+            futures = fileRecovery.submitFiles(self.recoveryExecutor, self.currentDisk, toRecover, len(toRecover), self.outputDirectory)
+
+        # Every file is accounted for, so that one which fails does not stop the others from being counted.
+        numRecovered, errors = self.recoveryExecutor.getOutcomes(futures)
+        self.numRecovered += numRecovered
+
+        self.fileList.clearSelection()
+
+        # The failures of the last recovery are reported after the total.
+        text = f"Recovered {self.numRecovered} files"
+        if numRecovered < len(futures):
+            text += f", {len(futures) - numRecovered} of the last {len(futures)} failed"
+            if len(errors) > 0:
+                text += f" ({errors[0]})"
+        self.recoveredLabel.config(text=text)
+
+
+def main():
+    root = tk.Tk()
+    app = App(root)
+    root.mainloop()
+
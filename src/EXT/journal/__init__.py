@@ -1 +1,3 @@
-from src.EXT.journal import journal, read_journal
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("journal", "journal_snapshot", "journal_watcher", "read_journal"))
\ No newline at end of file
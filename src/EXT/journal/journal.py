@@ -1,11 +1,129 @@
 
 
+from array import array
+from bisect import bisect_right
 import time
 
 from src import common
 from src.EXT import structures
 
 
+# journal_header_t, which starts every journal metadata block. All journal fields are big endian.
+# 0xC03B3998 (3225106840) in magic indicates a journal metadata block.
+JOURNAL_HEADER = common.layout.Layout("JournalHeader", "big",
+    magic=common.layout.Field(0, 4),
+    blockType=common.layout.Field(4, 4),
+    sequence=common.layout.Field(8, 4))
+
+# journal_superblock_t. Only the fields used by FDRecovery are described.
+JOURNAL_SUPER_BLOCK = common.layout.Layout("JournalSuperBlock", "big",
+    blockSize=common.layout.Field(12, 4),
+    maxLen=common.layout.Field(0x10, 4),
+    firstBlock=common.layout.Field(0x14, 4),
+    sequence=common.layout.Field(0x18, 4),
+    start=common.layout.Field(0x1C, 4))
+
+# struct commit_header. commitTime is h_commit_sec.
+COMMIT_HEADER = common.layout.Layout("CommitHeader", "big",
+    sequence=common.layout.Field(8, 4),
+    commitTime=common.layout.Field(48, 8))
+
+# The block number in a journal_block_tag_t (or journal_block_tag3_t), on filesystems without the 64bit feature.
+BLOCK_TAG = common.layout.Layout("BlockTag", "big",
+    blockNum=common.layout.Field(0, 4))
+
+# On filesystems with the 64bit feature, the block number is spread across t_blocknr and t_blocknr_high.
+BLOCK_TAG_64 = common.layout.Layout("BlockTag64", "big",
+    blockNum=common.layout.Field(0, 4, 8, 4))
+
+# The metadata block types, indexed by the type codes stored in a BlockTypeIndex.
+BLOCK_TYPES: tuple = ("unknownBlock", "iTableBlock", "dBitmapBlock", "iBitmapBlock", "GroupDescriptorBlock")
+
+
+class BlockTypeIndex:
+
+    """
+    Associates ranges of block numbers with metadata block type.
+    The ranges are kept as sorted arrays of range starts and ends, with a small integer type code for each range,
+    so its size depends on the number of ranges rather than on the number of blocks they contain.
+
+    Attributes
+    ----------
+    starts : array
+        The first block number of each range, in increasing order.
+    ends : array
+        The block number following the last block of each range.
+    codes : array
+        The type code of each range. The code is the index of the block type in BLOCK_TYPES.
+
+    Methods
+    -------
+    getBlockType(self, blockNum: int) -> str
+        Gets the metadata block type of the given block. Blocks not in any range are "unknownBlock".
+    """
+
+    def __init__(self, ranges: list):
+
+        """
+        Parameters
+        ----------
+        ranges : list[tuple]
+            The ranges of metadata blocks, as tuples (first block number, following block number, block type).
+            If ranges overlap, the blocks in both are given the type of the range which starts first.
+        """
+
+        self.starts = array("Q")
+        self.ends = array("Q")
+        self.codes = array("B")
+
+        for start, end, blockType in sorted(ranges, key=lambda blockRange: blockRange[0]):
+
+            code = BLOCK_TYPES.index(blockType)
+
+            if len(self.ends) > 0:
+                start = max(start, self.ends[-1])
+            if start >= end:
+                continue
+
+            # Adjacent ranges of the same type (such as the inode tables of a flex_bg) are merged.
+            if len(self.ends) > 0 and self.ends[-1] == start and self.codes[-1] == code:
+                self.ends[-1] = end
+                continue
+
+            self.starts.append(start)
+            self.ends.append(end)
+            self.codes.append(code)
+
+
+    def getBlockType(self, blockNum: int) -> str:
+
+        """
+        Gets the metadata block type of the given block.
+
+        Parameters
+        ----------
+        blockNum : int
+            The block number.
+
+        Returns
+        -------
+        blockType : str
+            The block type, one of BLOCK_TYPES. Blocks not in any range are "unknownBlock".
+        """
+
+        # The range which may contain the block is the last one starting at or before it.
+        rangeNum = bisect_right(self.starts, blockNum) - 1
+
+        if rangeNum < 0 or blockNum >= self.ends[rangeNum]:
+            return BLOCK_TYPES[0]
+
+        return BLOCK_TYPES[self.codes[rangeNum]]
+
+
+    def __len__(self):
+        return sum(end - start for start, end in zip(self.starts, self.ends))
+
+
 class JournalSuperBlock:
 
     """
@@ -15,15 +133,28 @@ class JournalSuperBlock:
     ----------
     blockSize : int
         The size of blocks within the journal
+    maxLen : int
+        The number of blocks in the journal (s_maxlen).
+    firstBlock : int
+        The first journal block containing log data (s_first). The log wraps around to this block.
+    sequence : int
+        The transaction number of the first transaction in the log (s_sequence).
+        If the log is empty, the transaction number which the next transaction will have.
+    start : int
+        The journal block of the first transaction in the log (s_start). 0 if the log is empty.
     hasCSumv3 : bool
         Indicates whether the journal has the JBD2_FEATURE_INCOMPAT_CSUM_V3 feature
         The structure of block tags is determined by the presence of this feature.
     """
 
     def __init__(self, data: bytes):
-        decoder = common.decode.Decoder()
+        fields = JOURNAL_SUPER_BLOCK.unpack(data)
 
-        self.blockSize: int = decoder.beBytesToDecimal(data, 12, 15)
+        self.blockSize: int = fields.blockSize
+        self.maxLen: int = fields.maxLen
+        self.firstBlock: int = fields.firstBlock
+        self.sequence: int = fields.sequence
+        self.start: int = fields.start
 
         # The JBD2_FEATURE_INCOMPAT_CSUM_V3 feature flag is set in
         # the fourth bit of byte 43 in the journal super block
@@ -41,6 +172,9 @@ class Transaction:
         The transaction number associated with the transaction.
     journalBlockNum : int
         The block number of the transaction descriptor block relative to the beginning of the journal.
+    commitBlockNum : int
+        The block number of the transaction commit block relative to the beginning of the journal.
+        None until the commit block has been read.
     commitTime : int
         The time in UNIX time that the transaction was commited to journal.
     transactionType : int
@@ -55,7 +189,7 @@ class Transaction:
 
     Methods
     -------
-    getBlocks(self, blockTypeMap: dict, data: bytes, journalSuperBlock: JournalSuperBlock, superBlock: super_block.SuperBlock) -> list
+    getBlocks(self, blockTypeMap: BlockTypeIndex, data: bytes, journalSuperBlock: JournalSuperBlock, superBlock: super_block.SuperBlock) -> list
         Gets a list of all the blocks, stored as a tuple (blockNum, blockType).
     getTransactionType(dataBlocks: list) -> int
         Given the list of data blocks, determines the transaction type. Returns an int 0-2 indicating this transaction type:
@@ -64,7 +198,7 @@ class Transaction:
 
     """
 
-    def __init__(self, descriptorData: bytes, journalBlockNum: int, blockTypeMap: dict,
+    def __init__(self, descriptorData: bytes, journalBlockNum: int, blockTypeMap: BlockTypeIndex,
     journalSuperBlock: JournalSuperBlock, superBlock: structures.super_block.SuperBlock):
 
         """
@@ -75,8 +209,8 @@ class Transaction:
             This is the data which all transaction data is derived from
         journalBlockNum : int
             This is the block number of the descriptor block, relative to the beginning of the journal
-        blockTypeMap : dict
-            The dictionary which has block numbers associated with metadata block type
+        blockTypeMap : BlockTypeIndex
+            The index which has block numbers associated with metadata block type
             Used to map blocks in the transaction to block types in order to identify the transaction type
         journalSuperBlock : JournalSuperBlock
             The super block associated with the journal
@@ -84,11 +218,10 @@ class Transaction:
             The super block associated with the filesystem
         """
 
-        decoder = common.decode.Decoder()
-
         # initialize transaction data fields
-        self.transactionNum: int = decoder.beBytesToDecimal(descriptorData, 8, 11)
+        self.transactionNum: int = JOURNAL_HEADER.unpack(descriptorData).sequence
         self.journalBlockNum: int = journalBlockNum
+        self.commitBlockNum: int = None
         self.commitTime: int = 0
         self.dataBlocks: list = self.getBlocks(blockTypeMap, descriptorData[12:], journalSuperBlock, superBlock)
         # Transaction type 0 is deletion, 1 is useful, 2 is not useful
@@ -137,7 +270,7 @@ class Transaction:
         return transactionType
 
 
-    def getBlocks(self, blockTypeMap: dict, data: bytes,
+    def getBlocks(self, blockTypeMap: BlockTypeIndex, data: bytes,
     journalSuperBlock: JournalSuperBlock, superBlock: structures.super_block.SuperBlock) -> list:
 
         """
@@ -145,8 +278,8 @@ class Transaction:
 
         Parameters
         ----------
-        blockTypeMap : dict
-            The dictionary which has block numbers associated with metadata block type
+        blockTypeMap : BlockTypeIndex
+            The index which has block numbers associated with metadata block type
             Used to map blocks in the transaction to block types in order to identify the transaction type
         data : bytes
             This is the bytes in which the descriptor block for the transaction is contained
@@ -162,8 +295,6 @@ class Transaction:
             A list of blocks involved in the transaction
         """
 
-        decoder = common.decode.Decoder()
-
         blocks: list = []
 
         # The size (in bytes) of each block tag in the descriptor block depends on
@@ -175,23 +306,20 @@ class Transaction:
         elif not journalSuperBlock.hasCSumV3 and superBlock.bit64:
             modifier: int = 28
 
+        # When the file system has the 64bit feature flag set, the block number
+        # in the descriptor block is spread across t_blocknr, and t_blocknr_high.
+        # Otherwise, it is simply in t_blocknr.
+        if superBlock.bit64:
+            blockTag = BLOCK_TAG_64
+        else:
+            blockTag = BLOCK_TAG
+
         offSet: int = 0
         while True:
 
-            # When the file system has the 64bit feature flag set, the block number
-            # in the descriptor block is spread across t_blocknr, and t_blocknr_high.
-            # Otherwise, it is simply in t_blocknr.
-            if superBlock.bit64:
-                blockNum: int = (decoder.beBytesToDecimal(data, offSet, offSet + 3) +
-                (decoder.beBytesToDecimal(data, offSet + 8, offSet + 11) * pow(2, 32)))
-            else:
-                blockNum: int = decoder.beBytesToDecimal(data, offSet, offSet + 3)
-
-            if blockNum in blockTypeMap:
-                blocks.append((blockNum, blockTypeMap.get(blockNum)))
+            blockNum: int = blockTag.unpack(data, offSet).blockNum
 
-            else:
-                blocks.append((blockNum, "unknownBlock"))
+            blocks.append((blockNum, blockTypeMap.getBlockType(blockNum)))
 
             UUIDFlag: bool = data[offSet + 7] & 0b00000010 == 0b00000010
             endFlag: bool = data[offSet + 7] & 0b00001000 == 0b00001000
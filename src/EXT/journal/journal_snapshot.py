@@ -0,0 +1,338 @@
+
+
+import hashlib
+import os
+import struct
+import time
+
+from src import common
+from src.EXT.journal import read_journal
+
+
+# The header at the start of a journal snapshot. 0x46444A43 in magic identifies a journal snapshot.
+# numBlocks is the length of the journal in blocks, and numChanged the number of blocks stored in the snapshot.
+SNAPSHOT_HEADER = common.layout.Layout("SnapshotHeader", "big",
+    magic=common.layout.Field(0, 4),
+    version=common.layout.Field(4, 4),
+    blockSize=common.layout.Field(8, 4),
+    numBlocks=common.layout.Field(12, 4),
+    snapshotNum=common.layout.Field(16, 4),
+    numChanged=common.layout.Field(20, 4),
+    captureTime=common.layout.Field(24, 8))
+
+# The magic number of journal snapshots.
+SNAPSHOT_MAGIC = 0x46444A43
+
+# Incremented whenever the format of journal snapshots changes.
+SNAPSHOT_VERSION = 1
+
+# The size in bytes of the blake2b digest of each journal block in the block hash index.
+DIGEST_SIZE = 16
+
+# The number of bytes shown on each line of a readable journal copy.
+READABLE_LINE_BYTES = 16
+
+
+class JournalSnapshot:
+
+    """
+    A binary copy of the journal at one point in time, stored as the difference from the previous snapshot.
+
+    A snapshot file contains:
+        the header (SNAPSHOT_HEADER),
+        the block hash index: the blake2b digest of every journal block, in journal order,
+        the data of each block whose digest differs from the previous snapshot, in journal order,
+        the journal block numbers of those blocks, as 4 byte big endian integers.
+    The first snapshot of a chain (snapshot number 0) stores every block.
+    A block which did not change is read from the newest earlier snapshot which stores it.
+
+    Attributes
+    ----------
+    snapshotPath : str
+        The path of the snapshot file.
+    previous : JournalSnapshot
+        The previous snapshot in the chain. None for the first snapshot.
+    blockSize : int
+        The size in bytes of the journal blocks.
+    numBlocks : int
+        The length of the journal in blocks.
+    snapshotNum : int
+        The position of the snapshot in its chain, starting at 0.
+    captureTime : int
+        The time the snapshot was taken, in seconds since the epoch.
+    digests : bytes
+        The block hash index.
+    changedBlocks : dict[int, int]
+        Maps the journal block number of each block stored in the snapshot to its position in the snapshot.
+
+    Methods
+    -------
+    getDataOffset(self) -> int
+        Gets the offset of the first stored block from the start of the snapshot file.
+    getDigest(self, journalBlockNum: int) -> bytes
+        Gets the digest of a journal block.
+    readBlock(self, journalBlockNum: int) -> bytes
+        Reads a journal block as it was when the snapshot was taken.
+    iterBlocks(self) -> iterator[tuple]
+        Reads every journal block as it was when the snapshot was taken, in journal order.
+    writeReadable(self, outputFile)
+        Writes the journal as hexadecimal text, in the format of the readable journal copies.
+    """
+
+    def __init__(self, snapshotPath: str, previous = None):
+
+        """
+        Parameters
+        ----------
+        snapshotPath : str
+            The path of the snapshot file.
+        previous : JournalSnapshot
+            The previous snapshot in the chain. Must be given unless this is the first snapshot.
+        """
+
+        self.snapshotPath: str = snapshotPath
+        self.previous: JournalSnapshot = previous
+
+        with open(snapshotPath, "rb") as snapshotFile:
+            header = SNAPSHOT_HEADER.unpack(snapshotFile.read(SNAPSHOT_HEADER.size).ljust(SNAPSHOT_HEADER.size, b"\0"))
+
+            if header.magic != SNAPSHOT_MAGIC or header.version != SNAPSHOT_VERSION:
+                raise ValueError(f"{snapshotPath} is not a journal snapshot")
+
+            self.blockSize: int = header.blockSize
+            self.numBlocks: int = header.numBlocks
+            self.snapshotNum: int = header.snapshotNum
+            self.captureTime: int = header.captureTime
+
+            if header.snapshotNum > 0 and (previous is None or previous.snapshotNum != header.snapshotNum - 1
+            or previous.blockSize != header.blockSize):
+                raise ValueError(f"{snapshotPath} does not follow the previous snapshot")
+
+            self.digests: bytes = snapshotFile.read(DIGEST_SIZE * header.numBlocks)
+
+            snapshotFile.seek(self.getDataOffset() + (header.numChanged * header.blockSize))
+            blockNums = struct.unpack(f">{header.numChanged}I", snapshotFile.read(4 * header.numChanged))
+
+        self.changedBlocks: dict = {blockNum: position for position, blockNum in enumerate(blockNums)}
+
+
+    def getDataOffset(self) -> int:
+
+        """
+        Gets the offset of the first stored block from the start of the snapshot file.
+        Is a helper method for readBlock.
+
+        Returns
+        -------
+        offset : int
+            The byte offset.
+        """
+
+        return SNAPSHOT_HEADER.size + (DIGEST_SIZE * self.numBlocks)
+
+
+    def getDigest(self, journalBlockNum: int) -> bytes:
+
+        """
+        Gets the digest of a journal block.
+
+        Parameters
+        ----------
+        journalBlockNum : int
+            The block number, relative to the beginning of the journal.
+
+        Returns
+        -------
+        digest : bytes
+            The blake2b digest of the block when the snapshot was taken.
+        """
+
+        return self.digests[DIGEST_SIZE * journalBlockNum:DIGEST_SIZE * (journalBlockNum + 1)]
+
+
+    def readBlock(self, journalBlockNum: int) -> bytes:
+
+        """
+        Reads a journal block as it was when the snapshot was taken.
+
+        Parameters
+        ----------
+        journalBlockNum : int
+            The block number, relative to the beginning of the journal.
+
+        Returns
+        -------
+        data : bytes
+            The bytes of the block.
+        """
+
+        snapshot = self
+        while journalBlockNum not in snapshot.changedBlocks:
+            snapshot = snapshot.previous
+            if snapshot is None:
+                raise ValueError(f"journal block {journalBlockNum} is not in any snapshot of the chain")
+
+        with open(snapshot.snapshotPath, "rb") as snapshotFile:
+            snapshotFile.seek(snapshot.getDataOffset() + (snapshot.blockSize * snapshot.changedBlocks[journalBlockNum]))
+            return snapshotFile.read(snapshot.blockSize)
+
+
+    def iterBlocks(self):
+
+        """
+        Reads every journal block as it was when the snapshot was taken, in journal order.
+
+        Returns
+        -------
+        blocks : iterator[tuple]
+            Tuples (journal block number, block data).
+        """
+
+        for journalBlockNum in range(0, self.numBlocks):
+            yield (journalBlockNum, self.readBlock(journalBlockNum))
+
+
+    def writeReadable(self, outputFile):
+
+        """
+        Writes the journal as hexadecimal text, in the format of the readable journal copies:
+        16 bytes per line, in groups of 2 bytes, with a blank line after each block.
+
+        Parameters
+        ----------
+        outputFile : file
+            The text file to write to.
+        """
+
+        for journalBlockNum, block in self.iterBlocks():
+            lines = [block[i:i + READABLE_LINE_BYTES].hex(" ", 2) for i in range(0, len(block), READABLE_LINE_BYTES)]
+            outputFile.write("\n".join(lines) + "\n\n")
+
+
+def openSnapshots(snapshotPaths: list) -> list:
+
+    """
+    Opens a chain of snapshots.
+
+    Parameters
+    ----------
+    snapshotPaths : list[str]
+        The paths of the snapshot files, first snapshot first.
+
+    Returns
+    -------
+    snapshots : list[JournalSnapshot]
+        The snapshots, in the same order. Each can read every block of the journal.
+    """
+
+    snapshots = []
+    previous = None
+    for snapshotPath in snapshotPaths:
+        previous = JournalSnapshot(snapshotPath, previous)
+        snapshots.append(previous)
+
+    return snapshots
+
+
+class SnapshotWriter:
+
+    """
+    Takes a chain of snapshots of the journal of a filesystem.
+    Each snapshot stores only the journal blocks which changed since the previous one (see JournalSnapshot).
+
+    Attributes
+    ----------
+    readJournal : read_journal.ReadJournal
+        Reads the journal.
+    snapshotNum : int
+        The number of the next snapshot.
+    previousDigests : bytes
+        The block hash index of the previous snapshot. None before the first snapshot.
+
+    Methods
+    -------
+    takeSnapshot(self, snapshotPath: str) -> int
+        Copies the journal blocks which changed since the previous snapshot into a new snapshot.
+    """
+
+    def __init__(self, readJournal: read_journal.ReadJournal):
+
+        """
+        Parameters
+        ----------
+        readJournal : read_journal.ReadJournal
+            Reads the journal of the filesystem.
+        """
+
+        self.readJournal: read_journal.ReadJournal = readJournal
+        self.snapshotNum: int = 0
+        self.previousDigests: bytes = None
+
+
+    def takeSnapshot(self, snapshotPath: str) -> int:
+
+        """
+        Copies the journal blocks which changed since the previous snapshot into a new snapshot.
+        The snapshot is written to a temporary file, which replaces snapshotPath once complete.
+
+        Parameters
+        ----------
+        snapshotPath : str
+            The path of the new snapshot file.
+
+        Returns
+        -------
+        Explicit:
+        numChanged : int
+            The number of blocks stored in the snapshot.
+
+        Implicit:
+            Writes the snapshot to snapshotPath.
+        """
+
+        self.readJournal.refreshJournal()
+        blockSize = self.readJournal.superBlock.blockSize
+        numBlocks = self.readJournal.journalEntryEnds[-1]
+
+        # If the journal has changed size, every block is stored again.
+        previousDigests = self.previousDigests
+        if previousDigests is not None and len(previousDigests) != DIGEST_SIZE * numBlocks:
+            previousDigests = None
+            self.snapshotNum = 0
+
+        digests = bytearray(DIGEST_SIZE * numBlocks)
+        changedBlocks = []
+
+        temporaryPath = snapshotPath + ".tmp"
+        try:
+            with open(temporaryPath, "wb") as snapshotFile:
+
+                # The header and the block hash index are written once every block has been read.
+                snapshotFile.seek(SNAPSHOT_HEADER.size + len(digests))
+
+                for journalBlockNum, block in self.readJournal.iterJournalBlocks(0, numBlocks):
+                    digest = hashlib.blake2b(block, digest_size=DIGEST_SIZE).digest()
+                    digestOffset = DIGEST_SIZE * journalBlockNum
+                    digests[digestOffset:digestOffset + DIGEST_SIZE] = digest
+
+                    if previousDigests is None or previousDigests[digestOffset:digestOffset + DIGEST_SIZE] != digest:
+                        snapshotFile.write(block)
+                        changedBlocks.append(journalBlockNum)
+
+                snapshotFile.write(struct.pack(f">{len(changedBlocks)}I", *changedBlocks))
+
+                snapshotFile.seek(0)
+                snapshotFile.write(SNAPSHOT_HEADER.struct.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, blockSize, numBlocks,
+                    self.snapshotNum, len(changedBlocks), int(time.time())))
+                snapshotFile.write(digests)
+
+            os.replace(temporaryPath, snapshotPath)
+        except BaseException:
+            if os.path.exists(temporaryPath):
+                os.unlink(temporaryPath)
+            raise
+
+        self.previousDigests = bytes(digests)
+        self.snapshotNum += 1
+
+        return len(changedBlocks)
@@ -0,0 +1,418 @@
+
+
+import os
+import time
+
+from src import common
+from src.EXT import structures
+from src.EXT.journal import read_journal
+
+
+# The header at the start of a journal store. 0x46444A53 ("FDJS") in magic identifies a journal store.
+# uuid is the UUID of the filesystem whose journal was captured, as a big endian integer.
+STORE_HEADER = common.layout.Layout("StoreHeader", "big",
+    magic=common.layout.Field(0, 4),
+    version=common.layout.Field(4, 4),
+    blockSize=common.layout.Field(8, 4),
+    uuid=common.layout.Field(12, 16))
+
+# The header of each captured transaction in a journal store. 0x46444A54 ("FDJT") in magic identifies a transaction record.
+# The header is followed by numBlocks block records.
+TRANSACTION_RECORD = common.layout.Layout("TransactionRecord", "big",
+    magic=common.layout.Field(0, 4),
+    transactionNum=common.layout.Field(4, 4),
+    commitTime=common.layout.Field(8, 8),
+    numBlocks=common.layout.Field(16, 4))
+
+# The header of each captured block. It is followed by the blockSize bytes of the block.
+BLOCK_RECORD = common.layout.Layout("BlockRecord", "big",
+    blockNum=common.layout.Field(0, 8))
+
+# The magic numbers of the store header and of transaction records.
+STORE_MAGIC = 0x46444A53
+TRANSACTION_MAGIC = 0x46444A54
+
+# Incremented whenever the format of the journal store changes.
+STORE_VERSION = 1
+
+# The default number of seconds between polls of the journal.
+DEFAULT_POLL_INTERVAL = 2
+
+
+class JournalStore:
+
+    """
+    An append only file of deletion transactions captured from the journal of a filesystem.
+    Each transaction is stored with the inode table blocks it contains, exactly as they were in the journal,
+    so the inodes of the deleted files can still be read once the journal has wrapped over the transaction.
+    The store is a record of evidence only: the blocks are the copies written by the deletion, so their inodes show which
+    inodes were deleted and when, but their block pointers have already been cleared. They cannot be used to recover the
+    files' data (recovery_journaled needs the earlier copies of the blocks, from before the deletion), and nothing in
+    the recovery reads the store. It is read with iterTransactions.
+    Records are only ever appended. A record cut short by an interrupted write is removed when the store is next opened.
+
+    Attributes
+    ----------
+    storePath : str
+        The path of the store file.
+    blockSize : int
+        The size in bytes of the filesystem blocks in the store.
+    lastSequence : int
+        The transaction number of the last transaction in the store. 0 if the store is empty.
+    numTransactions : int
+        The number of transactions in the store.
+
+    Methods
+    -------
+    append(self, transaction: journal.Transaction, blocks: list)
+        Appends a transaction and its captured blocks to the store.
+    iterTransactions(self) -> iterator[tuple]
+        Reads the transactions in the store, in the order they were captured.
+    close(self)
+        Closes the store file.
+    """
+
+    def __init__(self, storePath: str, superBlock: structures.super_block.SuperBlock):
+
+        """
+        Parameters
+        ----------
+        storePath : str
+            The path of the store file. It is created if it does not exist.
+        superBlock : super_block.SuperBlock
+            The super block of the filesystem. An existing store must be for the same filesystem.
+        """
+
+        self.storePath: str = storePath
+        self.blockSize: int = superBlock.blockSize
+        self.lastSequence: int = 0
+        self.numTransactions: int = 0
+
+        uuid = int(superBlock.uuid, 16)
+
+        self.storeFile = open(storePath, "a+b")
+        self.storeFile.seek(0)
+        data = self.storeFile.read(STORE_HEADER.size)
+
+        if len(data) < STORE_HEADER.size:
+            # A new store (or one whose header was never completely written).
+            self.storeFile.truncate(0)
+            self.storeFile.write(STORE_HEADER.struct.pack(STORE_MAGIC, STORE_VERSION, self.blockSize, bytes.fromhex(superBlock.uuid)))
+            self.storeFile.flush()
+            os.fsync(self.storeFile.fileno())
+            return
+
+        header = STORE_HEADER.unpack(data)
+        if header.magic != STORE_MAGIC or header.version != STORE_VERSION:
+            self.storeFile.close()
+            raise ValueError(f"{storePath} is not a journal store")
+        if header.uuid != uuid or header.blockSize != self.blockSize:
+            self.storeFile.close()
+            raise ValueError(f"{storePath} is the journal store of another filesystem")
+
+        # Find the end of the last complete record, removing anything after it.
+        end = STORE_HEADER.size
+        for transactionNum, commitTime, blocks in self.iterTransactions():
+            self.lastSequence = transactionNum
+            self.numTransactions += 1
+            end += TRANSACTION_RECORD.size + len(blocks) * (BLOCK_RECORD.size + self.blockSize)
+
+        self.storeFile.truncate(end)
+
+
+    def append(self, transaction, blocks: list):
+
+        """
+        Appends a transaction and its captured blocks to the store.
+        The record is written with a single write, and synced to disk before returning.
+
+        Parameters
+        ----------
+        transaction : journal.Transaction
+            The transaction.
+        blocks : list[tuple]
+            The captured blocks of the transaction, as tuples (filesystem block number, block data).
+        """
+
+        record = [TRANSACTION_RECORD.struct.pack(TRANSACTION_MAGIC, transaction.transactionNum, transaction.commitTime, len(blocks))]
+        for blockNum, data in blocks:
+            record.append(BLOCK_RECORD.struct.pack(blockNum))
+            record.append(data)
+
+        self.storeFile.write(b"".join(record))
+        self.storeFile.flush()
+        os.fsync(self.storeFile.fileno())
+
+        self.lastSequence = transaction.transactionNum
+        self.numTransactions += 1
+
+
+    def iterTransactions(self):
+
+        """
+        Reads the transactions in the store, in the order they were captured.
+        Reading stops at the first incomplete record.
+
+        Returns
+        -------
+        transactions : iterator[tuple]
+            Tuples (transactionNum, commitTime, blocks), where blocks is a list of tuples (filesystem block number, block data).
+        """
+
+        blockRecordSize = BLOCK_RECORD.size + self.blockSize
+
+        with open(self.storePath, "rb") as storeFile:
+            storeFile.seek(STORE_HEADER.size)
+
+            while True:
+                data = storeFile.read(TRANSACTION_RECORD.size)
+                if len(data) < TRANSACTION_RECORD.size:
+                    return
+
+                record = TRANSACTION_RECORD.unpack(data)
+                if record.magic != TRANSACTION_MAGIC:
+                    return
+
+                data = storeFile.read(record.numBlocks * blockRecordSize)
+                if len(data) < record.numBlocks * blockRecordSize:
+                    return
+
+                blocks = []
+                for offset in range(0, len(data), blockRecordSize):
+                    blockNum = BLOCK_RECORD.unpack(data, offset).blockNum
+                    blocks.append((blockNum, data[offset + BLOCK_RECORD.size:offset + blockRecordSize]))
+
+                yield (record.transactionNum, record.commitTime, blocks)
+
+
+    def close(self):
+
+        """
+        Closes the store file.
+        """
+
+        self.storeFile.close()
+
+
+class JournalWatcher:
+
+    """
+    Watches the journal of a mounted filesystem, copying each newly committed deletion transaction,
+    with its inode table blocks, into a journal store before the journal wraps over it.
+
+    The journal is read completely once, when the watcher starts. After that, each poll rereads the journal super block
+    and follows the log from the block after the last transaction seen (the head), so the work done by a poll
+    depends on the number of blocks written to the journal since the previous poll, not on the size of the journal.
+    Only the block cache of the disk is emptied before each poll (see read_journal.ReadJournal.readJournalSuperBlock).
+    The kernel's caches are never flushed, so watching does not slow down the rest of the system.
+    The store holds evidence of the deletions, not recoverable data (see JournalStore).
+
+    Attributes
+    ----------
+    diskO : disks.Disk
+        The disk object associated with the filesystem being watched.
+    store : JournalStore
+        The store into which deletion transactions are copied.
+    pollInterval : float
+        The number of seconds between polls.
+    readJournal : read_journal.ReadJournal
+        Reads the journal.
+    lastSequence : int
+        The transaction number of the last transaction seen. None until the journal has been read.
+    lastCommitBlockNum : int
+        The journal block containing the commit block of the last transaction seen. None if no transaction has been seen.
+    nextBlockNum : int
+        The journal block following lastCommitBlockNum, from which the next poll follows the log.
+
+    Methods
+    -------
+    watch(self, numPolls: int = None) -> iterator[int]
+        Polls the journal every pollInterval seconds.
+    poll(self) -> int
+        Captures the deletion transactions committed since the last poll.
+    scanJournal(self) -> int
+        Reads the whole journal, capturing any deletion transactions not already in the store.
+    followJournal(self, journalSuperBlock: journal.JournalSuperBlock) -> list[journal.Transaction]
+        Reads the transactions committed after the head.
+    captureTransactions(self, transactions: list) -> int
+        Copies the deletion transactions not already in the store into the store, and moves the head past every transaction.
+    """
+
+    def __init__(self, diskO: structures.disks.Disk, storePath: str, pollInterval: float = DEFAULT_POLL_INTERVAL):
+
+        """
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem being watched.
+        storePath : str
+            The path of the journal store. Transactions are appended to it if it already exists.
+        pollInterval : float
+            The number of seconds between polls.
+        """
+
+        self.diskO = diskO
+        self.pollInterval: float = pollInterval
+        self.readJournal = read_journal.ReadJournal(diskO)
+        self.store = JournalStore(storePath, structures.super_block.SuperBlock(diskO))
+
+        self.lastSequence: int = None
+        self.lastCommitBlockNum: int = None
+        self.nextBlockNum: int = 0
+
+
+    def watch(self, numPolls: int = None):
+
+        """
+        Polls the journal every pollInterval seconds.
+
+        Parameters
+        ----------
+        numPolls : int
+            The number of polls. If this is None, polling continues until the caller stops iterating.
+
+        Returns
+        -------
+        numCaptured : iterator[int]
+            The number of deletion transactions captured by each poll.
+        """
+
+        pollNum = 0
+        while numPolls is None or pollNum < numPolls:
+            if pollNum > 0:
+                time.sleep(self.pollInterval)
+
+            yield self.poll()
+            pollNum += 1
+
+
+    def poll(self) -> int:
+
+        """
+        Captures the deletion transactions committed since the last poll.
+        The first poll reads the whole journal.
+
+        Returns
+        -------
+        Explicit:
+        numCaptured : int
+            The number of deletion transactions captured.
+
+        Implicit:
+            Appends the captured transactions to the store.
+        """
+
+        if self.lastSequence is None:
+            return self.scanJournal()
+
+        journalSuperBlock = self.readJournal.readJournalSuperBlock()
+        self.readJournal.journalSuperBlock = journalSuperBlock
+
+        return self.captureTransactions(self.followJournal(journalSuperBlock))
+
+
+    def scanJournal(self) -> int:
+
+        """
+        Reads the whole journal, capturing any deletion transactions not already in the store,
+        and sets the head to the last transaction in the journal.
+
+        Returns
+        -------
+        numCaptured : int
+            The number of deletion transactions captured.
+        """
+
+        journalSuperBlock = self.readJournal.readJournalSuperBlock()
+        self.readJournal.journalSuperBlock = journalSuperBlock
+        transactions = sorted(self.readJournal.iterFileSystemJournal(refresh=False), key=lambda transaction: transaction.transactionNum)
+
+        # The head starts before the first transaction the journal expects next. Older transactions
+        # (left in the journal when the filesystem was last unmounted) are captured, but do not move the head.
+        self.lastSequence = journalSuperBlock.sequence - 1
+        self.lastCommitBlockNum = None
+        self.nextBlockNum = journalSuperBlock.start or journalSuperBlock.firstBlock
+
+        return self.captureTransactions(transactions)
+
+
+    def followJournal(self, journalSuperBlock) -> list:
+
+        """
+        Reads the transactions committed after the head.
+        The log is followed from the head while the commit block of the last transaction seen is still in the journal.
+        If it is not, or if the log has restarted elsewhere (after the filesystem is remounted, or when the journal
+        has wrapped over the head between polls), the log is followed from its start instead,
+        as recorded in the journal super block. Transactions overwritten before they were seen are lost.
+        Is a helper method for poll.
+
+        Parameters
+        ----------
+        journalSuperBlock : journal.JournalSuperBlock
+            The journal super block, just reread.
+
+        Returns
+        -------
+        transactions : list[journal.Transaction]
+            The new transactions, in journal order.
+        """
+
+        transactions = []
+
+        if self.lastCommitBlockNum is None or self.readJournal.hasCommitBlock(self.lastCommitBlockNum, self.lastSequence):
+            transactions = list(self.readJournal.iterFileSystemJournal(self.nextBlockNum, self.lastSequence, False))
+
+        # The oldest transaction in the log is newer than the head, so the log no longer continues from the head.
+        continuous = len(transactions) > 0 and transactions[0].transactionNum == self.lastSequence + 1
+        if not continuous and journalSuperBlock.start != 0 and journalSuperBlock.sequence > self.lastSequence:
+            transactions = list(self.readJournal.iterFileSystemJournal(journalSuperBlock.start, journalSuperBlock.sequence - 1, False))
+
+        return transactions
+
+
+    def captureTransactions(self, transactions: list) -> int:
+
+        """
+        Copies the deletion transactions not already in the store into the store, and moves the head past every transaction.
+        Only the inode table blocks of each deletion transaction are copied, as these hold the inodes of the deleted files.
+        Is a helper method for poll.
+
+        Parameters
+        ----------
+        transactions : list[journal.Transaction]
+            The transactions read, in the order they were committed.
+
+        Returns
+        -------
+        Explicit:
+        numCaptured : int
+            The number of deletion transactions captured.
+
+        Implicit:
+            Appends the captured transactions to the store.
+        """
+
+        numCaptured = 0
+
+        for transaction in transactions:
+
+            # Transaction type 0 is a deletion transaction.
+            if transaction.transactionType == 0 and transaction.transactionNum > self.store.lastSequence:
+
+                # The data blocks of a transaction follow its descriptor block in the journal, in order.
+                blocks = []
+                for blockOffset, block in enumerate(transaction.dataBlocks, 1):
+                    if block[1] == "iTableBlock":
+                        blocks.append((block[0], bytes(self.readJournal.readJournalBlock(transaction.journalBlockNum + blockOffset))))
+
+                self.store.append(transaction, blocks)
+                numCaptured += 1
+
+            if transaction.transactionNum > self.lastSequence:
+                self.lastSequence = transaction.transactionNum
+                self.lastCommitBlockNum = transaction.commitBlockNum
+                self.nextBlockNum = transaction.commitBlockNum + 1
+                if self.nextBlockNum >= self.readJournal.journalEntryEnds[-1]:
+                    self.nextBlockNum = self.readJournal.journalSuperBlock.firstBlock
+
+        return numCaptured
@@ -1,13 +1,21 @@
 
 
+from bisect import bisect_right
+from itertools import chain
 from math import ceil
-import os
 
 from src import common
 from src.EXT import structures
 from src.EXT.journal import journal
 
 
+# The number of journal blocks read at once when scanning the journal.
+JOURNAL_READ_BLOCKS = 256
+
+# The name of the persistent cache holding the transactions found by previous scans, by filesystem UUID.
+JOURNAL_CACHE_NAME = "journal"
+
+
 class ReadJournal:
 
     """
@@ -17,13 +25,57 @@ class ReadJournal:
     ----------
     diskO : disks.Disk
         The disk object associated with the filesystem on which the journal being read from is contained.
+    superBlock : super_block.SuperBlock
+        The super block associated with the filesystem. None until the journal inode has been read.
+    fileSystemJournalInode : read_inode.Inode
+        The inode of the journal, whose entries map journal block numbers to filesystem block numbers.
+        None until the journal inode has been read.
+    journalEntryEnds : list[int]
+        For each entry of the journal inode, the journal block number following the last block in that entry.
+        Used to find the entry containing a journal block by bisection.
+    journalSuperBlock : journal.JournalSuperBlock
+        The super block of the journal. None until the journal has been read.
+    blockTypeMap : journal.BlockTypeIndex
+        The metadata block types of the filesystem, built when the journal is first read, and rebuilt when it is refreshed.
+    blockIndex : dict[int, list[tuple]]
+        Maps each filesystem block number to the journal copies of that block, built by readFileSystemJournal.
+        Each copy is a tuple (transactionNum, journalBlockNum), newest transaction first.
 
     Methods
     -------
-    readFileSystemJournal(self) -> list[journal.Transaction]
+    readJournalInode(self) -> read_inode.Inode
+        Reads the super block and the journal inode, if they have not already been read.
+    readFileSystemJournal(self, incremental: bool = False) -> list[journal.Transaction]
         Reads the filesystem journal, encapsulating its data in journal.Transaction objects.
-    getBlockTypeMap(self, superBlock: super_block.SuperBlock) -> dict[int, str]
-        Reads through filesystem metadata to create a dictionary associating block numbers with metadata block type.
+    refreshJournal(self) -> journal.JournalSuperBlock
+        Flushes cached disk data, then rereads the super block, the journal inode, and the journal super block.
+    readJournalSuperBlock(self) -> journal.JournalSuperBlock
+        Rereads the journal super block, without flushing the kernel's caches.
+    iterJournalBlocks(self, startBlockNum: int, endBlockNum: int) -> iterator[tuple]
+        Reads a range of journal blocks in large contiguous chunks.
+    iterFileSystemJournal(self, startBlockNum: int = 0, lastSequence: int = None, refresh: bool = True) -> iterator[journal.Transaction]
+        Reads the filesystem journal, yielding each committed transaction as soon as its commit block is read.
+    readIncremental(self) -> list[journal.Transaction]
+        Reads the filesystem journal, reusing the transactions found by the previous scan of this filesystem.
+    readCachedJournal(self) -> list[journal.Transaction]
+        Reads the part of the journal written since the previous scan, returning it with the cached transactions which remain.
+    storeCachedJournal(self, transactionList: list)
+        Stores the transactions found in the journal cache, for the next incremental scan.
+    iterIndexedJournal(self, transactionList: list, blockIndex: dict, refresh: bool = True, storeCache: bool = False)
+    -> iterator[journal.Transaction]
+        Reads the whole filesystem journal, indexing each transaction as soon as it is read.
+    hasCommitBlock(self, journalBlockNum: int, sequence: int) -> bool
+        Checks whether a journal block still contains the commit block of the given transaction.
+    getCircularRanges(self, startBlockNum: int, endBlockNum: int) -> list[tuple]
+        Converts a range of journal blocks, which may wrap around the end of the log, into ranges which do not.
+    rangesOverlap(self, ranges: list, otherRanges: list) -> bool
+        Checks whether any of the ranges of journal blocks in ranges overlaps any in otherRanges.
+    indexTransactions(self, transactions: list) -> dict[int, list[tuple]]
+        Builds an index from filesystem block numbers to the journal copies of those blocks.
+    indexTransaction(self, blockIndex: dict, transaction: journal.Transaction)
+        Adds the copies of filesystem blocks in a transaction to a block index.
+    getBlockTypeMap(self, superBlock: super_block.SuperBlock) -> journal.BlockTypeIndex
+        Reads through filesystem metadata to create an index associating block numbers with metadata block type.
         These block types can be inode table blocks, data bitmap blocks, inode bitmap blocks, and group descriptor Blocks.
         This is a helper method for readFileSystemJournal.
     readJournalBlock(self, journalBlockNum: int) -> bytes
@@ -40,87 +92,520 @@ class ReadJournal:
             The disk object associated with the filesystem on which the journal being read from is contained.
         """
         self.diskO = diskO
+        self.superBlock: structures.super_block.SuperBlock = None
+        self.fileSystemJournalInode: structures.read_inode.Inode = None
+        self.journalEntryEnds: list[int] = []
+        self.journalSuperBlock: journal.JournalSuperBlock = None
+        self.blockTypeMap: journal.BlockTypeIndex = None
+        self.blockIndex: dict = {}
 
 
-    def readFileSystemJournal(self) -> list:
+    def readJournalInode(self):
+
+        """
+        Reads the super block and the journal inode, if they have not already been read.
+        Both are kept, so that reading journal blocks does not reread them.
+
+        Returns
+        -------
+        fileSystemJournalInode : read_inode.Inode
+            The inode of the journal.
+        """
+
+        if self.fileSystemJournalInode is None:
+            self.superBlock = structures.super_block.SuperBlock(self.diskO)
+            self.fileSystemJournalInode = structures.read_inode.Inode(self.diskO, self.superBlock.journalInode, self.superBlock, False, True)
+            self.journalEntryEnds = [entry.fileBlockNum + entry.numBlocks for entry in self.fileSystemJournalInode.entries]
+
+        return self.fileSystemJournalInode
+
+
+    def readFileSystemJournal(self, incremental: bool = False) -> list:
 
         """
         Reads the filesystem journal, encapsulating its data in journal.Transaction objects.
 
+        Parameters
+        ----------
+        incremental : bool
+            If True, the transactions found by the previous scan of this filesystem are loaded from the journal cache,
+            and only the part of the journal written since then is read (see readIncremental).
+
         Returns
         -------
+        Explicit:
         transactionList : list[journal.Transaction]
-            A list of the transactions in the journal represented as journal.Transaction objects.
+            A list of the committed transactions in the journal represented as journal.Transaction objects.
+            In journal order, unless incremental.
+
+        Implicit:
+        blockIndex : dict[int, list[tuple]]
+            Updated to index the copies of filesystem blocks in transactionList.
+        """
+
+        if incremental:
+            transactionList = self.readIncremental()
+        else:
+            transactionList = list(self.iterFileSystemJournal())
+
+        self.blockIndex = self.indexTransactions(transactionList)
+
+        return transactionList
+
+
+    def refreshJournal(self) -> journal.JournalSuperBlock:
+
+        """
+        Flushes cached disk data, then rereads the super block, the journal inode, and the journal super block,
+        as the disk may have changed since they were last read.
+
+        Returns
+        -------
+        journalSuperBlock : journal.JournalSuperBlock
+            The journal super block.
         """
 
         # Flush filesystem cache.
-        os.sync()
-        drop_caches = open("/proc/sys/vm/drop_caches", "w")
-        drop_caches.write("3")
-        drop_caches.close()
+        common.block_device.dropKernelCaches(self.diskO.diskPath)
 
-        superBlock = structures.super_block.SuperBlock(self.diskO)
-        decoder = common.decode.Decoder()
+        self.fileSystemJournalInode = None
 
-        blockTypeMap = self.getBlockTypeMap(superBlock)
+        return self.readJournalSuperBlock()
 
-        fileSystemJournalInode = structures.read_inode.Inode(self.diskO, superBlock.journalInode, superBlock, False, True)
+
+    def readJournalSuperBlock(self) -> journal.JournalSuperBlock:
+
+        """
+        Rereads the journal super block, emptying the block cache first so that journal blocks read afterwards are also reread.
+        Unlike refreshJournal, the kernel's caches are not flushed and the journal inode is only read if it has not been.
+        The journal of a mounted filesystem is written through the page cache of the disk, so reads of the disk
+        see it as it is written, and this is cheap enough to call on every poll of a journal being watched.
+
+        Returns
+        -------
+        journalSuperBlock : journal.JournalSuperBlock
+            The journal super block.
+        """
+
+        device = common.block_device.getBlockDevice(self.diskO.diskPath)
+        device.clearCache()
+
+        fileSystemJournalInode = self.readJournalInode()
 
         # Read Journal Super Block.
-        disk = open(self.diskO.diskPath, "rb")
-        disk.seek(fileSystemJournalInode.entries[0].blockNum * superBlock.blockSize)
-        jSuperData = disk.read(1024)
-        journalSuperBlock = journal.JournalSuperBlock(jSuperData)
-        disk.close
+        jSuperData = device.read(fileSystemJournalInode.entries[0].blockNum * self.superBlock.blockSize, 1024)
+
+        return journal.JournalSuperBlock(jSuperData)
+
+
+    def iterJournalBlocks(self, startBlockNum: int, endBlockNum: int):
+
+        """
+        Reads the journal blocks from startBlockNum up to (but not including) endBlockNum, in large contiguous chunks.
+
+        Parameters
+        ----------
+        startBlockNum : int
+            The first journal block to read, relative to the beginning of the journal.
+        endBlockNum : int
+            The journal block following the last block to read.
 
-        transactionList = []
+        Returns
+        -------
+        blocks : iterator[tuple]
+            Tuples (journal block number, block data), in order.
+        """
+
+        device = common.block_device.getBlockDevice(self.diskO.diskPath)
+        blockSize = self.superBlock.blockSize
 
-        journalBlockNum = 0
-        deleteLast = False
-        hasCommitBlock = True
         # An entry specifies the block numbers of the journal.
-        for entry in fileSystemJournalInode.entries:
+        for entry in self.fileSystemJournalInode.entries:
+
+            first = max(startBlockNum, entry.fileBlockNum) - entry.fileBlockNum
+            last = min(endBlockNum, entry.fileBlockNum + entry.numBlocks) - entry.fileBlockNum
 
-            disk = open(self.diskO.diskPath, "rb")
-            disk.seek(superBlock.blockSize * entry.blockNum)
+            for i in range(first, last, JOURNAL_READ_BLOCKS):
+                chunk = device.read(blockSize * (entry.blockNum + i), blockSize * min(JOURNAL_READ_BLOCKS, last - i))
 
-            for i in range(0, entry.numBlocks):
-                block = disk.read(superBlock.blockSize)
+                for chunkOffSet in range(0, len(chunk), blockSize):
+                    yield (entry.fileBlockNum + i + (chunkOffSet // blockSize), chunk[chunkOffSet:chunkOffSet + blockSize])
 
-                # Bytes 0-3 are a magic number indicating a journal transaction metadata block.
-                # The number in bytes 4-7 indicates the metadata block type. 1 is a descriptor block, 2 is a commit block.
-                if (decoder.beBytesToDecimal(block, 0, 3) == 3225106840) and (decoder.beBytesToDecimal(block, 4, 7) == 1):
-                    if deleteLast or not hasCommitBlock:
-                        transactionList.pop()
-                        deleteLast = False
 
-                    hasCommitBlock = False
+    def iterFileSystemJournal(self, startBlockNum: int = 0, lastSequence: int = None, refresh: bool = True):
 
-                    transactionList.append(journal.Transaction(block, journalBlockNum, blockTypeMap, journalSuperBlock, superBlock))
+        """
+        Reads the filesystem journal, yielding each committed transaction as soon as its commit block is read.
+        Transactions without a commit block (replaced by a later transaction, or still being written) are not yielded.
 
-                elif len(transactionList) > 0:
-                    # if this block in the journal is the commit block for the current transaction, set the commit time.
-                    if ((decoder.beBytesToDecimal(block, 0, 3) == 3225106840) and (decoder.beBytesToDecimal(block, 4, 7) == 2)
-                    and (decoder.beBytesToDecimal(block, 8, 11) == transactionList[-1].transactionNum)):
-                        transactionList[-1].commitTime = decoder.beBytesToDecimal(block, 48, 55)
-                        hasCommitBlock = True
+        Parameters
+        ----------
+        startBlockNum : int
+            The journal block at which to start reading. Used with lastSequence.
+        lastSequence : int
+            If this is None, the whole journal is read once around, starting at the tail of the log (or at its first block,
+            if the journal records no tail), so that a transaction which wraps around the end of the log is still read.
+            Otherwise, the log is followed from startBlockNum (wrapping around to the first log block),
+            passing over the data blocks of each transaction, until a transaction numbered lastSequence or lower
+            or a block which is not part of the log is reached. So only the newer transactions are read.
+        refresh : bool
+            Whether to reread the journal metadata (see refreshJournal) and the metadata block types first.
+            When following the log repeatedly, only the journal super block need be reread between calls.
 
-                    # if this block in the journal is a commit block, but not for the current transaction, remove the transaction.
-                    elif (decoder.beBytesToDecimal(block, 0, 3) == 3225106840) and (decoder.beBytesToDecimal(block, 4, 7) == 2) and (decoder.beBytesToDecimal(block, 8, 11) != transactionList[-1].transactionNum):
-                        if not hasCommitBlock:
-                            deleteLast = True
+        Returns
+        -------
+        transactions : iterator[journal.Transaction]
+            The committed transactions read, in journal order.
+        """
 
-                journalBlockNum += 1
+        if refresh or self.fileSystemJournalInode is None:
+            self.journalSuperBlock = self.refreshJournal()
+        journalSuperBlock = self.journalSuperBlock
+        superBlock = self.superBlock
+
+        if refresh or self.blockTypeMap is None:
+            self.blockTypeMap = self.getBlockTypeMap(superBlock)
+        blockTypeMap = self.blockTypeMap
+
+        # The log is read from the block after the journal super block to its end, then from its first block around to
+        # where reading started. The whole journal is read from the tail of the log (the oldest transaction which has not
+        # been checkpointed), so that the transactions from there on are read in the order they were written,
+        # even one whose commit block has wrapped around to the first log block.
+        # A journal which was cleanly unmounted records no tail (start is 0), and is read from its first log block.
+        journalLength = self.journalEntryEnds[-1]
+        if lastSequence is None:
+            startBlockNum = journalSuperBlock.start or journalSuperBlock.firstBlock
+        blocks = chain(self.iterJournalBlocks(startBlockNum, journalLength),
+            self.iterJournalBlocks(journalSuperBlock.firstBlock, startBlockNum))
+
+        # The transaction whose descriptor block has been read, but not yet its commit block.
+        currentTransaction = None
+        # When following the log, the number of data blocks of currentTransaction still to be passed over.
+        dataBlocksLeft = 0
+        # When reading the whole journal, the commit blocks read before the first descriptor block, as
+        # {transaction number: (journal block number, commit time)}. One may commit a transaction which wraps around
+        # the end of the log, whose descriptor block is only read last.
+        leadingCommits = {}
+        descriptorRead = False
+
+        for journalBlockNum, block in blocks:
+
+            if lastSequence is not None and dataBlocksLeft > 0:
+                dataBlocksLeft -= 1
+                continue
+
+            # Bytes 0-3 are a magic number indicating a journal transaction metadata block.
+            # The number in bytes 4-7 indicates the metadata block type. 1 is a descriptor block, 2 is a commit block.
+            header = journal.JOURNAL_HEADER.unpack(block)
+            if header.magic != 3225106840:
+                # When following the log, a block which is neither a data block nor a metadata block is past its end.
+                if lastSequence is not None:
+                    return
+                continue
+
+            # When following the log, a transaction from before the last scan marks the end of the new transactions.
+            if lastSequence is not None and header.blockType in (1, 2) and header.sequence <= lastSequence:
+                return
+
+            if header.blockType == 1:
+                # A transaction which was not committed before the next descriptor block is discarded.
+                currentTransaction = journal.Transaction(block, journalBlockNum, blockTypeMap, journalSuperBlock, superBlock)
+                dataBlocksLeft = len(currentTransaction.dataBlocks)
+                descriptorRead = True
+
+            elif lastSequence is None and not descriptorRead and header.blockType == 2:
+                leadingCommits[header.sequence] = (journalBlockNum, journal.COMMIT_HEADER.unpack(block).commitTime)
+
+            elif currentTransaction is not None and header.blockType == 2:
+                # if this block in the journal is the commit block for the current transaction, set the commit time.
+                if header.sequence == currentTransaction.transactionNum:
+                    currentTransaction.commitTime = journal.COMMIT_HEADER.unpack(block).commitTime
+                    currentTransaction.commitBlockNum = journalBlockNum
+                    yield currentTransaction
+
+                # if this block in the journal is a commit block, but not for the current transaction, the transaction is discarded.
+                currentTransaction = None
+
+        # The last transaction read may have been committed by a commit block read at the start, after wrapping around.
+        if currentTransaction is not None and currentTransaction.transactionNum in leadingCommits:
+            currentTransaction.commitBlockNum, currentTransaction.commitTime = leadingCommits[currentTransaction.transactionNum]
+            yield currentTransaction
+
+
+    def readIncremental(self) -> list:
 
-            disk.close
+        """
+        Reads the filesystem journal, reusing the transactions found by the previous scan of this filesystem.
+        The journal cache records, for each filesystem UUID, the transactions found, the last transaction number,
+        and the journal block following its commit block. Only the log written after that block is read
+        (see readCachedJournal). The whole journal is read if the cache cannot be used.
+
+        Returns
+        -------
+        Explicit:
+        transactionList : list[journal.Transaction]
+            The committed transactions in the journal, cached transactions first.
+
+        Implicit:
+            Updates the journal cache entry of this filesystem.
+        """
+
+        transactionList = self.readCachedJournal()
+        if transactionList is None:
+            transactionList = list(self.iterFileSystemJournal(refresh=False))
+
+        self.storeCachedJournal(transactionList)
 
         return transactionList
 
 
-    def getBlockTypeMap(self, superBlock: structures.super_block.SuperBlock) -> dict:
+    def readCachedJournal(self) -> list:
+
+        """
+        Reads the part of the journal written since the previous scan of this filesystem, returning it with the cached
+        transactions whose journal blocks have not since been overwritten.
+        The journal cache cannot be used if there is no entry for this filesystem, if the commit block of the last cached
+        transaction has been overwritten, or if the log did not continue from the block after it
+        (as after the filesystem is remounted, when the log restarts from its first block).
+        The journal metadata is reread first (see refreshJournal), so the whole journal may then be read with refresh set to False.
+        Is a helper method for readCachedJournal.
+
+        Returns
+        -------
+        transactionList : list[journal.Transaction]
+            The committed transactions in the journal, cached transactions first. None if the journal cache cannot be used.
+        """
+
+        journalSuperBlock = self.refreshJournal()
+        self.journalSuperBlock = journalSuperBlock
+
+        cache = common.persistent_cache.PersistentCache(JOURNAL_CACHE_NAME)
+        journalLocation = (self.fileSystemJournalInode.entries[0].blockNum, self.journalEntryEnds[-1])
+
+        state = cache.load(self.superBlock.uuid)
+        if state is None or state["journalLocation"] != journalLocation or not self.hasCommitBlock(state["lastCommitBlockNum"], state["lastSequence"]):
+            return None
+
+        newTransactions = list(self.iterFileSystemJournal(state["nextBlockNum"], state["lastSequence"], False))
+
+        # The new transactions must continue directly from the last cached transaction.
+        if len(newTransactions) > 0 and newTransactions[0].transactionNum == state["lastSequence"] + 1:
+            overwritten = self.getCircularRanges(state["nextBlockNum"], newTransactions[-1].commitBlockNum)
+            transactionList = [transaction for transaction in state["transactions"]
+                if not self.rangesOverlap(overwritten, self.getCircularRanges(transaction.journalBlockNum, transaction.commitBlockNum))]
+            return transactionList + newTransactions
+
+        if len(newTransactions) == 0 and journalSuperBlock.sequence <= state["lastSequence"] + 1:
+            return state["transactions"]
+
+        return None
+
 
+    def storeCachedJournal(self, transactionList: list):
+
+        """
+        Stores the transactions found in the journal cache entry of this filesystem, for the next incremental scan.
+        Is a helper method for readIncremental and iterIndexedJournal.
+
+        Parameters
+        ----------
+        transactionList : list[journal.Transaction]
+            All of the committed transactions in the journal.
         """
-        Reads through filesystem metadata to create a dictionary associating block numbers with metadata block type.
+
+        cache = common.persistent_cache.PersistentCache(JOURNAL_CACHE_NAME)
+        journalLocation = (self.fileSystemJournalInode.entries[0].blockNum, self.journalEntryEnds[-1])
+
+        if len(transactionList) > 0:
+            lastTransaction = max(transactionList, key=lambda transaction: transaction.transactionNum)
+            nextBlockNum = lastTransaction.commitBlockNum + 1
+            if nextBlockNum >= self.journalEntryEnds[-1]:
+                nextBlockNum = self.journalSuperBlock.firstBlock
+
+            cache.store(self.superBlock.uuid, {"journalLocation": journalLocation, "transactions": transactionList,
+                "lastSequence": lastTransaction.transactionNum, "lastCommitBlockNum": lastTransaction.commitBlockNum,
+                "nextBlockNum": nextBlockNum})
+        else:
+            cache.remove(self.superBlock.uuid)
+
+
+    def iterIndexedJournal(self, transactionList: list, blockIndex: dict, refresh: bool = True, storeCache: bool = False):
+
+        """
+        Reads the whole filesystem journal, yielding each committed transaction as soon as it is read (see iterFileSystemJournal),
+        after appending it to transactionList and adding its blocks to blockIndex.
+        Used to list the deleted inodes while the rest of the journal is still being read, rather than after the whole journal
+        has been read: once the iterator is exhausted, transactionList and blockIndex are as readFileSystemJournal would give.
+
+        Parameters
+        ----------
+        transactionList : list[journal.Transaction]
+            The list to which the transactions read are appended.
+        blockIndex : dict[int, list[tuple]]
+            The block index to which the transactions read are added (see indexTransactions).
+        refresh : bool
+            Whether to reread the journal metadata first. It need not be if readCachedJournal has just been called.
+        storeCache : bool
+            Whether to store the transactions in the journal cache once the whole journal has been read (see readIncremental).
+
+        Returns
+        -------
+        Explicit:
+        transactions : iterator[journal.Transaction]
+            The committed transactions read, in journal order.
+
+        Implicit:
+            Sets blockIndex as the block index of this object once the whole journal has been read.
+        """
+
+        for transaction in self.iterFileSystemJournal(refresh=refresh):
+            transactionList.append(transaction)
+            self.indexTransaction(blockIndex, transaction)
+            yield transaction
+
+        self.blockIndex = blockIndex
+
+        if storeCache:
+            self.storeCachedJournal(transactionList)
+
+
+    def hasCommitBlock(self, journalBlockNum: int, sequence: int) -> bool:
+
+        """
+        Checks whether a journal block still contains the commit block of the given transaction.
+        Is a helper method for readCachedJournal.
+
+        Parameters
+        ----------
+        journalBlockNum : int
+            The journal block, relative to the beginning of the journal.
+        sequence : int
+            The transaction number.
+
+        Returns
+        -------
+        hasCommitBlock : bool
+            True if the block is the commit block of the transaction.
+        """
+
+        for blockNum, block in self.iterJournalBlocks(journalBlockNum, journalBlockNum + 1):
+            header = journal.JOURNAL_HEADER.unpack(block)
+            return header.magic == 3225106840 and header.blockType == 2 and header.sequence == sequence
+
+        return False
+
+
+    def getCircularRanges(self, startBlockNum: int, endBlockNum: int) -> list:
+
+        """
+        Converts a range of journal blocks, which may wrap around the end of the log, into ranges which do not.
+        Is a helper method for readCachedJournal.
+
+        Parameters
+        ----------
+        startBlockNum : int
+            The first journal block of the range.
+        endBlockNum : int
+            The last journal block of the range (inclusive).
+
+        Returns
+        -------
+        ranges : list[tuple]
+            Tuples (first block, last block), inclusive.
+        """
+
+        if endBlockNum >= startBlockNum:
+            return [(startBlockNum, endBlockNum)]
+
+        return [(startBlockNum, self.journalEntryEnds[-1] - 1), (self.journalSuperBlock.firstBlock, endBlockNum)]
+
+
+    def rangesOverlap(self, ranges: list, otherRanges: list) -> bool:
+
+        """
+        Checks whether any of the inclusive ranges of journal blocks in ranges overlaps any in otherRanges.
+        Is a helper method for readCachedJournal.
+
+        Parameters
+        ----------
+        ranges : list[tuple]
+            Tuples (first block, last block).
+        otherRanges : list[tuple]
+            Tuples (first block, last block).
+
+        Returns
+        -------
+        overlap : bool
+            True if any of the ranges overlap.
+        """
+
+        return any(start <= otherEnd and otherStart <= end for start, end in ranges for otherStart, otherEnd in otherRanges)
+
+
+    def indexTransactions(self, transactions: list) -> dict:
+
+        """
+        Builds an index from filesystem block numbers to the journal copies of those blocks.
+        Only transactions which contain an inode table block (transaction types 0 and 1) are indexed,
+        as these are the only ones used in the file recovery process.
+
+        Parameters
+        ----------
+        transactions : list[journal.Transaction]
+            The transactions to index.
+
+        Returns
+        -------
+        blockIndex : dict[int, list[tuple]]
+            Maps each filesystem block number to a list of tuple (transactionNum, journalBlockNum),
+            one for each copy of the block in the journal, newest transaction first.
+        """
+
+        blockIndex: dict = {}
+
+        for transaction in sorted(transactions, key=lambda transaction: -transaction.transactionNum):
+            self.indexTransaction(blockIndex, transaction)
+
+        return blockIndex
+
+
+    def indexTransaction(self, blockIndex: dict, transaction):
+
+        """
+        Adds the copies of filesystem blocks in a transaction to a block index, keeping the copies of each block newest first.
+        Transactions which contain no inode table block (transaction type 2) are not indexed.
+        Is a helper method for indexTransactions and iterIndexedJournal.
+
+        Parameters
+        ----------
+        blockIndex : dict[int, list[tuple]]
+            The block index (see indexTransactions).
+        transaction : journal.Transaction
+            The transaction to add.
+        """
+
+        # if Transaction is not useful, move on
+        if transaction.transactionType == 2:
+            return
+
+        # The data blocks of a transaction follow its descriptor block in the journal, in order.
+        journalBlockNum = transaction.journalBlockNum + 1
+        for dataBlock in transaction.dataBlocks:
+            copies = blockIndex.setdefault(dataBlock[0], [])
+
+            # Transactions are mostly added newest first (by indexTransactions), or oldest first (as the journal is read).
+            position = len(copies)
+            while position > 0 and copies[position - 1][0] < transaction.transactionNum:
+                position -= 1
+            copies.insert(position, (transaction.transactionNum, journalBlockNum))
+
+            journalBlockNum += 1
+
+
+    def getBlockTypeMap(self, superBlock: structures.super_block.SuperBlock) -> journal.BlockTypeIndex:
+
+        """
+        Reads through filesystem metadata to create an index associating block numbers with metadata block type.
         These block types can be inode table blocks, data bitmap blocks, inode bitmap blocks, and group descriptor Blocks.
         This is a helper method for readFileSystemJournal.
 
@@ -131,46 +616,42 @@ class ReadJournal:
 
         Returns
         -------
-        blockTypeMap : dict[int, str]
-            A dictionary associating block numbers with metadata block type.
+        blockTypeMap : journal.BlockTypeIndex
+            An index associating ranges of block numbers with metadata block type.
         """
 
         blockSize = superBlock.blockSize
         blocksPerGroup = superBlock.blocksPerGroup
         inodesPerGroup = superBlock.inodesPerGroup
         inodeSize = superBlock.inodeSize
-        numDescriptorsPerBlock = (blockSize / superBlock.groupDescriptorSize)
+        numDescriptorsPerBlock = blockSize // superBlock.groupDescriptorSize
 
-        blockTypeMap = {}
-
-        descriptorBlockNum = 1
-        descriptorNumInBlock = 0
-
-        # numBlocks / blocksPerGroup represents the number of groups.
-        for descriptorNum in range(0, int(superBlock.numBlocks / blocksPerGroup)):
+        iTableBlocks = ceil((inodesPerGroup * inodeSize) / blockSize)
+        dBitmapBlocks = ceil(blocksPerGroup / (blockSize * 8))
+        iBitmapBlocks = ceil(inodesPerGroup / (blockSize * 8))
 
-            groupDescriptor = structures.group_descriptor.GroupDescriptor(self.diskO, descriptorNum, superBlock)
+        groupDescriptorTable = structures.group_descriptor.GroupDescriptorTable(self.diskO, superBlock)
 
-            inodeTableLoc = groupDescriptor.inodeTableLoc
+        ranges = []
 
-            for iTableBlockNum in range(inodeTableLoc, inodeTableLoc + ceil((inodesPerGroup * inodeSize) / blockSize)):
-                blockTypeMap.update({iTableBlockNum:"iTableBlock"})
-
-            for dBitmapBlockNum in range(groupDescriptor.blockBitMapLoc, groupDescriptor.blockBitMapLoc + ceil(blocksPerGroup / (blockSize * 8))):
-                blockTypeMap.update({dBitmapBlockNum:"dBitmapBlock"})
-
-            for iBitmapBlockNum in range(groupDescriptor.inodeBitMapLoc, groupDescriptor.inodeBitMapLoc + ceil(inodesPerGroup / (blockSize * 8))):
-                blockTypeMap.update({iBitmapBlockNum:"iBitmapBlock"})
+        # numBlocks / blocksPerGroup represents the number of groups.
+        numGroups = int(superBlock.numBlocks / blocksPerGroup)
+        for descriptorNum in range(0, numGroups):
 
-            if descriptorNumInBlock == 1:
-                blockTypeMap.update({descriptorBlockNum:"GroupDescriptorBlock"})
+            inodeTableLoc = groupDescriptorTable.inodeTableLoc[descriptorNum]
+            blockBitMapLoc = groupDescriptorTable.blockBitMapLoc[descriptorNum]
+            inodeBitMapLoc = groupDescriptorTable.inodeBitMapLoc[descriptorNum]
 
-            elif descriptorNumInBlock == numDescriptorsPerBlock:
-                descriptorBlockNum += 1
+            ranges.append((inodeTableLoc, inodeTableLoc + iTableBlocks, "iTableBlock"))
+            ranges.append((blockBitMapLoc, blockBitMapLoc + dBitmapBlocks, "dBitmapBlock"))
+            ranges.append((inodeBitMapLoc, inodeBitMapLoc + iBitmapBlocks, "iBitmapBlock"))
 
-            descriptorNumInBlock = (descriptorNumInBlock % numDescriptorsPerBlock) + 1
+        # Group descriptor blocks are counted from block 1. The first descriptor of every descriptor block
+        # but the first is marked along with the second descriptor of the first block.
+        if numGroups >= 2:
+            ranges.append((1, (numGroups - 2) // numDescriptorsPerBlock + 2, "GroupDescriptorBlock"))
 
-        return blockTypeMap
+        return journal.BlockTypeIndex(ranges)
 
 
     def readJournalBlock(self, journalBlockNum: int) -> bytes:
@@ -188,28 +669,20 @@ class ReadJournal:
                 The bytes contained on the journal block which was read.
         """
 
-        superBlock = structures.super_block.SuperBlock(self.diskO)
-        fileSystemJournalInode = structures.read_inode.Inode(self.diskO, superBlock.journalInode, superBlock, False, True)
-
-        # (fileSystemJournalInode.entries[-1].fileBlockNum + fileSystemJournalInode.entries[-1].numBlocks) - 1 is the
-        # last block number in the journal. journalBlockNum is modded with it in order to allow wraparound
-        # to the beginning of the journal, incase the journal has wrapped around.
-        journalBlockNum = (journalBlockNum %
-            ((fileSystemJournalInode.entries[-1].fileBlockNum + fileSystemJournalInode.entries[-1].numBlocks) - 1))
-
-        if journalBlockNum == 0:
-            journalBlockNum = fileSystemJournalInode.entries[-1].fileBlockNum + fileSystemJournalInode.entries[-1].numBlocks
+        fileSystemJournalInode = self.readJournalInode()
+        superBlock = self.superBlock
 
-        blockEntry = ()
-        for entry in fileSystemJournalInode.entries:
-            if entry.fileBlockNum + entry.numBlocks >= journalBlockNum:
-                blockEntry = entry
-                break
+        # self.journalEntryEnds[-1] - 1 is the last block number in the journal. A block number past it (the data blocks of a
+        # transaction which has wrapped around) continues from the first log block, after the journal super block.
+        journalLength = self.journalEntryEnds[-1]
+        if journalBlockNum >= journalLength:
+            firstBlock = self.journalSuperBlock.firstBlock if self.journalSuperBlock is not None else 1
+            journalBlockNum = firstBlock + ((journalBlockNum - firstBlock) % (journalLength - firstBlock))
 
+        # The entry containing the block is the first entry which ends after it (the ends are exclusive).
+        blockEntry = fileSystemJournalInode.entries[bisect_right(self.journalEntryEnds, journalBlockNum)]
 
-        disk = open(self.diskO.diskPath, "rb")
-        disk.seek(superBlock.blockSize * (blockEntry.blockNum + (journalBlockNum - blockEntry.fileBlockNum)))
-        data = disk.read(superBlock.blockSize)
-        disk.close()
+        device = common.block_device.getBlockDevice(self.diskO.diskPath)
+        data = device.readBlock(blockEntry.blockNum + (journalBlockNum - blockEntry.fileBlockNum), superBlock.blockSize)
 
         return data
@@ -1 +1,3 @@
-from src.EXT.recovery import recovery_journaled, recovery_no_journal
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("recovery_journaled", "recovery_no_journal"))
\ No newline at end of file
@@ -1,8 +1,9 @@
 
 
+from concurrent.futures import Future
 import time
-from math import floor
 
+from src import common
 from src.EXT import structures
 from src.EXT import journal
 
@@ -14,17 +15,33 @@ class FileRecoveryJournaled:
 
     Methods
     -------
-    recoverFiles(self, diskO: disks.Disk, transactions: list, deletedInodes: list, numToRecover: int, filePath: str)
+    recoverFiles(self, diskO: disks.Disk, transactions: list, deletedInodes: list, numToRecover: int, filePath: str, blockIndex: dict = None,
+    executor: recovery_executor.RecoveryExecutor = None)
         Attempts to recover the files that the user has selected.
-    getDeletedInodes(self, diskO: disks.Disk, transactions: list)
+    submitFiles(self, executor: recovery_executor.RecoveryExecutor, diskO: disks.Disk, transactions: list, deletedInodes: list,
+    numToRecover: int, outputPath: str, blockIndex: dict = None) -> list[Future]
+        Finds the files that the user has selected, and submits their recovery to executor.
+    recoverFile(self, copyEngine: copy_engine.CopyEngine, inode: read_inode.Inode, superBlock: super_block.SuperBlock, filePath: str) -> bool
+        Recovers a single file, given its inode from before the deletion.
+    getDeletedInodes(self, diskO: disks.Disk, transactions: list, useCache: bool = False)
         Gets a list of all deleted inodes, as recorded in journal deletion transactions.
+    iterDeletedInodeBatches(self, diskO: disks.Disk, transactions: list, useCache: bool = False) -> iterator[tuple]
+        Yields the deleted inodes recorded in each transaction, with the fraction of the transactions read so far.
+    iterDeletedInodes(self, diskO: disks.Disk, transactions: iterable)
+        Yields the deleted inodes recorded in each deletion transaction, as the transactions are read.
+    iterJournalInodeBatches(self, diskO: disks.Disk, transactionList: list, blockIndex: dict, useCache: bool = False) -> iterator[tuple]
+        Reads the journal, yielding the deleted inodes it records as soon as they are found.
+    readDeletionTransaction(self, diskO: disks.Disk, transaction: journal.Transaction, superBlock: super_block.SuperBlock,
+    readJournal: read_journal.ReadJournal) -> list
+        Reads the inode table blocks of a deletion transaction, returning the inodes deleted by the transaction.
     readInodeTableBlock(self, diskO: disks.Disk, block: bytes, blockNum: int, superBlock: super_block.SuperBlock)
         Given data from a block, reads all inodes in that
         block and returns a list of the ones which have been deleted.
     """
 
 
-    def recoverFiles(self, diskO: structures.disks.Disk, transactions: list, deletedInodes: list, numToRecover: int, outputPath: str):
+    def recoverFiles(self, diskO: structures.disks.Disk, transactions: list, deletedInodes: list, numToRecover: int, outputPath: str,
+    blockIndex: dict = None, executor: common.recovery_executor.RecoveryExecutor = None):
 
         """
         Attempts to recover the files that the user has selected.
@@ -44,6 +61,12 @@ class FileRecoveryJournaled:
             The number of files in deletedInodes which the user wishes to recover.
         outputPath: str
             The path of the output directory.
+        blockIndex : dict[int, list[tuple]]
+            The index from filesystem block numbers to their journal copies, as built by
+            read_journal.ReadJournal.readFileSystemJournal for transactions.
+            If this is None, it is built from transactions.
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files in parallel. If this is None, one is created for these files.
 
         Returns
         -------
@@ -56,59 +79,130 @@ class FileRecoveryJournaled:
             Writes recovered files to outputPath/recoveredFile_%s.
         """
 
+        if executor is None:
+            with common.recovery_executor.RecoveryExecutor() as executor:
+                return self.recoverFiles(diskO, transactions, deletedInodes, numToRecover, outputPath, blockIndex, executor)
+
+        futures = self.submitFiles(executor, diskO, transactions, deletedInodes, numToRecover, outputPath, blockIndex)
+
+        return sum(executor.getResults(futures))
+
+
+    def submitFiles(self, executor: common.recovery_executor.RecoveryExecutor, diskO: structures.disks.Disk, transactions: list,
+    deletedInodes: list, numToRecover: int, outputPath: str, blockIndex: dict = None) -> list:
+
+        """
+        Finds the files that the user has selected, and submits their recovery to executor.
+        The inodes are found in the journal before submitting, so that the size of each file is known.
+
+        Parameters
+        ----------
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files.
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        transactions : list[journal.Transaction]
+            List of all transactions in the journal represented as journal.Transaction objects.
+        deletedInodes : list[tuple]
+            List of the inodes which the user selected for recovery, of the form
+            (block num of inode table, offset within inode table, deletion time).
+        numToRecover : int
+            The number of files in deletedInodes which the user wishes to recover.
+        outputPath: str
+            The path of the output directory.
+        blockIndex : dict[int, list[tuple]]
+            The index from filesystem block numbers to their journal copies. If this is None, it is built from transactions.
+
+        Returns
+        -------
+        futures : list[Future]
+            A future for each file in deletedInodes[0:numToRecover], in order.
+            Its result is True if the file was recovered, and False if no copy of its inode with block pointers was found.
+        """
+
         superBlock: structures.super_block.SuperBlock = structures.super_block.SuperBlock(diskO)
         readJournal: journal.read_journal.ReadJournal = journal.read_journal.ReadJournal(diskO)
 
+        copyEngine = common.copy_engine.CopyEngine(common.block_device.getBlockDevice(diskO.diskPath))
+
         toRecover: list[tuple] = deletedInodes[0:numToRecover]
 
+        if blockIndex is None:
+            blockIndex = readJournal.indexTransactions(transactions)
+
+        futures = []
 
         numRecovered = 0
         for deletedInode in toRecover:
-            for transaction in transactions:
 
-                # if Transaction is not useful, move on
-                if transaction.transactionType == 2:
-                    continue
+            future = None
 
-                journalBlockNum = transaction.journalBlockNum + 1
+            # The journal copies of the inode table block containing the inode, newest first.
+            # The newest copy which still has block pointers is from before the deletion.
+            for transactionNum, journalBlockNum in blockIndex.get(deletedInode[0], []):
 
-                # This flag is set to true when the file is recovered, indicating that the nested loops should be broken out of.
-                breakFlag = False
-                for dataBlock in transaction.dataBlocks:
+                iTableBlock = readJournal.readJournalBlock(journalBlockNum)
+                inode = structures.read_inode.Inode(diskO, deletedInode[1], superBlock, iTableBlock, True)
 
-                    if dataBlock[0] == deletedInode[0]:
+                if inode.hasBlockPointers:
 
-                        iTableBlock = readJournal.readJournalBlock(journalBlockNum)
-                        inode = structures.read_inode.Inode(diskO, deletedInode[1], superBlock, iTableBlock, True)
+                    numRecovered += 1
 
-                        if inode.hasBlockPointers:
+                    filePath = "%s/recoveredFile_%s" % (outputPath,
+                    (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(deletedInode[2])) + f"_num_{numRecovered}"))
 
-                            numRecovered += 1
+                    numBytes = superBlock.blockSize * sum(entry.numBlocks for entry in inode.entries)
+                    future = executor.submit(self.recoverFile, numBytes, copyEngine, inode, superBlock, filePath)
 
-                            recoveredFile = (open("%s/recoveredFile_%s" % (outputPath,
-                            (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(deletedInode[2])) + f"_num_{numRecovered}")), "ab"))
+                    break
 
-                            for entry in inode.entries:
-                                disk = open(diskO.diskPath, "rb")
-                                disk.seek(superBlock.blockSize * entry.blockNum)
+            if future is None:
+                future = Future()
+                future.set_result(False)
 
-                                for i in range(0, entry.numBlocks):
-                                    recoveredFile.write(disk.read(superBlock.blockSize))
+            futures.append(future)
 
-                                disk.close
-                            recoveredFile.close
+        return futures
 
-                            breakFlag = True
-                            break
 
-                    journalBlockNum += 1
+    def recoverFile(self, copyEngine: common.copy_engine.CopyEngine, inode: structures.read_inode.Inode,
+    superBlock: structures.super_block.SuperBlock, filePath: str) -> bool:
 
-                if breakFlag:
-                    break
+        """
+        Recovers a single file, given its inode from before the deletion.
+
+        Parameters
+        ----------
+        copyEngine : copy_engine.CopyEngine
+            Copies the data of the file from the disk.
+        inode : read_inode.Inode
+            The inode of the file, with its block pointers.
+        superBlock : super_block.SuperBlock
+            The super block associated with the filesystem.
+        filePath : str
+            The path of the recovered file.
+
+        Returns
+        -------
+        Explicit:
+        recovered : bool
+            True once the file is recovered.
+
+        Implicit:
+            Writes the recovered file to filePath.
+        """
+
+        recoveredFile = open(filePath, "wb")
+
+        # Each entry is a contiguous run of blocks, copied at once.
+        for entry in inode.entries:
+            copyEngine.copyRun(recoveredFile, superBlock.blockSize * entry.blockNum, superBlock.blockSize * entry.numBlocks)
+
+        recoveredFile.close()
 
-        return numRecovered
+        return True
 
-    def getDeletedInodes(self, diskO: structures.disks.Disk, transactions: list):
+    def getDeletedInodes(self, diskO: structures.disks.Disk, transactions: list, useCache: bool = False):
 
         """
         Gets a list of all deleted inodes, as recorded in journal deletion transactions.
@@ -119,6 +213,9 @@ class FileRecoveryJournaled:
             The disk object associated with the filesystem.
         transactions : list[journal.Transaction]
             Used to look at each deletion transaction for the inodes which were deleted.
+        useCache : bool
+            If True, the result of the previous scan of this filesystem is returned if neither the filesystem
+            nor the transactions have changed since (see scan_cache.ScanCache), and the result of a new scan is stored.
 
         Returns
         -------
@@ -128,33 +225,184 @@ class FileRecoveryJournaled:
             (block num of inode table, offset within inode table, deletion time).
         """
 
+        deletedInodes: list = [inode for batch, fraction in self.iterDeletedInodeBatches(diskO, transactions, useCache) for inode in batch]
+
+        deletedInodes.sort(key=lambda inode: -inode[2])
+
+        return deletedInodes
+
+
+    def iterDeletedInodeBatches(self, diskO: structures.disks.Disk, transactions: list, useCache: bool = False):
+
+        """
+        Yields the deleted inodes recorded in each transaction, with the fraction of the transactions read so far.
+        Used to show the deleted inodes while the scan continues (see background_scan.BackgroundScan).
+
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        transactions : list[journal.Transaction]
+            Used to look at each deletion transaction for the inodes which were deleted.
+        useCache : bool
+            If True, the result of the previous scan of this filesystem is yielded at once if neither the filesystem
+            nor the transactions have changed since (see scan_cache.ScanCache), and the result of a new, complete scan is stored.
+
+        Returns
+        -------
+        batches : iterator[tuple]
+            Tuples (deletedInodes, fraction), where deletedInodes is a list of tuples
+            (block num of inode table, offset within inode table, deletion time).
+        """
+
         superBlock = structures.super_block.SuperBlock(diskO)
         readJournal = journal.read_journal.ReadJournal(diskO)
 
-        deletionTransactions: list[journal.journal.Transaction] = []
+        # The deleted inodes depend only on the transactions, so the newest transaction and the number of transactions
+        # are part of the change indicator.
+        scanCache = common.scan_cache.ScanCache()
+        changeIndicator = superBlock.changeIndicator + (max((transaction.transactionNum for transaction in transactions), default=0),
+            len(transactions))
+        if useCache:
+            cachedInodes = scanCache.load("ext journal", superBlock.uuid, changeIndicator)
+            if cachedInodes is not None:
+                yield (cachedInodes, 1.0)
+                return
+
+        deletedInodes = []
+
+        for transactionNum, transaction in enumerate(transactions):
+            transactionInodes = self.readDeletionTransaction(diskO, transaction, superBlock, readJournal)
+            deletedInodes.extend(transactionInodes)
+            yield (transactionInodes, (transactionNum + 1) / len(transactions))
+
+        if useCache:
+            deletedInodes.sort(key=lambda inode: -inode[2])
+            scanCache.store("ext journal", superBlock.uuid, changeIndicator, deletedInodes)
+
+
+    def iterDeletedInodes(self, diskO: structures.disks.Disk, transactions):
+
+        """
+        Yields the deleted inodes recorded in each deletion transaction, as the transactions are read.
+        transactions may be read_journal.ReadJournal.iterFileSystemJournal, so that deleted inodes
+        are found while the rest of the journal is still being read.
+
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        transactions : iterable[journal.Transaction]
+            Used to look at each deletion transaction for the inodes which were deleted.
+
+        Returns
+        -------
+        deletedInodes : iterator[tuple]
+            The deleted inodes in journal deletion transactions, in the order of the transactions.
+            inodes in this case are stored as a tuple of the form
+            (block num of inode table, offset within inode table, deletion time).
+        """
+
+        superBlock = structures.super_block.SuperBlock(diskO)
+        readJournal = journal.read_journal.ReadJournal(diskO)
 
         for transaction in transactions:
-            if transaction.transactionType == 0:
-                deletionTransactions.append(transaction)
+            yield from self.readDeletionTransaction(diskO, transaction, superBlock, readJournal)
 
-        deletedInodes: list = []
 
-        for transaction in deletionTransactions:
+    def iterJournalInodeBatches(self, diskO: structures.disks.Disk, transactionList: list, blockIndex: dict, useCache: bool = False):
+
+        """
+        Reads the journal, yielding the deleted inodes it records as soon as they are found.
+        When the whole journal is read, the deleted inodes of each deletion transaction are yielded as soon as the transaction
+        is read (see iterDeletedInodes), so the first deletions are found at once, and the transactions are indexed as they go by.
+        With useCache, only the part of the journal written since the previous scan is read, if the journal cache can be used
+        (see read_journal.ReadJournal.readCachedJournal). All of the transactions are then known at once,
+        so the deleted inodes may also be loaded from the scan cache (see iterDeletedInodeBatches).
+
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        transactionList : list[journal.Transaction]
+            The list to which the transactions in the journal are added, for recoverFiles. Sorted newest first once the scan is complete.
+        blockIndex : dict[int, list[tuple]]
+            The block index to which the transactions are added, for recoverFiles. Until the scan is complete,
+            it only indexes the transactions read so far.
+        useCache : bool
+            Whether to use and update the journal cache and the scan cache.
+
+        Returns
+        -------
+        Explicit:
+        batches : iterator[tuple]
+            Tuples (deletedInodes, fraction), where deletedInodes is a list of tuples
+            (block num of inode table, offset within inode table, deletion time). fraction is None while the whole journal is read.
+
+        Implicit:
+            Adds the transactions in the journal to transactionList and blockIndex.
+        """
 
-            blockBuffer = 1
-            for block in transaction.dataBlocks:
+        readJournal = journal.read_journal.ReadJournal(diskO)
 
-                if block[1] == "iTableBlock":
+        transactions = readJournal.readCachedJournal() if useCache else None
 
-                    blockData = readJournal.readJournalBlock(transaction.journalBlockNum + blockBuffer)
+        if transactions is not None:
+            readJournal.storeCachedJournal(transactions)
+            transactionList.extend(transactions)
+            blockIndex.update(readJournal.indexTransactions(transactions))
+            yield from self.iterDeletedInodeBatches(diskO, transactions, useCache)
 
-                    for inode in self.readInodeTableBlock(diskO, blockData, block[0], superBlock):
-                        if transaction.commitTime - inode[2] < 12:
-                            deletedInodes.append(inode)
+        else:
+            # The journal metadata has just been reread by readCachedJournal if useCache is set.
+            journalTransactions = readJournal.iterIndexedJournal(transactionList, blockIndex, not useCache, useCache)
+            for inode in self.iterDeletedInodes(diskO, journalTransactions):
+                yield ([inode], None)
 
-                blockBuffer += 1
+        transactionList.sort(key=lambda transaction: -transaction.transactionNum)
 
-        deletedInodes.sort(key=lambda inode: -inode[2])
+
+    def readDeletionTransaction(self, diskO: structures.disks.Disk, transaction, superBlock: structures.super_block.SuperBlock,
+    readJournal: journal.read_journal.ReadJournal) -> list:
+
+        """
+        Reads the inode table blocks of a deletion transaction, returning the inodes deleted by the transaction.
+        Is a helper method for iterDeletedInodes and iterDeletedInodeBatches.
+
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        transaction : journal.Transaction
+            The transaction. Transactions which are not deletion transactions contain no deleted inodes.
+        superBlock : super_block.SuperBlock
+            The super block associated with the filesystem.
+        readJournal : read_journal.ReadJournal
+            Reads the blocks of the transaction from the journal.
+
+        Returns
+        -------
+        deletedInodes : list[tuple]
+            The deleted inodes, as tuples (block num of inode table, offset within inode table, deletion time).
+        """
+
+        deletedInodes = []
+
+        if transaction.transactionType != 0:
+            return deletedInodes
+
+        blockBuffer = 1
+        for block in transaction.dataBlocks:
+
+            if block[1] == "iTableBlock":
+
+                blockData = readJournal.readJournalBlock(transaction.journalBlockNum + blockBuffer)
+
+                for inode in self.readInodeTableBlock(diskO, blockData, block[0], superBlock):
+                    if transaction.commitTime - inode[2] < 12:
+                        deletedInodes.append(inode)
+
+            blockBuffer += 1
 
         return deletedInodes
 
@@ -187,14 +435,11 @@ class FileRecoveryJournaled:
 
         deletedInodes: list = []
 
-        numInodesInBlock = floor(superBlock.blockSize / superBlock.inodeSize)
-
-        for inodeNum in range(0, numInodesInBlock):
-
-            inode = structures.read_inode.Inode(diskO, inodeNum, superBlock, block, False)
+        inodeTable = structures.inode_table.InodeTable(block, diskO.diskType, superBlock)
 
-            if inode.deletionTime > 0 and not inode.hasBlockPointers:
-                # each deleted inode is represented as a tuple(inode table block num, inode number within the table block starting at 0, inode deletion time)
-                deletedInodes.append((blockNum, inodeNum, inode.deletionTime))
+        # Deleted inodes in ext3/4 have their block pointers cleared.
+        for inodeNum, deletionTime in inodeTable.getDeletedInodes(False):
+            # each deleted inode is represented as a tuple(inode table block num, inode number within the table block starting at 0, inode deletion time)
+            deletedInodes.append((blockNum, inodeNum, deletionTime))
 
         return deletedInodes
@@ -2,12 +2,15 @@
 
 from math import ceil
 import time
-import os
 
 from src import common
 from src.EXT import structures
 
 
+# The number of inode table blocks read at once when scanning inode tables sequentially.
+INODE_TABLE_READ_BLOCKS = 256
+
+
 class FileRecoveryNoJournal:
 
     """
@@ -15,18 +18,31 @@ class FileRecoveryNoJournal:
 
     Methods
     -------
-    recoverFiles(self, diskO: disks.Disk, deletedInodes: list[tuple], numToRecover: int, outputPath: str)
+    recoverFiles(self, diskO: disks.Disk, deletedInodes: list[tuple], numToRecover: int, outputPath: str,
+    executor: recovery_executor.RecoveryExecutor = None)
         Attempts to recover the files that the user has selected.
-    getDeletedInodes(self, diskO: disks.Disk)
+    submitFiles(self, executor: recovery_executor.RecoveryExecutor, diskO: disks.Disk, deletedInodes: list[tuple],
+    numToRecover: int, outputPath: str) -> list[Future]
+        Reads the inodes of the files that the user has selected, and submits their recovery to executor.
+    recoverFile(self, copyEngine: copy_engine.CopyEngine, inode: read_inode.Inode, superBlock: super_block.SuperBlock, filePath: str) -> bool
+        Recovers a single file, given its inode.
+    getDeletedInodes(self, diskO: disks.Disk, sequentialScan: bool = False, useCache: bool = False)
         Gets a list of deleted inodes.
-    getInodeBitmaps(self, diskO: disks.Disk, superBlock:super_block.SuperBlock)
+    iterDeletedInodeBatches(self, diskO: disks.Disk, sequentialScan: bool = False, useCache: bool = False) -> iterator[tuple]
+        Finds the deleted inodes one group at a time, yielding those found in each group as soon as the group has been read.
+    scanInodeTables(self, diskO: disks.Disk, superBlock: super_block.SuperBlock, groupDescriptorTable: group_descriptor.GroupDescriptorTable)
+        Reads every inode table sequentially, returning the free inodes which have a deletion time.
+    iterInodeTables(self, diskO: disks.Disk, superBlock: super_block.SuperBlock, groupDescriptorTable: group_descriptor.GroupDescriptorTable)
+        Reads every inode table sequentially, yielding the free inodes which have a deletion time in each group.
+    getInodeBitmaps(self, diskO: disks.Disk, superBlock:super_block.SuperBlock, groupDescriptorTable: group_descriptor.GroupDescriptorTable = None)
         Gets a list of block numbers associated with inode bitmaps.
     findHoles(self, diskO: disks.Disk, iBitmap: tuple, superBlock: super_block.SuperBlock)
         Given a list of inode bitmaps, returns the inode numbers which are free and surrounded by used inodes.
         These inodes are likely to be associated with deleted files.
     """
 
-    def recoverFiles(self, diskO: structures.disks.Disk, deletedInodes: list, numToRecover: int, outputPath: str):
+    def recoverFiles(self, diskO: structures.disks.Disk, deletedInodes: list, numToRecover: int, outputPath: str,
+    executor: common.recovery_executor.RecoveryExecutor = None):
 
         """
         Attempts to recover the files that the user has selected.
@@ -44,6 +60,8 @@ class FileRecoveryNoJournal:
             that the user wishes to recover.
         outputPath : str
             The path of the output directory.
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files in parallel. If this is None, one is created for these files.
 
         Returns
         -------
@@ -55,33 +73,105 @@ class FileRecoveryNoJournal:
             Writes recovered files to outputPath/recoveredFile_%s.
         """
 
+        if executor is None:
+            with common.recovery_executor.RecoveryExecutor() as executor:
+                return self.recoverFiles(diskO, deletedInodes, numToRecover, outputPath, executor)
+
+        futures = self.submitFiles(executor, diskO, deletedInodes, numToRecover, outputPath)
+
+        return sum(executor.getResults(futures))
+
+
+    def submitFiles(self, executor: common.recovery_executor.RecoveryExecutor, diskO: structures.disks.Disk,
+    deletedInodes: list, numToRecover: int, outputPath: str) -> list:
+
+        """
+        Reads the inodes of the files that the user has selected, and submits their recovery to executor.
+        The inodes are read before submitting, so that the size of each file is known.
+
+        Parameters
+        ----------
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files.
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        deletedInodes: list[tuple]
+            List of the inodes which the user selected for recovery, of the form (inode num, inode deletion time).
+        numToRecover : int
+            The number of files within deletedInodes that the user wishes to recover.
+        outputPath : str
+            The path of the output directory.
+
+        Returns
+        -------
+        futures : list[Future]
+            A future for each file in deletedInodes[0:numToRecover], in order. Its result is True once the file is recovered.
+        """
+
         superBlock = structures.super_block.SuperBlock(diskO)
 
+        copyEngine = common.copy_engine.CopyEngine(common.block_device.getBlockDevice(diskO.diskPath))
+
+        groupDescriptorTable = structures.group_descriptor.GroupDescriptorTable(diskO, superBlock)
+
         toRecover = deletedInodes[0 : numToRecover]
 
+        futures = []
+
         numRecovered = 0
         for deletedInode in toRecover:
 
-            inode = structures.read_inode.Inode(diskO, deletedInode[0], superBlock, False, True)
+            inode = structures.read_inode.Inode(diskO, deletedInode[0], superBlock, False, True, groupDescriptorTable)
 
             numRecovered += 1
 
-            recoveredFile = open("%s/recoveredFile_%s" % (outputPath, (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(deletedInode[1])) + f"_num_{numRecovered}")), "ab")
+            filePath = "%s/recoveredFile_%s" % (outputPath, (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(deletedInode[1])) + f"_num_{numRecovered}"))
 
-            for entry in inode.entries:
-                disk = open(diskO.diskPath, "rb")
-                disk.seek(superBlock.blockSize * entry.blockNum)
+            numBytes = superBlock.blockSize * sum(entry.numBlocks for entry in inode.entries)
+            futures.append(executor.submit(self.recoverFile, numBytes, copyEngine, inode, superBlock, filePath))
 
-                for i in range(0, entry.numBlocks):
-                    recoveredFile.write(disk.read(superBlock.blockSize))
+        return futures
 
-                disk.close
-            recoveredFile.close
 
-        return numRecovered
+    def recoverFile(self, copyEngine: common.copy_engine.CopyEngine, inode: structures.read_inode.Inode,
+    superBlock: structures.super_block.SuperBlock, filePath: str) -> bool:
+
+        """
+        Recovers a single file, given its inode.
+
+        Parameters
+        ----------
+        copyEngine : copy_engine.CopyEngine
+            Copies the data of the file from the disk.
+        inode : read_inode.Inode
+            The inode of the file, with its block pointers.
+        superBlock : super_block.SuperBlock
+            The super block associated with the filesystem.
+        filePath : str
+            The path of the recovered file.
+
+        Returns
+        -------
+        Explicit:
+        recovered : bool
+            True once the file is recovered.
+
+        Implicit:
+            Writes the recovered file to filePath.
+        """
+
+        recoveredFile = open(filePath, "wb")
+
+        # Each entry is a contiguous run of blocks, copied at once.
+        for entry in inode.entries:
+            copyEngine.copyRun(recoveredFile, superBlock.blockSize * entry.blockNum, superBlock.blockSize * entry.numBlocks)
+
+        recoveredFile.close()
+
+        return True
 
     # returns a list of deleted inodes as tuple (inode num, inode deletion time)
-    def getDeletedInodes(self, diskO: structures.disks.Disk):
+    def getDeletedInodes(self, diskO: structures.disks.Disk, sequentialScan: bool = False, useCache: bool = False):
 
         """
         Gets a list of deleted inodes.
@@ -90,6 +180,12 @@ class FileRecoveryNoJournal:
         ----------
         diskO : disks.Disk
             The disk object associated with the filesystem.
+        sequentialScan : bool
+            If True, every inode table is read sequentially (see scanInodeTables).
+            Otherwise only the inodes in holes of the inode bitmaps are read, one at a time.
+        useCache : bool
+            If True, the result of the previous scan of this filesystem is returned if the filesystem has not changed since
+            (see scan_cache.ScanCache), and the result of a new scan is stored.
 
         Returns
         -------
@@ -99,41 +195,178 @@ class FileRecoveryNoJournal:
             (inode num, inode deletion time).
         """
 
+        deletedInodes = [inode for batch, fraction in self.iterDeletedInodeBatches(diskO, sequentialScan, useCache) for inode in batch]
+
+        deletedInodes.sort(key=lambda inode: -inode[1])
+
+        return deletedInodes
+
+
+    def iterDeletedInodeBatches(self, diskO: structures.disks.Disk, sequentialScan: bool = False, useCache: bool = False):
+
+        """
+        Finds the deleted inodes one group at a time, yielding those found in each group as soon as the group has been read.
+        Used to show the deleted inodes while the scan continues (see background_scan.BackgroundScan).
+
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        sequentialScan : bool
+            If True, every inode table is read sequentially (see scanInodeTables).
+            Otherwise only the inodes in holes of the inode bitmaps are read, one at a time.
+        useCache : bool
+            If True, the result of the previous scan of this filesystem is yielded at once if the filesystem has not
+            changed since (see scan_cache.ScanCache), and the result of a new, complete scan is stored.
+
+        Returns
+        -------
+        batches : iterator[tuple]
+            Tuples (deletedInodes, fraction), where deletedInodes is a list of tuples (inode num, inode deletion time),
+            and fraction is the fraction of the groups read so far.
+        """
+
         # flush filesystem cache
-        os.sync()
-        drop_caches = open("/proc/sys/vm/drop_caches", "w")
-        drop_caches.write("3")
-        drop_caches.close()
+        common.block_device.dropKernelCaches(diskO.diskPath)
+        common.block_device.getBlockDevice(diskO.diskPath).clearCache()
         # need to add cache flushing somewhere. Maybe write a seperate function for it at this point.
         deletedInodes = []
 
         superBlock = structures.super_block.SuperBlock(diskO)
 
-        inodeBitmaps = self.getInodeBitmaps(diskO, superBlock)
+        scanCache = common.scan_cache.ScanCache()
+        scanType = "ext2 sequential" if sequentialScan else "ext2"
+        if useCache:
+            cachedInodes = scanCache.load(scanType, superBlock.uuid, superBlock.changeIndicator)
+            if cachedInodes is not None:
+                yield (cachedInodes, 1.0)
+                return
 
-        for iBitmap in inodeBitmaps:
-            holes = self.findHoles(diskO, iBitmap, superBlock)
+        groupDescriptorTable = structures.group_descriptor.GroupDescriptorTable(diskO, superBlock)
 
-            for inodeNum in holes[0]:
-                inode = structures.read_inode.Inode(diskO, inodeNum, superBlock, False, False)
+        if sequentialScan:
+            for groupNum, groupInodes in self.iterInodeTables(diskO, superBlock, groupDescriptorTable):
+                deletedInodes.extend(groupInodes)
+                yield (groupInodes, (groupNum + 1) / len(groupDescriptorTable))
 
-                if inode.deletionTime != 0:
-                    deletedInodes.append((inodeNum, inode.deletionTime))
+        else:
+            inodeBitmaps = self.getInodeBitmaps(diskO, superBlock, groupDescriptorTable)
 
-            for inodeNum in range(holes[1], superBlock.inodesPerGroup - (holes[1] - (iBitmap[1] * superBlock.inodesPerGroup))): # Fix this line?
-                inode = structures.read_inode.Inode(diskO, inodeNum, superBlock, False, False)
+            for bitmapNum, iBitmap in enumerate(inodeBitmaps):
+                holes = self.findHoles(diskO, iBitmap, superBlock)
+                groupInodes = []
 
-                if inode.deletionTime != 0:
-                    deletedInodes.append((inodeNum, inode.deletionTime))
-                elif inode.deletionTime == 0:
-                    break
+                for inodeNum in holes[0]:
+                    inode = structures.read_inode.Inode(diskO, inodeNum, superBlock, False, False, groupDescriptorTable)
 
-        deletedInodes.sort(key=lambda inode: -inode[1])
+                    if inode.deletionTime != 0:
+                        groupInodes.append((inodeNum, inode.deletionTime))
 
-        return deletedInodes
+                for inodeNum in range(holes[1], superBlock.inodesPerGroup - (holes[1] - (iBitmap[1] * superBlock.inodesPerGroup))): # Fix this line?
+                    inode = structures.read_inode.Inode(diskO, inodeNum, superBlock, False, False, groupDescriptorTable)
+
+                    if inode.deletionTime != 0:
+                        groupInodes.append((inodeNum, inode.deletionTime))
+                    elif inode.deletionTime == 0:
+                        break
+
+                deletedInodes.extend(groupInodes)
+                yield (groupInodes, (bitmapNum + 1) / len(inodeBitmaps))
+
+        if useCache:
+            deletedInodes.sort(key=lambda inode: -inode[1])
+            scanCache.store(scanType, superBlock.uuid, superBlock.changeIndicator, deletedInodes)
+
+    def scanInodeTables(self, diskO: structures.disks.Disk, superBlock: structures.super_block.SuperBlock,
+    groupDescriptorTable: structures.group_descriptor.GroupDescriptorTable):
+
+        """
+        Reads every inode table sequentially, returning the free inodes which have a deletion time.
+
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        superBlock : super_block.SuperBlock
+            The super block associated with the filesystem.
+        groupDescriptorTable : group_descriptor.GroupDescriptorTable
+            The group descriptor table of the filesystem.
+
+        Returns
+        -------
+        deletedInodes : list[tuple]
+            The deleted inodes, in inode number order. Stored as a tuple of the form (inode num, inode deletion time).
+        """
+
+        return [inode for groupNum, groupInodes in self.iterInodeTables(diskO, superBlock, groupDescriptorTable) for inode in groupInodes]
+
+
+    def iterInodeTables(self, diskO: structures.disks.Disk, superBlock: structures.super_block.SuperBlock,
+    groupDescriptorTable: structures.group_descriptor.GroupDescriptorTable):
+
+        """
+        Reads every inode table sequentially, yielding the free inodes which have a deletion time in each group.
+        Each inode table is read in large chunks, and each chunk is parsed at once by inode_table.InodeTable.
+        Groups whose inode table is uninitialized are skipped, as are the never used inodes at the end of each inode table.
+
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        superBlock : super_block.SuperBlock
+            The super block associated with the filesystem.
+        groupDescriptorTable : group_descriptor.GroupDescriptorTable
+            The group descriptor table of the filesystem.
+
+        Returns
+        -------
+        groups : iterator[tuple]
+            A tuple (group num, deletedInodes) for every group, in order, where deletedInodes is a list of
+            tuples (inode num, inode deletion time), in inode number order.
+        """
+
+        device = common.block_device.getBlockDevice(diskO.diskPath)
+
+        blockSize = superBlock.blockSize
+        inodesPerGroup = superBlock.inodesPerGroup
+        inodeSize = superBlock.inodeSize
+        inodesPerBlock = blockSize // inodeSize
+
+        for groupNum in range(0, len(groupDescriptorTable)):
+
+            deletedInodes = []
+
+            # Inodes past itable_unused have never been used, so cannot belong to deleted files.
+            numInodes = inodesPerGroup - groupDescriptorTable.itableUnused[groupNum]
+            if groupDescriptorTable.flags[groupNum] & structures.group_descriptor.INODE_UNINIT or numInodes <= 0:
+                yield (groupNum, deletedInodes)
+                continue
+
+            inodeBitmap = device.readBlock(groupDescriptorTable.inodeBitMapLoc[groupNum], blockSize)
+            inodeTableLoc = groupDescriptorTable.inodeTableLoc[groupNum]
+
+            for firstBlock in range(0, ceil(numInodes / inodesPerBlock), INODE_TABLE_READ_BLOCKS):
+
+                firstInode = firstBlock * inodesPerBlock
+                chunkInodes = min(INODE_TABLE_READ_BLOCKS * inodesPerBlock, numInodes - firstInode)
+
+                chunk = device.read(blockSize * (inodeTableLoc + firstBlock), chunkInodes * inodeSize)
+
+                inodeTable = structures.inode_table.InodeTable(chunk, diskO.diskType, superBlock)
+
+                for i, deletionTime in inodeTable.getDeletedInodes():
+
+                    inodeIndex = firstInode + i
+
+                    # Only inodes which are free in the inode bitmap are deleted.
+                    if deletionTime != 0 and not inodeBitmap[inodeIndex >> 3] & (1 << (inodeIndex & 7)):
+                        deletedInodes.append((groupNum * inodesPerGroup + inodeIndex + 1, deletionTime))
+
+            yield (groupNum, deletedInodes)
 
     # returns a list of inode bitmaps which are tuple(iBitmapBlockNum, descriptorNum)
-    def getInodeBitmaps(self, diskO: structures.disks.Disk, superBlock: structures.super_block.SuperBlock):
+    def getInodeBitmaps(self, diskO: structures.disks.Disk, superBlock: structures.super_block.SuperBlock,
+    groupDescriptorTable: structures.group_descriptor.GroupDescriptorTable = None):
 
         """
         Gets a list of block numbers associated with inode bitmaps.
@@ -144,6 +377,8 @@ class FileRecoveryNoJournal:
             The disk object associated with the filesystem.
         superBlock : super_block.SuperBlock
             The super block associated with the filesystem.
+        groupDescriptorTable : group_descriptor.GroupDescriptorTable
+            The group descriptor table of the filesystem. If this is None, it is read from disk.
 
         Returns
         -------
@@ -154,13 +389,15 @@ class FileRecoveryNoJournal:
         blocksPerGroup = superBlock.blocksPerGroup
         inodesPerGroup = superBlock.inodesPerGroup
 
+        if groupDescriptorTable is None:
+            groupDescriptorTable = structures.group_descriptor.GroupDescriptorTable(diskO, superBlock)
+
         iBitmaps = []
 
         for descriptorNum in range(0, int(superBlock.numBlocks / blocksPerGroup)):
-            groupDescriptor = structures.group_descriptor.GroupDescriptor(diskO, descriptorNum, superBlock)
-
+            inodeBitMapLoc = groupDescriptorTable.inodeBitMapLoc[descriptorNum]
 
-            for iBitmapBlockNum in range(groupDescriptor.inodeBitMapLoc, groupDescriptor.inodeBitMapLoc + ceil(inodesPerGroup / (blockSize * 8))):
+            for iBitmapBlockNum in range(inodeBitMapLoc, inodeBitMapLoc + ceil(inodesPerGroup / (blockSize * 8))):
                 iBitmaps.append((iBitmapBlockNum, descriptorNum))
 
         return iBitmaps
@@ -199,10 +436,8 @@ class FileRecoveryNoJournal:
         # holeInodes[1] contains the inode number directly following the last used inode
         holeInodes = [[]]
 
-        disk = open(diskO.diskPath, "rb")
-        disk.seek(superBlock.blockSize * iBitmap[0])
-        bytes = disk.read(ceil(superBlock.inodesPerGroup / 8))
-        disk.close
+        device = common.block_device.getBlockDevice(diskO.diskPath)
+        bytes = device.readBlock(iBitmap[0], superBlock.blockSize)[0:ceil(superBlock.inodesPerGroup / 8)]
 
         decoder = common.decode.Decoder
 
@@ -1,8 +1,7 @@
 
 from time import sleep
-import os
-import re
 
+from src.EXT import journal
 from src.EXT.structures import *
 
 def getReadableJournalCopy():
@@ -48,37 +47,22 @@ def getReadableJournalCopy():
 
     outputPath = input("Output path: ")
 
+    # Each copy is a snapshot storing only the journal blocks which changed since the previous copy.
+    # Use render_journal_snapshot to convert a copy to readable text.
+    snapshotWriter = journal.journal_snapshot.SnapshotWriter(journal.read_journal.ReadJournal(currentDisk))
+
     for journalNum in range(0, numCopies):
 
         while True:
             try:
-                journal = open(f"{outputPath}/fileSystemJournal{journalNum}.txt", "w")
+                numChanged = snapshotWriter.takeSnapshot(f"{outputPath}/fileSystemJournal{journalNum}.snap")
                 break
             except FileNotFoundError:
                 print("Invalid output path, try again")
                 outputPath = input("Output path: ")
 
-        # flush filesystem cache
-        os.sync()
-        drop_caches = open("/proc/sys/vm/drop_caches", "w")
-        drop_caches.write("3")
-        drop_caches.close()
-
-        fileSystemJournalInode = read_inode.Inode(currentDisk, superBlock.journalInode, superBlock, False, True)
-
-        for entry in fileSystemJournalInode.entries:
-            disk = open(currentDisk.diskPath, "rb")
-            disk.seek(superBlock.blockSize * entry.blockNum)
-            for i in range(0, entry.numBlocks):
-
-                numReads = int(superBlock.blockSize / 16)
-                for i in range(0, numReads):
-                    blockBytesHex = (" ").join(re.findall(".{1,4}", disk.read(16).hex()))
-                    journal.write(blockBytesHex + "\n")
-                journal.write("\n")
-            disk.close
+        print(f"Copy {journalNum}: {numChanged} journal blocks changed")
 
-        journal.close
         sleep(timeDelayInSeconds)
 
 if __name__ == "__main__":
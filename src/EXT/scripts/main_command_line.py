@@ -1,7 +1,7 @@
 
-import journal.read_journal
-import recovery.recovery_journaled
-import structures.disks
+from src.EXT import journal
+from src.EXT import recovery
+from src.EXT import structures
 
 def main():
     fileRecovery = recovery.recovery_journaled.FileRecoveryJournaled()
@@ -53,7 +53,7 @@ def main():
         try:
             filePath = input("Output path for recovered files: ")
 
-            numRecovered = fileRecovery.recoverFiles(currentDisk, transactions, deletedInodes, numToRecover, filePath)
+            numRecovered = fileRecovery.recoverFiles(currentDisk, transactions, deletedInodes, numToRecover, filePath, readJournal.blockIndex)
 
             print("%d files were successfully recovered" % numRecovered)
             break
@@ -0,0 +1,34 @@
+import os
+
+from src.EXT.journal import *
+
+def renderJournalSnapshot():
+
+    while True:
+        snapshotDirectory = input("Directory containing the journal copies: ")
+
+        # The copies of a chain are numbered from 0, in the order they were taken.
+        snapshotPaths = []
+        while os.path.exists(f"{snapshotDirectory}/fileSystemJournal{len(snapshotPaths)}.snap"):
+            snapshotPaths.append(f"{snapshotDirectory}/fileSystemJournal{len(snapshotPaths)}.snap")
+
+        if len(snapshotPaths) > 0:
+            break
+        print("No journal copies found, try again.")
+
+    while True:
+        try:
+            journalNum = int(input(f"Copy to render (0-{len(snapshotPaths) - 1}): "))
+            if 0 <= journalNum < len(snapshotPaths):
+                break
+            print("Invalid copy number, try again.")
+        except ValueError:
+            print("Invalid input, please enter an integer value")
+
+    snapshot = journal_snapshot.openSnapshots(snapshotPaths[0:journalNum + 1])[-1]
+
+    with open(f"{snapshotDirectory}/fileSystemJournal{journalNum}.txt", "w") as readableJournal:
+        snapshot.writeReadable(readableJournal)
+
+if __name__ == "__main__":
+    renderJournalSnapshot()
@@ -0,0 +1,58 @@
+
+
+from src.EXT.structures import disks
+from src.EXT.journal import *
+
+def watchJournal():
+    diskList = disks.getDisks()
+
+    print("Available disks: ", end="")
+
+    for disk in diskList:
+        print(disk.diskPath, end=" ")
+    print("\n")
+
+
+    while True:
+        diskName = input("Choose disk to watch the journal of: ")
+
+        for disk in diskList:
+            if disk.diskPath == diskName:
+                currentDisk = disk
+
+        try:
+            currentDisk
+            break
+        except UnboundLocalError:
+            print("Invalid disk path, try again.")
+
+    while True:
+        try:
+            pollInterval = float(input(f"Time between polls of the journal (in seconds, default {journal_watcher.DEFAULT_POLL_INTERVAL})? ")
+                or journal_watcher.DEFAULT_POLL_INTERVAL)
+            break
+        except ValueError:
+            print("Invalid input, please enter a number")
+
+    while True:
+        storePath = input("Path of the journal store: ")
+        try:
+            watcher = journal_watcher.JournalWatcher(currentDisk, storePath, pollInterval)
+            break
+        except (OSError, ValueError) as error:
+            print(f"{error}, try again.")
+
+    print(f"{watcher.store.numTransactions} deletion transactions already in the store. Press Ctrl+C to stop watching.")
+
+    try:
+        for numCaptured in watcher.watch():
+            if numCaptured > 0:
+                print(f"Captured {numCaptured} deletion transactions (last transaction seen: {watcher.lastSequence}, "
+                    f"{watcher.store.numTransactions} in the store).")
+    except KeyboardInterrupt:
+        print()
+    finally:
+        watcher.store.close()
+
+if __name__ == "__main__":
+    watchJournal()
@@ -1 +1,9 @@
-from src.EXT.structures import disks, extent_node, group_descriptor, read_inode, super_block
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, (
+    "disks",
+    "extent_node",
+    "group_descriptor",
+    "inode_table",
+    "read_inode",
+    "super_block"))
\ No newline at end of file
@@ -3,6 +3,25 @@
 from src import common
 
 
+# struct ext4_extent_header
+EXTENT_HEADER = common.layout.Layout("ExtentHeader", "little",
+    magic=common.layout.Field(0, 2),
+    numEntriesInExtent=common.layout.Field(2, 2),
+    maxEntries=common.layout.Field(4, 2),
+    extentDepth=common.layout.Field(6, 2))
+
+# struct ext4_extent. The physical block number is split into ee_start_lo and ee_start_hi.
+EXTENT_ENTRY = common.layout.Layout("ExtentEntry", "little",
+    fileBlockNum=common.layout.Field(0, 4),
+    numBlocks=common.layout.Field(4, 2),
+    blockNum=common.layout.Field(8, 4, 6, 2))
+
+# struct ext4_extent_idx. The child block number is split into ei_leaf_lo and ei_leaf_hi.
+EXTENT_INDEX = common.layout.Layout("ExtentIndex", "little",
+    fileBlockNum=common.layout.Field(0, 4),
+    nextNodeBlockNum=common.layout.Field(4, 4, 8, 2))
+
+
 class ExtentNode:
 
     """
@@ -74,11 +93,11 @@ class ExtentHeader:
             The bytes are decoded and interpreted to initialize all data.
         """
 
-        decoder = common.decode.Decoder()
+        fields = EXTENT_HEADER.unpack(data)
 
-        self.numEntriesInExtent: int = decoder.leBytesToDecimal(data, 2, 3)
-        self.maxEntries: int = decoder.leBytesToDecimal(data, 4, 5)
-        self.extentDepth: int = decoder.leBytesToDecimal(data, 6, 7)
+        self.numEntriesInExtent: int = fields.numEntriesInExtent
+        self.maxEntries: int = fields.maxEntries
+        self.extentDepth: int = fields.extentDepth
 
 
 class ExtentEntry:
@@ -110,11 +129,11 @@ class ExtentEntry:
             The bytes are decoded and interpreted to initialize all data.
         """
 
-        decoder = common.decode.Decoder()
+        fields = EXTENT_ENTRY.unpack(data)
 
-        self.fileBlockNum: int = decoder.leBytesToDecimal(data, 0, 3)
-        self.numBlocks: int = decoder.leBytesToDecimal(data, 4, 5)
-        self.blockNum: int = decoder.leBytesToDecimalLowerAndUpper(data, 8, 11, 6, 7)
+        self.fileBlockNum: int = fields.fileBlockNum
+        self.numBlocks: int = fields.numBlocks
+        self.blockNum: int = fields.blockNum
 
 
 class ExtentIndex:
@@ -144,9 +163,9 @@ class ExtentIndex:
             The bytes are decoded and interpreted to initialize all data.
         """
 
-        decoder = common.decode.Decoder()
+        fields = EXTENT_INDEX.unpack(data)
 
-        self.fileBlockNum: int = decoder.leBytesToDecimal(data, 0, 3)
-        self.nextNodeBlockNum: int = decoder.leBytesToDecimalLowerAndUpper(data, 4, 7, 8, 9)
+        self.fileBlockNum: int = fields.fileBlockNum
+        self.nextNodeBlockNum: int = fields.nextNodeBlockNum
 
         
\ No newline at end of file
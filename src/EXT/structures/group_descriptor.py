@@ -1,10 +1,31 @@
 
+from array import array
 from math import ceil
 
 from src import common
 from src.EXT.structures import disks, super_block
 
 
+# struct ext4_group_desc, as laid out in 32 byte (ext2/3, ext4 without 64bit) descriptors.
+GROUP_DESCRIPTOR_32 = common.layout.Layout("GroupDescriptor32", "little",
+    blockBitMapLoc=common.layout.Field(0, 4),
+    inodeBitMapLoc=common.layout.Field(4, 4),
+    inodeTableLoc=common.layout.Field(8, 4),
+    flags=common.layout.Field(0x12, 2),
+    itableUnused=common.layout.Field(0x1C, 2))
+
+# struct ext4_group_desc in 64 byte descriptors, where each location has a high order part.
+GROUP_DESCRIPTOR_64 = common.layout.Layout("GroupDescriptor64", "little",
+    blockBitMapLoc=common.layout.Field(0, 4, 32, 4),
+    inodeBitMapLoc=common.layout.Field(4, 4, 36, 4),
+    inodeTableLoc=common.layout.Field(8, 4, 40, 4),
+    flags=common.layout.Field(0x12, 2),
+    itableUnused=common.layout.Field(0x1C, 2, 0x32, 2))
+
+# bg_flags bit indicating that the inode table of a group has not been initialized.
+INODE_UNINIT = 0x1
+
+
 class GroupDescriptor:
 
     """
@@ -18,6 +39,9 @@ class GroupDescriptor:
     inodeBitMapLoc : int
         The block number containing the block for the inode bitmap for the
         filesystem group associated with the group descriptor.
+    blockBitMapLoc : int
+        The block number containing the block for the block bitmap for the
+        filesystem group associated with the group descriptor.
     """
 
 
@@ -42,23 +66,94 @@ class GroupDescriptor:
 
         groupOffSet = groupNum * superBlock.groupDescriptorSize
 
-        disk = open(diskO.diskPath, "rb")
-        disk.seek(groupDescriptorTableOffSet + groupOffSet)
-        data = disk.read(superBlock.groupDescriptorSize)
-        disk.close()
-
-        decoder = common.decode.Decoder()
+        # Group descriptors never cross a block boundary, so the descriptor is read from its (cached) block.
+        descriptorOffSet = groupDescriptorTableOffSet + groupOffSet
+        block = common.block_device.getBlockDevice(diskO.diskPath).readBlock(descriptorOffSet // superBlock.blockSize, superBlock.blockSize)
+        descriptorOffSet = descriptorOffSet % superBlock.blockSize
+        data = block[descriptorOffSet:descriptorOffSet + superBlock.groupDescriptorSize]
 
         # set group descriptor data fields.
 
         # In ext4, there are two fields for each of these values, lower order and higher order bytes.
         if diskO.diskType == "ext4" and superBlock.groupDescriptorSize == 64:
-            self.inodeTableLoc: int = decoder.leBytesToDecimalLowerAndUpper(data, 8, 11, 40, 43)
-            self.inodeBitMapLoc: int = decoder.leBytesToDecimalLowerAndUpper(data, 4, 7, 36, 39)
-            self.blockBitMapLoc: int = decoder.leBytesToDecimalLowerAndUpper(data, 0, 3, 32, 35)
+            fields = GROUP_DESCRIPTOR_64.unpack(data)
 
         # In ext2/3, there is only one field for each of these values
         elif diskO.diskType == "ext3" or diskO.diskType == "ext2" or (diskO.diskType == "ext4" and not superBlock.bit64):
-            self.inodeTableLoc: int = decoder.leBytesToDecimal(data, 8, 11)
-            self.inodeBitMapLoc: int = decoder.leBytesToDecimal(data, 4, 7)
-            self.blockBitMapLoc: int = decoder.leBytesToDecimal(data, 0, 3)
+            fields = GROUP_DESCRIPTOR_32.unpack(data)
+
+        self.inodeTableLoc: int = fields.inodeTableLoc
+        self.inodeBitMapLoc: int = fields.inodeBitMapLoc
+        self.blockBitMapLoc: int = fields.blockBitMapLoc
+
+
+
+class GroupDescriptorTable:
+
+    """
+    Contains the data of every group descriptor in the filesystem, read from the group descriptor table at once.
+    Each field is stored in an array indexed by group number.
+
+    The primary table (following the super block) is read, as the flags and unused inode counts
+    in the backup tables are only updated when the filesystem is resized or checked.
+
+    Attributes
+    ----------
+    numGroups : int
+        The number of groups (and group descriptors) in the filesystem.
+    inodeTableLoc : array
+        For each group, the block number of the first block in its inode table.
+    blockBitMapLoc : array
+        For each group, the block number of its block bitmap.
+    inodeBitMapLoc : array
+        For each group, the block number of its inode bitmap.
+    flags : array
+        For each group, its flags (bg_flags). INODE_UNINIT is set if its inode table has not been initialized.
+    itableUnused : array
+        For each group, the number of unused inodes at the end of its inode table.
+        Only maintained on filesystems with group descriptor checksums. 0 otherwise.
+    """
+
+    def __init__(self, diskO: disks.Disk, superBlock: super_block.SuperBlock):
+
+        """
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk object associated with the filesystem.
+        superBlock : super_block.SuperBlock
+            The super block associated with the filesystem.
+            This is necessary to locate the group descriptor table on disk.
+        """
+
+        # The group descriptor table begins in the block following the super block.
+        # With 1024 byte blocks the super block is block 1, otherwise it is in block 0.
+        groupDescriptorTableOffSet = superBlock.blockSize * (1024 // superBlock.blockSize + 1)
+        descriptorSize = superBlock.groupDescriptorSize
+
+        numGroups = ceil(superBlock.numBlocks / superBlock.blocksPerGroup)
+
+        data = common.block_device.getBlockDevice(diskO.diskPath).read(groupDescriptorTableOffSet, numGroups * descriptorSize)
+        self.numGroups: int = min(numGroups, len(data) // descriptorSize)
+
+        if diskO.diskType == "ext4" and descriptorSize == 64:
+            layout = GROUP_DESCRIPTOR_64
+        else:
+            layout = GROUP_DESCRIPTOR_32
+
+        self.inodeTableLoc = array("Q")
+        self.blockBitMapLoc = array("Q")
+        self.inodeBitMapLoc = array("Q")
+        self.flags = array("H")
+        self.itableUnused = array("I")
+
+        for fields in layout.iterUnpack(data, descriptorSize, 0, self.numGroups):
+            self.inodeTableLoc.append(fields.inodeTableLoc)
+            self.blockBitMapLoc.append(fields.blockBitMapLoc)
+            self.inodeBitMapLoc.append(fields.inodeBitMapLoc)
+            self.flags.append(fields.flags)
+            self.itableUnused.append(fields.itableUnused)
+
+
+    def __len__(self):
+        return self.numGroups
\ No newline at end of file
@@ -0,0 +1,104 @@
+from src.EXT.structures import read_inode, super_block
+
+# numpy is optional. Without it, inode tables are parsed with the precompiled inode layouts instead.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# 0xF30A (62218) is the magic number indicating an ext4 extent node.
+EXTENT_MAGIC = 62218
+
+
+class InodeTable:
+
+    """
+    Parses a buffer of consecutive inodes (such as an inode table block, or a chunk of an inode table) at once.
+    When numpy is available, the buffer is viewed as a structured array and inodes are selected with boolean masks.
+    Otherwise each inode is decoded with read_inode.EXTENT_INODE or read_inode.BLOCK_POINTER_INODE.
+    No Inode objects are constructed in either case.
+
+    Attributes
+    ----------
+    numInodes : int
+        The number of (whole) inodes in the buffer.
+    deletionTimes : sequence[int]
+        The deletion time of each inode. 0 if the inode has not been deleted.
+    hasBlockPointers : sequence[bool]
+        For each inode, whether it contains block pointers (as in read_inode.Inode.hasBlockPointers).
+
+    Methods
+    -------
+    getDeletedInodes(self, hasBlockPointers: bool = None) -> list[tuple]
+        Gets the inodes which have a deletion time, as tuples (index within the buffer, deletion time).
+    """
+
+    def __init__(self, data: bytes, diskType: str, superBlock: super_block.SuperBlock):
+
+        """
+        Parameters
+        ----------
+        data : bytes
+            The inodes to parse. Any buffer (bytes, memoryview...) is accepted.
+        diskType : str
+            The filesystem type ("ext2", "ext3" or "ext4"), which determines how block pointers are detected.
+        superBlock : super_block.SuperBlock
+            The super block associated with the filesystem. Provides the inode size.
+        """
+
+        inodeSize = superBlock.inodeSize
+        self.numInodes: int = len(data) // inodeSize
+
+        if numpy is not None:
+            table = numpy.frombuffer(data, dtype=numpy.dtype({
+                "names": ["deletionTime", "extentMagic", "extentEntries", "firstBlockPointer"],
+                "formats": ["<u4", "<u2", "<u2", "<u4"],
+                "offsets": [20, 40, 42, 40],
+                "itemsize": inodeSize}), count=self.numInodes)
+
+            self.deletionTimes = table["deletionTime"]
+            if diskType == "ext4":
+                self.hasBlockPointers = (table["extentMagic"] == EXTENT_MAGIC) & (table["extentEntries"] > 0)
+            else:
+                self.hasBlockPointers = table["firstBlockPointer"] > 0
+
+        elif diskType == "ext4":
+            inodes = list(read_inode.EXTENT_INODE.iterUnpack(data, inodeSize, 0, self.numInodes))
+            self.deletionTimes = [inode.deletionTime for inode in inodes]
+            self.hasBlockPointers = [inode.extentMagic == EXTENT_MAGIC and inode.extentEntries > 0 for inode in inodes]
+
+        else:
+            inodes = list(read_inode.BLOCK_POINTER_INODE.iterUnpack(data, inodeSize, 0, self.numInodes))
+            self.deletionTimes = [inode.deletionTime for inode in inodes]
+            self.hasBlockPointers = [inode.firstBlockPointer > 0 for inode in inodes]
+
+
+    def getDeletedInodes(self, hasBlockPointers: bool = None) -> list:
+
+        """
+        Gets the inodes which have a deletion time.
+
+        Parameters
+        ----------
+        hasBlockPointers : bool
+            If False, only deleted inodes whose block pointers were cleared are returned (as in ext3/4 deletions).
+            If True, only deleted inodes whose block pointers are intact are returned (as in ext2 deletions).
+            If None, all deleted inodes are returned.
+
+        Returns
+        -------
+        deletedInodes : list[tuple]
+            The deleted inodes, as tuples (index of the inode within the buffer starting at 0, deletion time).
+        """
+
+        if numpy is not None:
+            mask = self.deletionTimes != 0
+            if hasBlockPointers is not None:
+                mask &= self.hasBlockPointers == hasBlockPointers
+
+            indices = numpy.flatnonzero(mask)
+            return list(zip(indices.tolist(), self.deletionTimes[indices].tolist()))
+
+        return [(index, deletionTime) for index, deletionTime in enumerate(self.deletionTimes)
+            if deletionTime != 0 and (hasBlockPointers is None or self.hasBlockPointers[index] == hasBlockPointers)]
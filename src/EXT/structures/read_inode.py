@@ -4,6 +4,23 @@ from src import common
 from src.EXT.structures import super_block, disks, group_descriptor, extent_node
 
 
+# struct ext4_inode, for inodes whose i_block holds an extent tree.
+# 0xF30A (62218) in extentMagic indicates an ext4 extent node.
+EXTENT_INODE = common.layout.Layout("ExtentInode", "little",
+    deletionTime=common.layout.Field(20, 4),
+    extentMagic=common.layout.Field(40, 2),
+    extentEntries=common.layout.Field(42, 2))
+
+# struct ext2_inode, for inodes whose i_block holds direct and indirect block pointers.
+BLOCK_POINTER_INODE = common.layout.Layout("BlockPointerInode", "little",
+    deletionTime=common.layout.Field(20, 4),
+    firstBlockPointer=common.layout.Field(40, 4))
+
+# A single 4 byte block pointer, as found in i_block and in indirect pointer blocks.
+BLOCK_POINTER = common.layout.Layout("BlockPointer", "little",
+    blockNum=common.layout.Field(0, 4))
+
+
 class Inode:
 
     """
@@ -34,7 +51,8 @@ class Inode:
     """
 
 
-    def __init__(self, diskO: disks.Disk, inodeNum: int, superBlock: super_block.SuperBlock, blockData, readPointers: bool):
+    def __init__(self, diskO: disks.Disk, inodeNum: int, superBlock: super_block.SuperBlock, blockData, readPointers: bool,
+    groupDescriptorTable: group_descriptor.GroupDescriptorTable = None):
 
         """
         Reads and stores the necessary inode metadata
@@ -51,53 +69,58 @@ class Inode:
             The super block object associated with the disk.
             Used in calculating inode location on disk.
             Provides necessary metadata for reading block pointers.
-        blockData : bool || bytes
+        blockData : bool || bytes || memoryview
             If this is a bool, it should be false, indicating whether the inode table data was provided
             and inodeNum is an explicit inode number.
-            If this is type bytes, then the block data was provided and inodeNum is relative inode within blockData
+            If this is type bytes (or a memoryview of an inode table block), then the block data was provided
+            and inodeNum is relative inode within blockData
         readPointers : bool
             A boolean value indicating whether the block pointers should be read
+        groupDescriptorTable : group_descriptor.GroupDescriptorTable
+            The group descriptor table of the filesystem, used to locate the inode table when blockData is False.
+            If this is None, the group descriptor of the inode is read from disk.
         """
 
         # if blockData is false, read from disk. inodeNum will be the inode number of the inode.
         if type(blockData) is bool:
 
             # initialize data needed to read the inode from disk.
-            groupNum: int = int(inodeNum / superBlock.inodesPerGroup)
+            # Note that inode numbers start at 1.
+            groupNum: int = (inodeNum - 1) // superBlock.inodesPerGroup
 
-            groupDescriptor = group_descriptor.GroupDescriptor(diskO, groupNum, superBlock)
+            if groupDescriptorTable is not None:
+                inodeTableLoc = groupDescriptorTable.inodeTableLoc[groupNum]
+            else:
+                inodeTableLoc = group_descriptor.GroupDescriptor(diskO, groupNum, superBlock).inodeTableLoc
 
-            inodeOffSet = ((inodeNum % superBlock.inodesPerGroup) - 1)
+            inodeOffSet = (inodeNum - 1) % superBlock.inodesPerGroup
             inodesPerBlock = int(superBlock.blockSize / superBlock.inodeSize)
 
-            inodeBlockNum = int(inodeOffSet / inodesPerBlock) + groupDescriptor.inodeTableLoc
-            inodeByteOffSet = (inodeOffSet * superBlock.inodeSize) + (inodeBlockNum * superBlock.blockSize)
+            inodeBlockNum = int(inodeOffSet / inodesPerBlock) + inodeTableLoc
+            inodeByteOffSet = (inodeOffSet % inodesPerBlock) * superBlock.inodeSize
 
-            # read inode from disk
-            disk = open(diskO.diskPath, "rb")
-            disk.seek(inodeByteOffSet)
-            inodeData = disk.read(superBlock.inodeSize)
-            disk.close
+            # read inode from its (cached) inode table block
+            block = common.block_device.getBlockDevice(diskO.diskPath).readBlock(inodeBlockNum, superBlock.blockSize)
+            inodeData = block[inodeByteOffSet:inodeByteOffSet + superBlock.inodeSize]
 
 
-        # if inodeData is type bytes, it will be an inode table block.
+        # if inodeData is type bytes (or a view of bytes), it will be an inode table block.
         # inodeNum will be the inode num within that block, starting at 0.
-        elif type(blockData) is bytes:
+        elif isinstance(blockData, (bytes, memoryview)):
             inodeData = blockData[(inodeNum * superBlock.inodeSize): (inodeNum + 1) * superBlock.inodeSize]
 
 
-        decoder = common.decode.Decoder()
-
-        self.deletionTime: int = decoder.leBytesToDecimal(inodeData, 20, 23)
-
         if diskO.diskType == "ext4":
+            fields = EXTENT_INODE.unpack(inodeData)
             # 0xF30A (62218) is the magic number indicating an ext4 extent node.
             # If the following bytes are not empty, then there are block pointers.
-            self.hasBlockPointers = ((decoder.leBytesToDecimal(inodeData, 40, 41) == 62218)
-            and (decoder.leBytesToDecimal(inodeData, 42, 43) > 0))
+            self.hasBlockPointers = fields.extentMagic == 62218 and fields.extentEntries > 0
         elif diskO.diskType == "ext3" or diskO.diskType == "ext2":
+            fields = BLOCK_POINTER_INODE.unpack(inodeData)
             # The first block pointer (in ext2/3) is located in bytes 40-43 of the inode structure
-            self.hasBlockPointers = (decoder.leBytesToDecimal(inodeData, 40, 43) > 0)
+            self.hasBlockPointers = fields.firstBlockPointer > 0
+
+        self.deletionTime: int = fields.deletionTime
 
         self.entries: list[int] = []
 
@@ -138,6 +161,8 @@ class Inode:
 
         nodes.append(extent_node.ExtentNode(data[40:100]))
 
+        device = common.block_device.getBlockDevice(diskPath)
+
         entries: list[extent_node.ExtentEntry] = list()
 
 
@@ -147,10 +172,7 @@ class Inode:
             # if the node is an index node, add all the nodes it points to to the list nodes
             if currentNode.header.extentDepth > 0:
                 for index in currentNode.indices:
-                    disk = open(diskPath, "rb")
-                    disk.seek(superBlock.blockSize * index.nextNodeBlockNum)
-                    nodeData = disk.read(superBlock.blockSize)
-                    disk.close
+                    nodeData = device.readBlock(index.nextNodeBlockNum, superBlock.blockSize)
                     nodes.append(extent_node.ExtentNode(nodeData))
 
             else:
@@ -217,15 +239,7 @@ class Inode:
             A list containing block numbers of the pointers in data
         """
 
-        decoder: common.decode.Decoder = common.decode.Decoder
-        pointers: list[int] = []
-
-        offSet: int = 0
-        while offSet < len(data):
-            blockNum: int = decoder.leBytesToDecimal(self, data, offSet, offSet + 3)
-            if blockNum != 0:
-                pointers.append(blockNum)
-            offSet += 4
+        pointers: list[int] = [pointer.blockNum for pointer in BLOCK_POINTER.iterUnpack(data, 4) if pointer.blockNum != 0]
 
         return pointers
 
@@ -239,6 +253,7 @@ class Inode:
         Parameters
         ----------
         diskPath : str
+            The path of the disk which contains the indirect pointer blocks.
         data : bytes
             The byte list containing the indirect pointers
             Is read from in order to follow the block pointers
@@ -254,15 +269,14 @@ class Inode:
             A list containing the pointers which were read
         """
 
+        device = common.block_device.getBlockDevice(diskPath)
+
         pointers: list[int] = self.readPointers(data)
         tempPointers: list[int] = []
 
         for i in range(0, depth):
             for indirectPointerBlockNum in pointers:
-                disk = open(diskPath, "rb")
-                disk.seek(superBlock.blockSize * indirectPointerBlockNum)
-                indirectPointerData = disk.read(superBlock.blockSize)
-                disk.close
+                indirectPointerData = device.readBlock(indirectPointerBlockNum, superBlock.blockSize)
                 tempPointers.extend(self.readPointers(indirectPointerData))
 
             pointers = tempPointers
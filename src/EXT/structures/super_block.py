@@ -6,6 +6,22 @@ from src import common
 from src.EXT.structures import disks
 
 
+# struct ext4_super_block. Only the fields used by FDRecovery are described.
+SUPER_BLOCK = common.layout.Layout("SuperBlock", "little",
+    numInodes=common.layout.Field(0, 4),
+    numBlocks=common.layout.Field(4, 4),
+    freeBlocks=common.layout.Field(12, 4),
+    freeInodes=common.layout.Field(16, 4),
+    logBlockSize=common.layout.Field(24, 4),
+    blocksPerGroup=common.layout.Field(32, 4),
+    inodesPerGroup=common.layout.Field(40, 4),
+    writeTime=common.layout.Field(48, 4),
+    mountCount=common.layout.Field(52, 2),
+    inodeSize=common.layout.Field(88, 2),
+    journalInode=common.layout.Field(224, 4),
+    groupDescriptorSize=common.layout.Field(254, 2))
+
+
 class SuperBlock:
 
     """
@@ -31,6 +47,11 @@ class SuperBlock:
         to understand whether to read extents or block pointers.
     bit64 : boolean
         Indicates whether the 64bit flag is set.
+    uuid : str
+        The UUID of the filesystem, as 32 hexadecimal digits. Identifies the filesystem across scans.
+    changeIndicator : tuple
+        (last write time, mount count, free blocks, free inodes). Changes when the filesystem is written to,
+        so it is used to tell whether the results of a previous scan are still valid.
     """
 
     def __init__(self, diskO: disks.Disk):
@@ -42,37 +63,37 @@ class SuperBlock:
             The disk object associated with the filesystem.
         """
 
-        disk = open(diskO.diskPath, "rb")
-        disk.seek(1024)
-        data = disk.read(1024)
-        disk.close
+        # The super block is always the 1024 bytes following the first 1024 bytes of the disk.
+        data = common.block_device.getBlockDevice(diskO.diskPath).readBlock(1, 1024)
 
-        decoder = common.decode.Decoder()
+        fields = SUPER_BLOCK.unpack(data)
 
         # ext3/4 Both have journals (therefore a journalInode field), and the 64bit feature flag .
         # used when reading journal descriptor blocks.
         if diskO.diskType == "ext4" or diskO.diskType == "ext3":
-            self.journalInode: int = decoder.leBytesToDecimal(data, 224, 227)
+            self.journalInode: int = fields.journalInode
             self.bit64 = data[0x60] & 0b10000000 == 0b10000000
 
         # ext4 has a group descriptor size specified in the super block.
         if diskO.diskType == "ext4":
             self.hasExtent = (data[0x60] & 0b01000000) == 0b01000000
-            self.groupDescriptorSize: int = decoder.leBytesToDecimal(data, 254, 255)
+            self.groupDescriptorSize: int = fields.groupDescriptorSize
 
         if diskO.diskType == "ext4" and self.bit64:
-            self.groupDescriptorSize: int = decoder.leBytesToDecimal(data, 254, 255)
+            self.groupDescriptorSize: int = fields.groupDescriptorSize
         # The group descriptor size for ext2/3 is always 32 bytes.
         # If the bit64 flag is false in ext4, the group descriptor size is also 32.
         elif diskO.diskType == "ext3" or diskO.diskType == "ext2" or (diskO.diskType == "ext4" and not self.bit64):
             self.groupDescriptorSize: int = 32
 
-        self.inodeSize: int = decoder.leBytesToDecimal(data, 88, 89)
-        self.inodesPerGroup: int = decoder.leBytesToDecimal(data, 40, 43)
-        self.blocksPerGroup: int = decoder.leBytesToDecimal(data, 32, 35)
-        self.blockSize: int = pow(2, (10 + decoder.leBytesToDecimal(data, 24, 27)))
-        self.numBlocks: int = decoder.leBytesToDecimal(data, 4, 7)
-        self.numInodes: int = decoder.leBytesToDecimal(data, 0, 3)
+        self.inodeSize: int = fields.inodeSize
+        self.inodesPerGroup: int = fields.inodesPerGroup
+        self.blocksPerGroup: int = fields.blocksPerGroup
+        self.blockSize: int = pow(2, (10 + fields.logBlockSize))
+        self.numBlocks: int = fields.numBlocks
+        self.numInodes: int = fields.numInodes
+        self.uuid: str = bytes(data[0x68:0x78]).hex()
+        self.changeIndicator: tuple = (fields.writeTime, fields.mountCount, fields.freeBlocks, fields.freeInodes)
 
         # 256 and 128 are the only possible inode sizes.
         # Sometimes, this field may not be set in the super block. In that case it is 128.
@@ -1 +1,3 @@
-from src.FAT.directory_tree import entry_set, entries
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("entry_set", "entries", "entry_table"))
\ No newline at end of file
@@ -2,6 +2,25 @@
 from src import common
 
 
+# The exFAT File directory entry (entry type 0x85, or 0x05 once deleted).
+FILE_DIR_ENTRY = common.layout.Layout("FileDirEntry", "little",
+    entryType=common.layout.Field(0, 1),
+    numSeconds=common.layout.Field(1, 1),
+    attributes=common.layout.Field(4, 2))
+
+# The exFAT Stream Extension directory entry (entry type 0xC0, or 0x40 once deleted).
+STREAM_EXT_ENTRY = common.layout.Layout("StreamExtEntry", "little",
+    flags=common.layout.Field(1, 1),
+    nameLen=common.layout.Field(3, 1),
+    firstCluster=common.layout.Field(20, 4),
+    dataLen=common.layout.Field(24, 8))
+
+# The FAT32 short name directory entry. The starting cluster is split into DIR_FstClusLO and DIR_FstClusHI.
+FAT32_ENTRY = common.layout.Layout("FAT32Entry", "little",
+    startingClust=common.layout.Field(0x1A, 2, 0x14, 2),
+    dataLen=common.layout.Field(0x1C, 4))
+
+
 class FileDirEntry:
 
     """
@@ -28,18 +47,16 @@ class FileDirEntry:
             The data associated with the first directory entry in this directory entry set.
         """
 
-        decoder = common.decode.Decoder
+        fields = FILE_DIR_ENTRY.unpack(data)
 
-        if data[0] == 0x85:
+        if fields.entryType == 0x85:
             self.isInUse: bool = True
-        elif data[0] == 0x05:
+        elif fields.entryType == 0x05:
             self.isInUse: bool = False
 
-        self.numSeconds: int = decoder.leBytesToDecimal(self, data, 1, 1)
-
-        attributes = data[4:6]
+        self.numSeconds: int = fields.numSeconds
 
-        self.isDir: bool = attributes[0] & 0b00010000 == 0b0001000
+        self.isDir: bool = fields.attributes & 0b00010000 == 0b00010000
 
 class StreamExtEntry:
 
@@ -70,14 +87,13 @@ class StreamExtEntry:
             The data associated with the stream extension directory entry.
         """
 
-        decoder = common.decode.Decoder
+        fields = STREAM_EXT_ENTRY.unpack(data)
 
-        flags = data[1]
-        # TODO: test whether FAT entries are zeroed out when file is deleted
-        self.hasFatChain: bool = flags & 0b01 != 0b01
-        self.nameLen: int = decoder.leBytesToDecimal(self, data, 3, 3)
-        self.firstCluster: int = decoder.leBytesToDecimal(self, data, 20, 23)
-        self.dataLen: int = decoder.leBytesToDecimal(self, data, 24, 31)
+        # Bit 1 of the flags is NoFatChain. Bit 0 (AllocationPossible) is set for any file with clusters.
+        self.hasFatChain: bool = fields.flags & 0b10 != 0b10
+        self.nameLen: int = fields.nameLen
+        self.firstCluster: int = fields.firstCluster
+        self.dataLen: int = fields.dataLen
 
 
 class NameEntry:
@@ -145,21 +161,21 @@ class FAT32Entry:
         self.name: str = ""
         if self.isLongName:
             try:
-                self.name = data[0x01 : 0x0B].decode(encoding="utf-16", errors="strict")
-                self.name = self.name + data[0x0E : 0x1A].decode(encoding="utf-16", errors="strict")
-                self.name = self.name + data[0x1C : ].decode(encoding="utf-16", errors="strict")
+                self.name = bytes(data[0x01 : 0x0B]).decode(encoding="utf-16", errors="strict")
+                self.name = self.name + bytes(data[0x0E : 0x1A]).decode(encoding="utf-16", errors="strict")
+                self.name = self.name + bytes(data[0x1C : ]).decode(encoding="utf-16", errors="strict")
             except UnicodeDecodeError:
                 self.name = "Name"
         else:
-            decoder = common.decode.Decoder
+            fields = FAT32_ENTRY.unpack(data)
 
             self.isDeleted: bool = data[0] == 0xE5
             attributes = data[0x0B]
             self.isDir: bool = attributes & 0b00010000 == 0b00010000
             self.volLabelFlag: bool = attributes & 0b00001000 == 0b00001000
-            self.dataLen: int = decoder.leBytesToDecimal(self, data, 0x1C, 0x1F)
-            self.startingClust: int = decoder.leBytesToDecimalLowerAndUpper(self, data, 0x1A, 0x1B, 0x14, 0x15)
+            self.dataLen: int = fields.dataLen
+            self.startingClust: int = fields.startingClust
             try:
-                self.name = data[0x01 : 0x0B].decode()
+                self.name = bytes(data[0x01 : 0x0B]).decode()
             except UnicodeDecodeError:
                 self.name = "Name"
@@ -1,7 +1,6 @@
 
 from math import ceil
 
-from src import common
 from src.FAT import directory_tree
 from src.FAT import structures
 
@@ -21,19 +20,29 @@ class EntrySet:
         if it is not currently in use, it is assumed that is has been deleted.
     name : str
         The full file/dir name.
+    dataLen : int
+        The length in bytes of the file/dir, from the first stream extension entry.
     clustRuns : list[tuple]
-        A list of tuple (firstClustNum, runSize). There is only more than one tuple
+        A list of tuple (firstClustNum, runSize), where runSize is in bytes. There is only more than one tuple
         in the list when the data is fragmented.
+    allocatedFractions : list[float]
+        For each run in clustRuns, the fraction of its clusters which are now allocated (to other files, if this one
+        has been deleted), from the allocation bitmap. None if the allocation bitmap was not read.
+    allocatedFraction : float
+        The fraction of all of the clusters in clustRuns which are now allocated. 1.0 if the data is certainly overwritten.
+        None if the allocation bitmap was not read.
 
     Methods
     -------
-    getClustRuns(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector) -> list:
+    getClustRuns(self, bootSector: structures.boot_sector.BootSector, fatTable: structures.fat_table.FatTable) -> list:
         A helper function to __init__. It gets the clustRuns for the entry set.
-    getFatPointer(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, clustNum) -> int
-        Reads the FAT entry for the given cluster, returning a pointer to the next cluster in the file/dir.
+    getAllocatedFractions(self, bootSector: structures.boot_sector.BootSector, allocationBitmap: structures.allocation_bitmap.AllocationBitmap)
+    -> tuple
+        A helper function to __init__. It gets the allocatedFractions and allocatedFraction for the entry set.
     """
 
-    def __init__(self, data: bytes, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, readPointers: bool):
+    def __init__(self, data: bytes, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, readPointers: bool,
+    fatTable: structures.fat_table.FatTable = None, allocationBitmap: structures.allocation_bitmap.AllocationBitmap = None):
 
         """
         Parameters
@@ -46,10 +55,18 @@ class EntrySet:
             The boot sector object associated with the disk.
         readPointers : bool
             Indicates whether the data pointers to this file/dir should be read.
+        fatTable : structures.fat_table.FatTable
+            The FAT of the disk, used to read the data pointers of fragmented files/dirs.
+            Shared by the entry sets of a scan, so that the FAT is only read once. If None, the FAT is read for this entry set.
+        allocationBitmap : structures.allocation_bitmap.AllocationBitmap
+            The allocation bitmap of the disk, used to find how much of the data has been overwritten.
+            If None (or readPointers is False), allocatedFractions and allocatedFraction are None.
         """
 
         self.fileDirEntry: directory_tree.entries.FileDirEntry = directory_tree.entries.FileDirEntry
         self.streamExtEntries = []
+        self.allocatedFractions: list = None
+        self.allocatedFraction: float = None
         nameEntries = []
 
         if data[0] == 0x85 or data[0] == 0x05:
@@ -67,6 +84,10 @@ class EntrySet:
                     else:
                         nameEntries.append(directory_tree.entries.NameEntry(data[i: i + 32], nameLen))
 
+            self.dataLen: int = 0
+            if len(self.streamExtEntries) > 0:
+                self.dataLen = self.streamExtEntries[0].dataLen
+
             self.name = ""
             tempName = ""
             for name in nameEntries:
@@ -78,26 +99,31 @@ class EntrySet:
 
 
             if readPointers:
-                self.clustRuns = self.getClustRuns(diskO.diskPath, bootSector)
+                if fatTable is None:
+                    fatTable = structures.fat_table.FatTable(diskO, bootSector)
+                self.clustRuns = self.getClustRuns(bootSector, fatTable)
+                if allocationBitmap is not None:
+                    self.allocatedFractions, self.allocatedFraction = self.getAllocatedFractions(bootSector, allocationBitmap)
         else:
             return
 
-    def getClustRuns(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector) -> list:
+    def getClustRuns(self, bootSector: structures.boot_sector.BootSector, fatTable: structures.fat_table.FatTable) -> list:
 
         """
         A helper function to __init__. It gets the clustRuns for the entry set.
+        Fragmented files are followed through fatTable, in memory, and consecutive clusters are joined into one run.
 
         Parameters
         ----------
-        diskO : structures.disks.disk
-            The disk object associated with the disk containing the entry set.
         bootSector : structures.boot_sector.BootSector
             The boot sector object associated with the disk.
+        fatTable : structures.fat_table.FatTable
+            The FAT of the disk containing the entry set.
 
         Returns
         -------
         clustRuns : list[tuple]
-            A list of tuple (firstClustNum, runSize). There is only more than one tuple
+            A list of tuple (firstClustNum, runSize), where runSize is in bytes. There is only more than one tuple
             in the list when the data is fragmented.
         """
 
@@ -110,60 +136,50 @@ class EntrySet:
 
             else:
                 clusterSize = bootSector.bytesPerSector * bootSector.sectorsPerCluster
-                runSize = 0
-                currentClust = streamExt.firstCluster
-                firstRunClust = currentClust
-                prevClust = currentClust - 1
+                remaining = streamExt.dataLen
 
-
-                while currentClust < 4294967295:
+                for firstRunClust, numClusters in fatTable.getChainRuns(streamExt.firstCluster, ceil(streamExt.dataLen / clusterSize)):
+                    # The last cluster of the file is only partly used.
+                    runSize = min(numClusters * clusterSize, remaining)
                     clustRuns.append((firstRunClust, runSize))
-                    firstRunClust = currentClust
-                    runSize = 0
-
-                    while currentClust == prevClust + 1:
-                        runSize += clusterSize
-                        prevClust = currentClust
-                        # Note: it seems inneficient to do this one pointer at a time.
-                        currentClust = self.getFatPointer(diskO.diskPath, bootSector, currentClust)
-
-                clustRuns.append((firstRunClust, runSize))
+                    remaining -= runSize
 
         return clustRuns
 
-    def getFatPointer(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, clustNum: int) -> int:
+    def getAllocatedFractions(self, bootSector: structures.boot_sector.BootSector,
+    allocationBitmap: structures.allocation_bitmap.AllocationBitmap) -> tuple:
 
         """
-        Reads the FAT entry for the given cluster, returning a pointer to the next cluster in the file/dir
+        A helper function to __init__. It gets the fraction of the clusters of each run which are now allocated.
 
         Parameters
         ----------
-        diskO : structures.disks.disk
-            The disk object associated with the disk containing the FAT.
         bootSector : structures.boot_sector.BootSector
             The boot sector object associated with the disk.
-        clusNum : int
-            The cluster number to look at in the FAT.
+        allocationBitmap : structures.allocation_bitmap.AllocationBitmap
+            The allocation bitmap of the disk containing the entry set.
 
         Returns
         -------
-        pointer : int
-            A refernce to the next cluster number in the file/dir.
+        fractions : tuple
+            (allocatedFractions, allocatedFraction). allocatedFraction is 0.0 if there are no clusters in clustRuns.
         """
 
-        decoder = common.decode.Decoder
+        clusterSize = bootSector.bytesPerSector * bootSector.sectorsPerCluster
 
-        fatOffset = bootSector.fatOffset * bootSector.bytesPerSector
-        clustOffset = clustNum * 8
+        allocatedFractions = []
+        totalClusters = 0
+        totalAllocated = 0
 
-        disk = open(diskO.diskPath, "rb")
-        disk.seek(fatOffset + clustOffset)
-        data = disk.read(8)
-        disk.close()
+        for firstRunClust, runSize in self.clustRuns:
+            numClusters = ceil(runSize / clusterSize)
+            numAllocated = allocationBitmap.countAllocated(firstRunClust, numClusters)
 
-        pointer = decoder.leBytesToDecimal(data, 0, 7)
+            allocatedFractions.append(numAllocated / numClusters if numClusters > 0 else 0.0)
+            totalClusters += numClusters
+            totalAllocated += numAllocated
 
-        return pointer
+        return (allocatedFractions, totalAllocated / totalClusters if totalClusters > 0 else 0.0)
 
 
 class FAT32EntrySet:
@@ -179,9 +195,23 @@ class FAT32EntrySet:
         The length in bytes of the associated file/dir.
     name : str
         The name associated with the file/dir.
+    clustRuns : list[tuple]
+        The reconstructed location of the file's data, as a list of tuple (firstClustNum, runSize), where runSize is in bytes.
+        The chain of a deleted file is freed, so its data is assumed to be in the free clusters from startingClust on
+        (see structures.fat_table.FatTable.getFreeClusterRuns). Only free clusters are included, and the list is empty if
+        startingClust has been reused. None if the FAT was not read.
+    allocatedFraction : float
+        The fraction of the clusters from startingClust which the file would use if it were not fragmented, which are now allocated.
+        1.0 if startingClust has been reused, so the data is certainly overwritten. None if the FAT was not read.
+
+    Methods
+    -------
+    getClustRuns(self, bootSector: structures.boot_sector.BootSector, fatTable: structures.fat_table.FatTable) -> tuple:
+        A helper function to __init__. It reconstructs the clustRuns for the entry set, and gets allocatedFraction.
     """
 
-    def __init__(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, dirSet: list):
+    def __init__(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, dirSet: list,
+    fatTable: structures.fat_table.FatTable = None):
         """
         Parameters
         ----------
@@ -190,10 +220,12 @@ class FAT32EntrySet:
             Not actually used by the method currently. May use when checkFull is ready.
         bootSector : structures.boot_sector.BootSector
             The boot sector object associated with the disk.
-            Not actually used by the method currently. May use when checkFull is ready.
         dirSet : stack
             A stack containing the entries for the file/dir in order.
             Used to construct the full entry set.
+        fatTable : structures.fat_table.FatTable
+            The FAT of the disk, used to reconstruct where a deleted file's data is. Shared by the entry sets of a scan.
+            If None, clustRuns and allocatedFraction are None.
         """
 
         # dirSet is a stack. On top is shortName, followed by whatever longName it has
@@ -201,6 +233,8 @@ class FAT32EntrySet:
         entry: directory_tree.entries.FAT32Entry = dirSet.pop()
         self.startingClust: int = entry.startingClust
         self.dataLen: int = entry.dataLen
+        self.clustRuns: list = None
+        self.allocatedFraction: float = None
         tempName = entry.name
         self.name: str = ""
 
@@ -214,3 +248,44 @@ class FAT32EntrySet:
         for char in tempName:
             if ord(char) > 0 and ord(char) <= 128:
                 self.name = self.name + char
+
+        if fatTable is not None:
+            self.clustRuns, self.allocatedFraction = self.getClustRuns(bootSector, fatTable)
+
+    def getClustRuns(self, bootSector: structures.boot_sector.BootSector, fatTable: structures.fat_table.FatTable) -> tuple:
+
+        """
+        A helper function to __init__. It reconstructs the clustRuns for the entry set, and gets allocatedFraction.
+
+        Parameters
+        ----------
+        bootSector : structures.boot_sector.BootSector
+            The boot sector object associated with the disk.
+        fatTable : structures.fat_table.FatTable
+            The FAT of the disk containing the entry set.
+
+        Returns
+        -------
+        reconstruction : tuple
+            (clustRuns, allocatedFraction). allocatedFraction is 0.0 if the file has no data.
+        """
+
+        clusterSize = bootSector.bytesPerSector * bootSector.sectorsPerCluster
+        numClusters = ceil(self.dataLen / clusterSize)
+        if numClusters == 0:
+            return ([], 0.0)
+
+        clustRuns = []
+        remaining = self.dataLen
+        numContiguousFree = 0
+
+        for firstRunClust, runClusters in fatTable.getFreeClusterRuns(self.startingClust, numClusters):
+            # The last cluster of the file is only partly used.
+            runSize = min(runClusters * clusterSize, remaining)
+            clustRuns.append((firstRunClust, runSize))
+            remaining -= runSize
+
+            # The free clusters within the clusters the file would use if it were not fragmented.
+            numContiguousFree += max(0, min(firstRunClust + runClusters, self.startingClust + numClusters) - firstRunClust)
+
+        return (clustRuns, 1.0 - (numContiguousFree / numClusters))
@@ -0,0 +1,80 @@
+import re
+
+# numpy is optional. Without it, the entry types are searched as bytes instead.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# The entry types of an exFAT File directory entry: 0x85 in use, or 0x05 once deleted.
+FILE_ENTRY_TYPES = re.compile(b"[\x85\x05]")
+
+# The entry types of a Stream Extension entry, which must follow each File entry: 0xC0 in use, or 0x40 once deleted.
+STREAM_EXT_ENTRY_TYPES = (0xC0, 0x40)
+
+# The directory attribute, in the attributes of a File entry (byte 4).
+DIRECTORY_ATTRIBUTE = 0x10
+
+
+class EntryTable:
+
+    """
+    Parses a buffer of exFAT directory entries (such as a whole directory) at once, as fixed 32 byte records.
+    Only the entry type of each record, and the attributes of File entries, are examined: File entries are found
+    with a single pass over the entry types (with numpy when it is available, or as bytes otherwise).
+    The entry sets of live files are skipped, so only deleted files and directories need to be decoded as EntrySet objects.
+
+    Attributes
+    ----------
+    numEntries : int
+        The number of entries in the buffer, up to the end of directory marker (entry type 0x00).
+    entrySets : list[tuple]
+        The entry sets of deleted files and of directories, as tuples (byte offset, length in bytes, isDir), in the order found.
+        The entry sets of deleted directories are included.
+    """
+
+    def __init__(self, data: bytes):
+
+        """
+        Parameters
+        ----------
+        data : bytes
+            The directory entries to parse. Any buffer (bytes, memoryview...) is accepted.
+        """
+
+        numRecords = len(data) // 32
+
+        if numpy is not None:
+            records = numpy.frombuffer(data, dtype=numpy.uint8, count=32 * numRecords).reshape(numRecords, 32)
+            types = records[:, 0]
+
+            ends = numpy.flatnonzero(types == 0)
+            self.numEntries: int = int(ends[0]) if len(ends) > 0 else numRecords
+
+            types = types[:self.numEntries]
+            isDir = (records[:self.numEntries, 4] & DIRECTORY_ATTRIBUTE) != 0
+            candidates = numpy.flatnonzero((types == 0x05) | ((types == 0x85) & isDir)).tolist()
+            types = types.tobytes()
+
+        else:
+            types = bytes(data[0:32 * numRecords:32])
+
+            end = types.find(b"\x00")
+            self.numEntries: int = end if end >= 0 else numRecords
+
+            types = types[:self.numEntries]
+            candidates = [match.start() for match in FILE_ENTRY_TYPES.finditer(types)
+                if types[match.start()] == 0x05 or data[(32 * match.start()) + 4] & DIRECTORY_ATTRIBUTE]
+
+        self.entrySets: list[tuple] = []
+        for index in candidates:
+            offset = 32 * index
+            numSeconds = data[offset + 1]
+
+            # A File entry is followed by at least a Stream Extension entry and a File Name entry,
+            # all within the directory. Anything else is not a valid entry set (such as a partly overwritten one).
+            if numSeconds < 2 or index + numSeconds >= self.numEntries or types[index + 1] not in STREAM_EXT_ENTRY_TYPES:
+                continue
+
+            self.entrySets.append((offset, 32 * (numSeconds + 1), data[offset + 4] & DIRECTORY_ATTRIBUTE != 0))
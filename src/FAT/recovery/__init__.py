@@ -1 +1,3 @@
-from src.FAT.recovery import recovery
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("recovery",))
\ No newline at end of file
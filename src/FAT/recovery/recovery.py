@@ -1,9 +1,18 @@
 
 
+from collections import deque
+from concurrent.futures import Future
+from math import ceil
+
 from src.FAT import structures
 from src.FAT import directory_tree
-from src.common import decode
-import os
+from src.common import block_device, copy_engine, decode, recovery_executor, scan_cache
+
+
+# A FAT32 directory holds at most 65536 entries of 32 bytes, and an exFAT directory at most 256 MiB.
+# Longer chains are not followed.
+MAX_FAT32_DIR_SIZE = 65536 * 32
+MAX_EXFAT_DIR_SIZE = 256 * 1024 * 1024
 
 class Recovery:
 
@@ -12,17 +21,36 @@ class Recovery:
 
     Methods
     -------
-    recoverFiles(self, diskO: structures.disks.Disk, deletedFiles, outputDir) -> int
+    recoverFiles(self, diskO: structures.disks.Disk, deletedFiles, outputDir, executor: recovery_executor.RecoveryExecutor = None) -> int
         Attempts to recover the files that the user has selected.
-    getDeletedFiles(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector) -> list
+    submitFiles(self, executor: recovery_executor.RecoveryExecutor, diskO: structures.disks.Disk, deletedFiles, outputDir) -> list[Future]
+        Submits the recovery of the files that the user has selected to executor.
+    recoverFile(self, copyEngine: copy_engine.CopyEngine, runs: list, filePath: str) -> bool
+        Recovers a single file, given the runs of bytes on disk which contain its data.
+    getDeletedFiles(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, useCache: bool = False) -> list
         Gets a list of all deleted files. calls specific getDeleted methods for the differnt filesystems.
+    iterDeletedFileBatches(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, useCache: bool = False)
+    -> iterator[tuple]
+        Yields the deleted files in each directory as soon as the directory has been read.
      FAT32GetDeleted(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector) -> list
         Gets a list of all deleted files in a FAT32 filesystem.
+    getChangeIndicator(self, fatTable: structures.fat_table.FatTable, allocationBitmap: structures.allocation_bitmap.AllocationBitmap = None)
+    -> tuple
+        Gets a value which changes whenever a file is deleted from the volume.
+    FAT32IterDeleted(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, fatTable: structures.fat_table.FatTable = None)
+    -> iterator[list]
+        Walks the directory tree of a FAT32 filesystem, yielding the deleted files in each directory.
+    readRuns(self, device: block_device.BlockDevice, clustRuns: list, bytesPerCluster: int, firstClusterLoc: int) -> bytes
+        Reads runs of clusters, such as the clusters of a directory, with one read for each run.
     exFATGetDeleted(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector) -> list
         Gets a list of deleted files in a exFAT filesystem.
+    exFATIterDeleted(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, fatTable: structures.fat_table.FatTable = None,
+    allocationBitmap: structures.allocation_bitmap.AllocationBitmap = None) -> iterator[list]
+        Walks the directory tree of a exFAT filesystem, yielding the deleted files in each directory.
     """
 
-    def recoverFiles(self, diskO: structures.disks.Disk, deletedFiles: list, outputDir: str) -> int:
+    def recoverFiles(self, diskO: structures.disks.Disk, deletedFiles: list, outputDir: str,
+    executor: recovery_executor.RecoveryExecutor = None) -> int:
 
         """
         Attempts to recover the files that the user has selected.
@@ -35,12 +63,47 @@ class Recovery:
             A list of the user selected files to recover.
         outputDir : str
             The path of the output directory.
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files in parallel. If this is None, one is created for these files.
 
         Recurns
         -------
         The number of recovered files.
         """
 
+        if executor is None:
+            with recovery_executor.RecoveryExecutor() as executor:
+                return self.recoverFiles(diskO, deletedFiles, outputDir, executor)
+
+        futures = self.submitFiles(executor, diskO, deletedFiles, outputDir)
+
+        return sum(executor.getResults(futures))
+
+
+    def submitFiles(self, executor: recovery_executor.RecoveryExecutor, diskO: structures.disks.Disk, deletedFiles: list,
+    outputDir: str) -> list:
+
+        """
+        Submits the recovery of the files that the user has selected to executor.
+
+        Parameters
+        ----------
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files.
+        diskO : structures.disks.disk
+            The disk object for the disk being used.
+        deletedFiles : list
+            A list of the user selected files to recover.
+        outputDir : str
+            The path of the output directory.
+
+        Returns
+        -------
+        futures : list[Future]
+            A future for each file in deletedFiles, in order. Its result is True once the file is recovered,
+            or False if none of the file's clusters could be found (such as when its first cluster has been reused).
+        """
+
         bootSector = structures.boot_sector.BootSector(diskO)
         bytesPerCluster = bootSector.bytesPerSector * bootSector.sectorsPerCluster
 
@@ -49,27 +112,71 @@ class Recovery:
         elif diskO.diskType == "FAT32":
             firstClusterLoc = bootSector.bytesPerSector * (bootSector.reservedSectors + (bootSector.sectorsPerFAT * bootSector.numFATs))
 
+        copyEngine = copy_engine.CopyEngine(block_device.getBlockDevice(diskO.diskPath))
+
+        futures = []
+
+        numRecovered = 0
         for file in deletedFiles:
-            disk = open(diskO.diskPath, "rb")
-            newFilePath = "%s/recoveredFile_%s" % (outputDir, file.name)
 
-            recoveredFile = open(newFilePath, "wb")
+            # Nothing is written for a file with no clusters to copy, rather than an empty file.
+            if len(file.clustRuns) == 0:
+                future = Future()
+                future.set_result(False)
+                futures.append(future)
+                continue
+
+            numRecovered += 1
+
+            # Deleted files in different directories may have the same name, and are recovered at the same time,
+            # so each is given its own path.
+            newFilePath = "%s/recoveredFile_%s_num_%d" % (outputDir, file.name, numRecovered)
+
+            # Each run is (byte offset on disk, length in bytes). For FAT32, the runs are the free clusters
+            # reconstructed by the scan, so clusters which have been reused are not copied.
+            runs = [((bytesPerCluster * (clustRun[0] - 2)) + firstClusterLoc, clustRun[1]) for clustRun in file.clustRuns]
+
+            numBytes = sum(run[1] for run in runs)
+            futures.append(executor.submit(self.recoverFile, numBytes, copyEngine, runs, newFilePath))
+
+        return futures
+
+
+    def recoverFile(self, copyEngine: copy_engine.CopyEngine, runs: list, filePath: str) -> bool:
+
+        """
+        Recovers a single file, given the runs of bytes on disk which contain its data.
+
+        Parameters
+        ----------
+        copyEngine : copy_engine.CopyEngine
+            Copies the data of the file from the disk.
+        runs : list[tuple]
+            The data of the file, as tuples (byte offset on disk, length in bytes), in order.
+        filePath : str
+            The path of the recovered file.
+
+        Returns
+        -------
+        Explicit:
+        recovered : bool
+            True once the file is recovered.
+
+        Implicit:
+            Writes the recovered file to filePath.
+        """
 
-            if diskO.diskType == "EXFA":
-                for clustRun in file.clustRuns:
-                    disk.seek((bytesPerCluster * (clustRun[0] - 2)) + firstClusterLoc)
-                    recoveredFile.write(disk.read(clustRun[1]))
-            elif diskO.diskType == "FAT32":
-                disk.seek(bytesPerCluster * (file.startingClust - 2) + firstClusterLoc)
-                recoveredFile.write(disk.read(file.dataLen))
+        recoveredFile = open(filePath, "wb")
 
-            disk.close
-            recoveredFile.close
+        for offset, length in runs:
+            copyEngine.copyRun(recoveredFile, offset, length)
 
-        return len(deletedFiles)
+        recoveredFile.close()
 
+        return True
 
-    def getDeletedFiles(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector) -> list:
+
+    def getDeletedFiles(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, useCache: bool = False) -> list:
 
         """
         Gets a list of all deleted files. calls specific getDeleted methods for the differnt filesystems.
@@ -80,16 +187,103 @@ class Recovery:
             The disk object for the disk to recover from.
         bootSector : strucures.boot_sector.BootSector
             The boot sector objects associated with the disk.
+        useCache : bool
+            If True, the result of the previous scan of this volume is returned if the volume has not changed since
+            (see scan_cache.ScanCache), and the result of a new scan is stored.
 
         Returns
         -------
         A list of the deleted files.
         """
 
+        return [entrySet for batch, fraction in self.iterDeletedFileBatches(diskO, bootSector, useCache) for entrySet in batch]
+
+
+    def iterDeletedFileBatches(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector, useCache: bool = False):
+
+        """
+        Yields the deleted files in each directory as soon as the directory has been read.
+        Used to show the deleted files while the scan continues (see background_scan.BackgroundScan).
+
+        Parameters
+        ----------
+        diskO : structures.disks.Disk
+            The disk object for the disk to recover from.
+        bootSector : strucures.boot_sector.BootSector
+            The boot sector objects associated with the disk.
+        useCache : bool
+            If True, the result of the previous scan of this volume is yielded at once if the volume has not changed since
+            (see scan_cache.ScanCache), and the result of a new, complete scan is stored.
+
+        Returns
+        -------
+        batches : iterator[tuple]
+            Tuples (deletedFiles, fraction). The number of directories is not known in advance, so fraction is None
+            until the scan is complete.
+        """
+
+        # Blocks cached during a previous scan may have changed on disk.
+        block_device.getBlockDevice(diskO.diskPath).clearCache()
+
+        # The FAT, and in exFAT the allocation bitmap, are read once: to tell whether the volume has changed
+        # since the previous scan, and then for the scan itself.
+        fatTable = structures.fat_table.FatTable(diskO, bootSector)
+        allocationBitmap = None
+        if diskO.diskType == "EXFA":
+            allocationBitmap = structures.allocation_bitmap.AllocationBitmap(diskO, bootSector, fatTable)
+
+        scanCache = scan_cache.ScanCache()
+        volumeId = "%08x" % bootSector.volumeId
+        changeIndicator = self.getChangeIndicator(fatTable, allocationBitmap)
+
+        # Results stored before entry sets recorded their clusters, and how much of them is allocated, are kept under other keys,
+        # so they are not loaded.
+        scanType = "%s clusters" % diskO.diskType
+        if useCache:
+            cachedFiles = scanCache.load(scanType, volumeId, changeIndicator)
+            if cachedFiles is not None:
+                yield (cachedFiles, 1.0)
+                return
+
         if diskO.diskType == "EXFA":
-            return self.exFATGetDeleted(diskO, bootSector)
+            batches = self.exFATIterDeleted(diskO, bootSector, fatTable, allocationBitmap)
         elif diskO.diskType == "FAT32":
-            return self.FAT32GetDeleted(diskO, bootSector)
+            batches = self.FAT32IterDeleted(diskO, bootSector, fatTable)
+
+        deletedFiles = []
+        for batch in batches:
+            deletedFiles.extend(batch)
+            yield (batch, None)
+
+        if useCache:
+            scanCache.store(scanType, volumeId, changeIndicator, deletedFiles)
+
+
+    def getChangeIndicator(self, fatTable: structures.fat_table.FatTable, allocationBitmap: structures.allocation_bitmap.AllocationBitmap = None) -> tuple:
+
+        """
+        Gets a value which changes whenever a file is deleted from the volume: the digest of the allocation bitmap in exFAT
+        (which does not always free the FAT chain of a deleted file), or the digest of the FAT in FAT32.
+        Is a helper method for iterDeletedFileBatches.
+
+        Parameters
+        ----------
+        fatTable : structures.fat_table.FatTable
+            The FAT of the volume.
+        allocationBitmap : structures.allocation_bitmap.AllocationBitmap
+            The allocation bitmap of an exFAT volume. None for FAT32. The FAT is used if the bitmap was not found.
+
+        Returns
+        -------
+        changeIndicator : tuple
+            (digest,).
+        """
+
+        if allocationBitmap is not None and allocationBitmap.bitmap is not None:
+            return (allocationBitmap.getDigest(),)
+
+        return (fatTable.getDigest(),)
+
 
     def FAT32GetDeleted(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector) -> list:
 
@@ -110,23 +304,61 @@ class Recovery:
 
         """
 
+        return [entrySet for batch in self.FAT32IterDeleted(diskO, bootSector) for entrySet in batch]
+
+
+    def FAT32IterDeleted(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector,
+    fatTable: structures.fat_table.FatTable = None):
+
+        """
+        Walks the directory tree of a FAT32 filesystem, yielding the deleted files in each directory.
+        Directories are read breadth first, each once, and whole: the clusters after the first are found by following
+        the directory's chain in the FAT, and each run of consecutive clusters is read at once.
+
+        Parameters
+        ----------
+        diskO : structures.disks.Disk.
+            The disk object for the disk to recover from.
+        bootSector : strucures.boot_sector.BootSector
+            The boot sector objects associated with the disk.
+        fatTable : structures.fat_table.FatTable
+            The FAT of the disk, if it has already been read.
+
+        Returns
+        -------
+        deletedFiles : iterator[list]
+            A list of the deleted files (FAT32EntrySet) in each directory read.
+        """
+
         bytesPerCluster = bootSector.bytesPerSector * bootSector.sectorsPerCluster
         firstClusterLoc = bootSector.bytesPerSector * (bootSector.reservedSectors + (bootSector.sectorsPerFAT * bootSector.numFATs))
-        rootDirOffset = firstClusterLoc + (bytesPerCluster * (bootSector.rootDirectoryCluster - 2))
+        maxDirClusters = ceil(MAX_FAT32_DIR_SIZE / bytesPerCluster)
 
-        disk = open(diskO.diskPath, "rb")
-        disk.seek(rootDirOffset)
-        data = disk.read(bytesPerCluster)
+        device = block_device.getBlockDevice(diskO.diskPath)
+
+        # Directories span as many clusters as their entries need, so they are read by following their chains in the FAT.
+        # The FAT also gives the free clusters, from which the data of each deleted file is reconstructed.
+        if fatTable is None:
+            fatTable = structures.fat_table.FatTable(diskO, bootSector)
 
         decoder = decode.Decoder
 
-        dirSets = [] # this is a queue of FAT32EntrySet
-        deletedFiles = [] # this is a list of FAT32EntrySet
+        # The directories to read, as (first cluster, whether the directory is in use), in the order found.
+        dirQueue = deque([(bootSector.rootDirectoryCluster, True)])
+        visitedClusters = {bootSector.rootDirectoryCluster}
 
         inRoot = True
-        while len(data) > 0:
+        while len(dirQueue) > 0:
+            firstClust, isInUse = dirQueue.popleft()
+
+            # The chain of a deleted directory has been freed, so only its first cluster is known to be part of it.
+            clustRuns = [(clustRun[0], clustRun[1] * bytesPerCluster) for clustRun in fatTable.getChainRuns(firstClust, maxDirClusters if isInUse else 1)]
+            data = self.readRuns(device, clustRuns, bytesPerCluster, firstClusterLoc)
+
+            deletedFiles = [] # this is a list of FAT32EntrySet
+
             # Make sure the data is actually a directory, important of the dir was deleted.
-            if inRoot or decoder.beBytesToDecimal(self, data, 0, 2) == 3022880:
+            if len(data) > 0 and (inRoot or decoder.beBytesToDecimal(self, data, 0, 2) == 3022880):
                 numDirs = 0
 
                 currentOffset = 0
@@ -141,22 +373,47 @@ class Recovery:
                         if currentEntrySet[-1].isDir:
                             if not inRoot and numDirs < 2:
                                 pass
-                            else:
-                                dirSets.append(directory_tree.entry_set.FAT32EntrySet(diskO, bootSector, currentEntrySet))
+                            elif currentEntrySet[-1].startingClust not in visitedClusters:
+                                # A directory may be reached twice, such as a deleted directory whose cluster now holds another.
+                                visitedClusters.add(currentEntrySet[-1].startingClust)
+                                dirQueue.append((currentEntrySet[-1].startingClust, not currentEntrySet[-1].isDeleted))
                             numDirs += 1
                         elif currentEntrySet[-1].isDeleted:
-                            deletedFiles.append(directory_tree.entry_set.FAT32EntrySet(diskO, bootSector, currentEntrySet))
+                            deletedFiles.append(directory_tree.entry_set.FAT32EntrySet(diskO, bootSector, currentEntrySet, fatTable))
                         currentEntrySet = []
 
-            data = []
-            if len(dirSets) > 0:
-                inRoot = False
-                dirSet = dirSets.pop(0)
-                disk.seek((bytesPerCluster * (dirSet.startingClust - 2)) + firstClusterLoc)
-                data = disk.read(bytesPerCluster)
-        disk.close
+            yield deletedFiles
+
+            inRoot = False
 
-        return deletedFiles
+
+    def readRuns(self, device: block_device.BlockDevice, clustRuns: list, bytesPerCluster: int, firstClusterLoc: int) -> bytes:
+
+        """
+        Reads runs of clusters, such as the clusters of a directory, with one read for each run.
+        Is a helper method for FAT32IterDeleted and exFATIterDeleted.
+
+        Parameters
+        ----------
+        device : block_device.BlockDevice
+            The reader for the disk.
+        clustRuns : list[tuple]
+            The runs to read, as tuples (firstClustNum, runSize), where runSize is in bytes.
+        bytesPerCluster : int
+            The number of bytes in each cluster.
+        firstClusterLoc : int
+            The byte offset of cluster 2 (the first cluster of the data region) from the start of the disk.
+
+        Returns
+        -------
+        data : bytes
+            The data in the runs, in order.
+        """
+
+        if len(clustRuns) == 1:
+            return device.read((bytesPerCluster * (clustRuns[0][0] - 2)) + firstClusterLoc, clustRuns[0][1])
+
+        return b"".join(device.read((bytesPerCluster * (clustRun[0] - 2)) + firstClusterLoc, clustRun[1]) for clustRun in clustRuns)
 
 
     def exFATGetDeleted(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector) -> list:
@@ -177,45 +434,75 @@ class Recovery:
             A list of the deleted files.
         """
 
+        return [entrySet for batch in self.exFATIterDeleted(diskO, bootSector) for entrySet in batch]
+
+
+    def exFATIterDeleted(self, diskO: structures.disks.Disk, bootSector: structures.boot_sector.BootSector,
+    fatTable: structures.fat_table.FatTable = None, allocationBitmap: structures.allocation_bitmap.AllocationBitmap = None):
+
+        """
+        Walks the directory tree of a exFAT filesystem, yielding the deleted files in each directory.
+        Directories are read breadth first, each once and whole. Each is parsed with directory_tree.entry_table.EntryTable,
+        so that EntrySet objects are only made for deleted files and directories.
+
+        Parameters
+        ----------
+        diskO : structures.disks.Disk
+            The disk object for the disk to recover from.
+        bootSector : strucures.boot_sector.BootSector
+            The boot sector objects associated with the disk.
+        fatTable : structures.fat_table.FatTable
+            The FAT of the disk, if it has already been read.
+        allocationBitmap : structures.allocation_bitmap.AllocationBitmap
+            The allocation bitmap of the disk, if it has already been read.
+
+        Returns
+        -------
+        deletedFiles : iterator[list]
+            A list of the deleted files (EntrySet) in each directory read.
+        """
+
         bytesPerCluster = bootSector.bytesPerSector * bootSector.sectorsPerCluster
 
         firstClusterLoc = (bootSector.clusterHeapOffset * bootSector.bytesPerSector)
 
-        rootDirOffset = firstClusterLoc + (bytesPerCluster * (bootSector.rootDirectoryCluster - 2))
+        device = block_device.getBlockDevice(diskO.diskPath)
 
-        disk = open(diskO.diskPath, "rb")
-        disk.seek(rootDirOffset)
-        data = disk.read(bytesPerCluster)
+        # The FAT is read once for the scan, and shared by every entry set to follow fragmented files.
+        if fatTable is None:
+            fatTable = structures.fat_table.FatTable(diskO, bootSector)
 
-        dirSets = []
-        deletedFiles = []
+        # The allocation bitmap is also read once, to find how much of each deleted file has been overwritten.
+        if allocationBitmap is None:
+            allocationBitmap = structures.allocation_bitmap.AllocationBitmap(diskO, bootSector, fatTable)
 
-        while len(data) > 0:
+        # Without a bitmap nothing is known of which clusters have been reused, so allocatedFraction is left as None,
+        # rather than every file being counted as overwritten.
+        if allocationBitmap.bitmap is None:
+            allocationBitmap = None
 
-            currentOffset = 0
+        # The root directory has no entry set, so its clusters are always found through the FAT.
+        rootRuns = [(clustRun[0], clustRun[1] * bytesPerCluster)
+            for clustRun in fatTable.getChainRuns(bootSector.rootDirectoryCluster, ceil(MAX_EXFAT_DIR_SIZE / bytesPerCluster))]
 
-            numSeconds = data[1]
+        # The runs of the directories to read, in the order found.
+        dirQueue = deque([rootRuns])
+        visitedClusters = {bootSector.rootDirectoryCluster}
 
-            while currentOffset < len(data) and data[currentOffset] > 0:
+        while len(dirQueue) > 0:
+            data = self.readRuns(device, dirQueue.popleft(), bytesPerCluster, firstClusterLoc)
 
-                numSeconds = data[currentOffset + 1]
-                while numSeconds == 0:
-                    currentOffset += 32
-                    numSeconds = data[currentOffset + 1]
+            deletedFiles = []
 
-                entrySet = directory_tree.entry_set.EntrySet(data[currentOffset : currentOffset + (32 * (numSeconds + 1))], diskO, bootSector, True)
-                currentOffset += 32 * (numSeconds + 1)
+            # Only the entry sets of deleted files and directories are decoded.
+            for offset, length, isDir in directory_tree.entry_table.EntryTable(data).entrySets:
+                entrySet = directory_tree.entry_set.EntrySet(data[offset:offset + length], diskO, bootSector, True, fatTable, allocationBitmap)
 
-                if entrySet.fileDirEntry.isDir:
-                    dirSets.append(entrySet)
-                elif not entrySet.fileDirEntry.isDir and not entrySet.isInUse:
+                if isDir:
+                    if len(entrySet.clustRuns) > 0 and entrySet.clustRuns[0][0] not in visitedClusters:
+                        visitedClusters.add(entrySet.clustRuns[0][0])
+                        dirQueue.append(entrySet.clustRuns)
+                elif not entrySet.isInUse:
                     deletedFiles.append(entrySet)
 
-            data = []
-            if len(dirSets) > 0:
-                dirSet = dirSets.pop(0)
-                for clustRun in dirSet.clustRuns:
-                    disk.seek((bytesPerCluster * (clustRun[0] - 2)) + firstClusterLoc)
-                    data = disk.read(clustRun[1])
-        disk.close
-        return deletedFiles
+            yield deletedFiles
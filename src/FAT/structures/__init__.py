@@ -1 +1,3 @@
-from src.FAT.structures import boot_sector, disks
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("allocation_bitmap", "boot_sector", "disks", "fat_table"))
\ No newline at end of file
@@ -0,0 +1,175 @@
+import hashlib
+from math import ceil
+
+from src import common
+from src.FAT.structures import boot_sector, disks, fat_table
+
+
+# The exFAT Allocation Bitmap directory entry (entry type 0x81), found in the root directory.
+BITMAP_ENTRY = common.layout.Layout("AllocationBitmapEntry", "little",
+    entryType=common.layout.Field(0, 1),
+    bitmapFlags=common.layout.Field(1, 1),
+    firstCluster=common.layout.Field(20, 4),
+    dataLen=common.layout.Field(24, 8))
+
+# The entry type of the Allocation Bitmap directory entry.
+BITMAP_ENTRY_TYPE = 0x81
+
+
+class AllocationBitmap:
+
+    """
+    The allocation bitmap of an exFAT filesystem, which records which clusters are in use.
+    Bit n of the bitmap (bit n % 8 of byte n // 8) is set if cluster n + 2 is allocated.
+    The bitmap is read once, and kept as it is stored: one bit for each cluster.
+
+    Attributes
+    ----------
+    clusterCount : int
+        The number of clusters in the cluster heap.
+    bitmap : bytes
+        The allocation bitmap. None if the volume has no allocation bitmap entry, as then nothing is known of which clusters
+        are allocated: the volume should be treated as having no bitmap, and countAllocated and isAllocated not used.
+
+    Methods
+    -------
+    readBitmap(self, device: common.block_device.BlockDevice, bootSector: boot_sector.BootSector, fatTable: fat_table.FatTable) -> bytes
+        Finds the allocation bitmap entry in the root directory, and reads the bitmap it points to.
+    isAllocated(self, clustNum: int) -> bool
+        Checks whether a cluster is in use.
+    countAllocated(self, firstClust: int, numClusters: int) -> int
+        Counts the clusters in use in a run of consecutive clusters.
+    getDigest(self) -> bytes
+        Gets a digest of the bitmap, which changes whenever a cluster is allocated or freed.
+    """
+
+    def __init__(self, diskO: disks.Disk, bootSector: boot_sector.BootSector, fatTable: fat_table.FatTable):
+
+        """
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk containing the filesystem. Must be exFAT.
+        bootSector : boot_sector.BootSector
+            The boot sector associated with the disk.
+        fatTable : fat_table.FatTable
+            The FAT of the disk, used to follow the chains of the root directory and of the bitmap.
+        """
+
+        self.clusterCount: int = bootSector.clusterCount
+
+        device = common.block_device.getBlockDevice(diskO.diskPath)
+        self.bitmap: bytes = self.readBitmap(device, bootSector, fatTable)
+
+
+    def readBitmap(self, device: common.block_device.BlockDevice, bootSector: boot_sector.BootSector, fatTable: fat_table.FatTable) -> bytes:
+
+        """
+        Finds the allocation bitmap entry in the root directory, and reads the bitmap it points to.
+        TexFAT volumes have two bitmaps, one for each FAT. The one for the active FAT is read.
+        Is a helper method for __init__.
+
+        Parameters
+        ----------
+        device : common.block_device.BlockDevice
+            The reader for the disk.
+        bootSector : boot_sector.BootSector
+            The boot sector associated with the disk.
+        fatTable : fat_table.FatTable
+            The FAT of the disk.
+
+        Returns
+        -------
+        bitmap : bytes
+            The allocation bitmap, or None if no allocation bitmap entry is found.
+        """
+
+        bytesPerCluster = bootSector.bytesPerSector * bootSector.sectorsPerCluster
+        firstClusterLoc = bootSector.clusterHeapOffset * bootSector.bytesPerSector
+
+        # The allocation bitmap entry is normally the first or second entry of the root directory, so the root
+        # directory is read one run at a time, only as far as the entry.
+        for firstClust, numClusters in fatTable.getChainRuns(bootSector.rootDirectoryCluster):
+            data = device.read((bytesPerCluster * (firstClust - 2)) + firstClusterLoc, numClusters * bytesPerCluster)
+
+            for offset in range(0, len(data) - 31, 32):
+                if data[offset] == 0:
+                    return None
+                if data[offset] != BITMAP_ENTRY_TYPE:
+                    continue
+
+                entry = BITMAP_ENTRY.unpack(data[offset:offset + 32])
+                if entry.bitmapFlags & 0x1 != bootSector.activeFAT:
+                    continue
+
+                bitmapRuns = fatTable.getChainRuns(entry.firstCluster, ceil(entry.dataLen / bytesPerCluster))
+                bitmap = b"".join(device.read((bytesPerCluster * (clustRun[0] - 2)) + firstClusterLoc, clustRun[1] * bytesPerCluster)
+                    for clustRun in bitmapRuns)
+                return bytes(bitmap[:entry.dataLen])
+
+        return None
+
+
+    def isAllocated(self, clustNum: int) -> bool:
+
+        """
+        Checks whether a cluster is in use.
+
+        Parameters
+        ----------
+        clustNum : int
+            The cluster number.
+
+        Returns
+        -------
+        isAllocated : bool
+            Whether the cluster is allocated. Clusters outside of the bitmap are counted as allocated,
+            as they cannot hold the data of a deleted file.
+        """
+
+        return self.countAllocated(clustNum, 1) == 1
+
+
+    def countAllocated(self, firstClust: int, numClusters: int) -> int:
+
+        """
+        Counts the clusters in use in a run of consecutive clusters.
+
+        Parameters
+        ----------
+        firstClust : int
+            The first cluster of the run.
+        numClusters : int
+            The number of clusters in the run.
+
+        Returns
+        -------
+        numAllocated : int
+            The number of allocated clusters in the run. Clusters outside of the bitmap are counted as allocated.
+        """
+
+        # The bits of the run which are within the bitmap, from first up to (not including) last.
+        first = max(firstClust - 2, 0)
+        last = min(firstClust - 2 + numClusters, self.clusterCount, 8 * len(self.bitmap))
+        if last <= first:
+            return max(numClusters, 0)
+
+        bits = int.from_bytes(self.bitmap[first // 8:ceil(last / 8)], "little") >> (first % 8)
+        bits &= (1 << (last - first)) - 1
+
+        return bin(bits).count("1") + numClusters - (last - first)
+
+
+    def getDigest(self) -> bytes:
+
+        """
+        Gets the blake2b digest of the allocation bitmap. The clusters of a deleted file are freed in the bitmap,
+        so the digest changes whenever a file (with any clusters) is deleted, unlike the volume flags and percent in use.
+
+        Returns
+        -------
+        digest : bytes
+            The fat_table.DIGEST_SIZE byte digest of the bitmap.
+        """
+
+        return hashlib.blake2b(self.bitmap, digest_size=fat_table.DIGEST_SIZE).digest()
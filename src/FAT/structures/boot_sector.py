@@ -2,6 +2,40 @@
 from src import common
 from src.FAT.structures import disks
 
+
+# The exFAT main boot sector. Sizes are stored as powers of two (shifts).
+EXFAT_BOOT_SECTOR = common.layout.Layout("ExFATBootSector", "little",
+    fatOffset=common.layout.Field(0x50, 4),
+    fatLength=common.layout.Field(0x54, 4),
+    clusterHeapOffset=common.layout.Field(0x58, 4),
+    clusterCount=common.layout.Field(0x5C, 4),
+    rootDirectoryCluster=common.layout.Field(0x60, 4),
+    volumeId=common.layout.Field(0x64, 4),
+    volumeFlags=common.layout.Field(0x6A, 2),
+    bytesPerSectorShift=common.layout.Field(0x6C, 1),
+    sectorsPerClusterShift=common.layout.Field(0x6D, 1),
+    numFATs=common.layout.Field(0x6E, 1))
+
+# The FAT32 boot sector (BPB and FAT32 extended BPB).
+FAT32_BOOT_SECTOR = common.layout.Layout("FAT32BootSector", "little",
+    bytesPerSector=common.layout.Field(0x0B, 2),
+    sectorsPerCluster=common.layout.Field(0x0D, 1),
+    reservedSectors=common.layout.Field(0x0E, 2),
+    numFATs=common.layout.Field(0x10, 1),
+    totalSectors=common.layout.Field(0x20, 4),
+    sectorsPerFAT=common.layout.Field(0x24, 4),
+    extFlags=common.layout.Field(0x28, 2),
+    rootCluster=common.layout.Field(0x2C, 4),
+    volumeId=common.layout.Field(0x43, 4))
+
+# Bit 0 of the exFAT volume flags selects the active FAT, when there are two (TexFAT).
+EXFAT_ACTIVE_FAT = 0x1
+
+# In the FAT32 extended flags, bit 7 disables mirroring of the FATs, and bits 0 to 3 are then the active FAT.
+FAT32_NO_MIRRORING = 0x80
+FAT32_ACTIVE_FAT = 0xF
+
+
 class BootSector:
 
     """
@@ -23,9 +57,16 @@ class BootSector:
     reservedSectors : int
         The number of sectors reseved for system information in FAT32.
     numFATs : int
-        The number of FATs in FAT32. There are typically 2, for redundancy.
+        The number of FATs. There are typically 2 in FAT32, for redundancy, and 1 in exFAT.
     sectorsPerFAT : int
-        The number of sectors in each FAT in FAT32.
+        The number of sectors in each FAT.
+    activeFAT : int
+        The index of the FAT in use, which is read to follow cluster chains.
+        In FAT32 this is 0 unless mirroring is disabled, and in exFAT it is 1 only on TexFAT volumes.
+    clusterCount : int
+        The number of clusters in the data region (cluster heap). Clusters are numbered from 2 to clusterCount + 1.
+    volumeId : int
+        The volume serial number. Identifies the volume across scans.
     """
 
     def __init__(self, diskO: disks.Disk):
@@ -37,22 +78,31 @@ class BootSector:
             The disk associated with the boot sector being read.
         """
 
-        decoder = common.decode.Decoder()
-
-        disk = open(diskO.diskPath, "rb")
-        data = disk.read(512)
-        disk.close
+        data = common.block_device.getBlockDevice(diskO.diskPath).readBlock(0, 512)
 
         if diskO.diskType == "EXFA":
-            self.fatOffset: int = decoder.leBytesToDecimal(data, 0x50, 0x53)
-            self.clusterHeapOffset: int = decoder.leBytesToDecimal(data, 0x58, 0x5B)
-            self.rootDirectoryCluster: int = decoder.leBytesToDecimal(data, 0x60, 0x63)
-            self.bytesPerSecter: int = pow(2, decoder.leBytesToDecimal(data, 0x6C, 0x6C))
-            self.sectorsPerCluster: int = pow(2, decoder.leBytesToDecimal(data, 0x6D, 0x6D))
+            fields = EXFAT_BOOT_SECTOR.unpack(data)
+            self.fatOffset: int = fields.fatOffset
+            self.clusterHeapOffset: int = fields.clusterHeapOffset
+            self.rootDirectoryCluster: int = fields.rootDirectoryCluster
+            self.bytesPerSector: int = pow(2, fields.bytesPerSectorShift)
+            self.sectorsPerCluster: int = pow(2, fields.sectorsPerClusterShift)
+            self.numFATs: int = fields.numFATs
+            self.sectorsPerFAT: int = fields.fatLength
+            self.activeFAT: int = fields.volumeFlags & EXFAT_ACTIVE_FAT if fields.numFATs > 1 else 0
+            self.clusterCount: int = fields.clusterCount
+            self.volumeId: int = fields.volumeId
         elif diskO.diskType == "FAT32":
-            self.bytesPerSector: int = decoder.leBytesToDecimal(data, 0x0B, 0x0C)
-            self.sectorsPerCluster: int = decoder.leBytesToDecimal(data, 0x0D, 0x0D)
-            self.reservedSectors: int = decoder.leBytesToDecimal(data, 0x0E, 0x0F)
-            self.numFATs: int = decoder.leBytesToDecimal(data, 0x10, 0x10)
-            self.sectorsPerFAT: int = decoder.leBytesToDecimal(data, 0x24, 0x27)
-            self.rootDirectoryCluster: int = 2
+            fields = FAT32_BOOT_SECTOR.unpack(data)
+            self.bytesPerSector: int = fields.bytesPerSector
+            self.sectorsPerCluster: int = fields.sectorsPerCluster
+            self.reservedSectors: int = fields.reservedSectors
+            self.numFATs: int = fields.numFATs
+            self.sectorsPerFAT: int = fields.sectorsPerFAT
+            self.activeFAT: int = 0
+            if fields.extFlags & FAT32_NO_MIRRORING:
+                self.activeFAT = fields.extFlags & FAT32_ACTIVE_FAT
+            firstDataSector = fields.reservedSectors + (fields.numFATs * fields.sectorsPerFAT)
+            self.clusterCount: int = (fields.totalSectors - firstDataSector) // fields.sectorsPerCluster
+            self.rootDirectoryCluster: int = fields.rootCluster
+            self.volumeId: int = fields.volumeId
@@ -0,0 +1,389 @@
+import array
+import bisect
+import hashlib
+import re
+import sys
+from collections import OrderedDict
+
+from src import common
+from src.FAT.structures import boot_sector, disks
+
+# numpy is optional. Without it, free entries are found by searching the FAT as bytes instead.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# The number of FAT entries read at once. A FAT up to this size (64 MiB) is read whole, larger FATs in windows of this size.
+WINDOW_ENTRIES = 16 * 1024 * 1024
+
+# The number of windows kept in memory at once, so that chains which cross between windows do not reread them.
+MAX_WINDOWS = 4
+
+# Only the low 28 bits of a FAT32 entry are used. exFAT entries use all 32 bits.
+FAT32_ENTRY_MASK = 0x0FFFFFFF
+EXFAT_ENTRY_MASK = 0xFFFFFFFF
+
+# A run of zero bytes. Every free entry (4 zero bytes) is within one.
+ZERO_BYTES = re.compile(b"\x00+")
+
+# The size in bytes of the blake2b digest of the FAT, used to tell whether it has changed since a previous scan.
+DIGEST_SIZE = 16
+
+
+class FatTable:
+
+    """
+    The active FAT of a FAT32 or exFAT filesystem, held in memory so that cluster chains can be followed without reading the disk.
+    The FAT is read in windows of WINDOW_ENTRIES entries, each into an array of 32 bit entries, as it is first used.
+    On most volumes the whole FAT fits in one window, and so is read with a single read.
+
+    Attributes
+    ----------
+    device : common.block_device.BlockDevice
+        The reader for the disk containing the FAT.
+    fatOffset : int
+        The byte offset of the active FAT from the start of the disk.
+    numEntries : int
+        The number of entries in the FAT: one for each cluster, and the two reserved entries before cluster 2.
+    entryMask : int
+        The bits of each entry which hold the next cluster number (FAT32 reserves the high 4 bits).
+    windows : OrderedDict
+        The windows read, as {window number: array.array}, in the order last used.
+    freeRunStarts : array.array
+        The first cluster of each run of consecutive free clusters, in increasing order. None until getFreeRuns is called.
+    freeRunLengths : array.array
+        The number of clusters in each run of free clusters. The indices correspond to the indices of freeRunStarts.
+
+    Methods
+    -------
+    getWindow(self, windowNum: int) -> array.array
+        Gets a window of the FAT, reading it if it is not in memory.
+    getEntry(self, clustNum: int) -> int
+        Gets the FAT entry for a cluster: the number of the next cluster in its chain.
+    isCluster(self, clustNum: int) -> bool
+        Checks whether a number is a cluster number, rather than a free, bad or end of chain marker.
+    getChainRuns(self, firstClust: int, maxClusters: int = None) -> list
+        Follows the chain starting at a cluster, getting the contiguous runs of clusters in it.
+    getFreeRuns(self) -> tuple
+        Gets the runs of consecutive free clusters on the volume.
+    findFreeRuns(self, window: array.array) -> tuple
+        Finds the runs of free entries in a window of the FAT.
+    getFreeClusterRuns(self, firstClust: int, numClusters: int) -> list
+        Gets the free clusters from a cluster on, as runs of consecutive clusters.
+    getDigest(self) -> bytes
+        Gets a digest of the whole FAT, which changes whenever a cluster is allocated or freed.
+    """
+
+    def __init__(self, diskO: disks.Disk, bootSector: boot_sector.BootSector):
+
+        """
+        Parameters
+        ----------
+        diskO : disks.Disk
+            The disk containing the FAT.
+        bootSector : boot_sector.BootSector
+            The boot sector associated with the disk. Gives the location and size of the active FAT.
+        """
+
+        self.device: common.block_device.BlockDevice = common.block_device.getBlockDevice(diskO.diskPath)
+
+        if diskO.diskType == "EXFA":
+            firstFatSector = bootSector.fatOffset
+            self.entryMask: int = EXFAT_ENTRY_MASK
+        else:
+            firstFatSector = bootSector.reservedSectors
+            self.entryMask: int = FAT32_ENTRY_MASK
+
+        self.fatOffset: int = bootSector.bytesPerSector * (firstFatSector + (bootSector.activeFAT * bootSector.sectorsPerFAT))
+
+        # The FAT may be longer than the cluster count requires, but entries past the last cluster are not used.
+        self.numEntries: int = min(bootSector.clusterCount + 2, (bootSector.sectorsPerFAT * bootSector.bytesPerSector) // 4)
+        self.windows: OrderedDict = OrderedDict()
+        self.freeRunStarts: array.array = None
+        self.freeRunLengths: array.array = None
+
+
+    def getWindow(self, windowNum: int) -> array.array:
+
+        """
+        Gets a window of the FAT, reading it if it is not in memory.
+        Is a helper method for getEntry and getFreeRuns.
+
+        Parameters
+        ----------
+        windowNum : int
+            The number of the window. Window n holds the entries from n * WINDOW_ENTRIES.
+
+        Returns
+        -------
+        window : array.array
+            The entries in the window. Shorter than WINDOW_ENTRIES for the last window.
+        """
+
+        window = self.windows.get(windowNum)
+        if window is not None:
+            self.windows.move_to_end(windowNum)
+            return window
+
+        firstEntry = windowNum * WINDOW_ENTRIES
+        numEntries = max(0, min(WINDOW_ENTRIES, self.numEntries - firstEntry))
+
+        window = array.array("I")
+        data = self.device.read(self.fatOffset + (4 * firstEntry), 4 * numEntries)
+        window.frombytes(data[:len(data) - (len(data) % 4)])
+
+        # FAT entries are little endian.
+        if sys.byteorder == "big":
+            window.byteswap()
+
+        self.windows[windowNum] = window
+        if len(self.windows) > MAX_WINDOWS:
+            self.windows.popitem(last=False)
+
+        return window
+
+
+    def getEntry(self, clustNum: int) -> int:
+
+        """
+        Gets the FAT entry for a cluster.
+
+        Parameters
+        ----------
+        clustNum : int
+            The cluster number.
+
+        Returns
+        -------
+        entry : int
+            The number of the next cluster in the chain, 0 if the cluster is free,
+            or a bad cluster or end of chain marker. 0 for cluster numbers outside of the FAT.
+        """
+
+        if clustNum < 0 or clustNum >= self.numEntries:
+            return 0
+
+        window = self.getWindow(clustNum // WINDOW_ENTRIES)
+        index = clustNum % WINDOW_ENTRIES
+        if index >= len(window):
+            return 0
+
+        return window[index] & self.entryMask
+
+
+    def isCluster(self, clustNum: int) -> bool:
+
+        """
+        Checks whether a FAT entry is the number of a cluster on the volume.
+        Free (0), reserved (1), bad cluster and end of chain entries are all outside of the clusters on the volume.
+
+        Parameters
+        ----------
+        clustNum : int
+            The FAT entry.
+
+        Returns
+        -------
+        isCluster : bool
+            Whether clustNum is from 2 to the last cluster.
+        """
+
+        return 2 <= clustNum < self.numEntries
+
+
+    def getChainRuns(self, firstClust: int, maxClusters: int = None) -> list:
+
+        """
+        Follows the chain starting at a cluster, getting the contiguous runs of clusters in it.
+        The chain ends at an entry which is not a cluster number (end of chain, free or bad),
+        after maxClusters clusters, or if it loops (more clusters than there are on the volume).
+
+        Parameters
+        ----------
+        firstClust : int
+            The first cluster in the chain.
+        maxClusters : int
+            The most clusters to follow, such as the number of clusters the file's length needs. None to follow the whole chain.
+
+        Returns
+        -------
+        clustRuns : list[tuple]
+            A list of tuple (firstClustNum, numClusters), in the order of the chain.
+            Empty if firstClust is not a cluster number.
+        """
+
+        if maxClusters is None:
+            maxClusters = self.numEntries
+        maxClusters = min(maxClusters, self.numEntries)
+
+        clustRuns = []
+        if not self.isCluster(firstClust) or maxClusters <= 0:
+            return clustRuns
+
+        runStart = firstClust
+        runLen = 1
+        numClusters = 1
+        currentClust = self.getEntry(firstClust)
+
+        while numClusters < maxClusters and self.isCluster(currentClust):
+            if currentClust == runStart + runLen:
+                runLen += 1
+            else:
+                clustRuns.append((runStart, runLen))
+                runStart = currentClust
+                runLen = 1
+
+            numClusters += 1
+            currentClust = self.getEntry(currentClust)
+
+        clustRuns.append((runStart, runLen))
+
+        return clustRuns
+
+
+    def getFreeRuns(self) -> tuple:
+
+        """
+        Gets the runs of consecutive free clusters on the volume (the free-cluster run map), reading the whole FAT.
+        The runs are found once, and kept in freeRunStarts and freeRunLengths.
+
+        Returns
+        -------
+        freeRuns : tuple
+            (freeRunStarts, freeRunLengths).
+        """
+
+        if self.freeRunStarts is not None:
+            return (self.freeRunStarts, self.freeRunLengths)
+
+        starts = array.array("Q")
+        lengths = array.array("Q")
+
+        numWindows = (self.numEntries + WINDOW_ENTRIES - 1) // WINDOW_ENTRIES
+        for windowNum in range(0, numWindows):
+            windowStarts, windowLengths = self.findFreeRuns(self.getWindow(windowNum))
+            firstEntry = windowNum * WINDOW_ENTRIES
+
+            for start, length in zip(windowStarts, windowLengths):
+                start += firstEntry
+
+                # Entries 0 and 1 are reserved, and do not stand for clusters.
+                if start < 2:
+                    length -= 2 - start
+                    start = 2
+                if length <= 0:
+                    continue
+
+                # A run which reaches the end of a window continues into the next.
+                if len(starts) > 0 and starts[-1] + lengths[-1] == start:
+                    lengths[-1] += length
+                else:
+                    starts.append(start)
+                    lengths.append(length)
+
+        self.freeRunStarts = starts
+        self.freeRunLengths = lengths
+
+        return (starts, lengths)
+
+
+    def findFreeRuns(self, window: array.array) -> tuple:
+
+        """
+        Finds the runs of free (0) entries in a window of the FAT, in a single pass over the window.
+        With numpy, the entries are compared at once, and runs begin and end where the comparison changes.
+        Otherwise the window is searched as bytes for runs of zero bytes: the entries wholly within a run of
+        zero bytes are the free ones. (This does not count FAT32 entries whose reserved high bits are set as free.)
+        Is a helper method for getFreeRuns.
+
+        Parameters
+        ----------
+        window : array.array
+            The entries of the window.
+
+        Returns
+        -------
+        freeRuns : tuple
+            (starts, lengths): the index within the window of the first entry of each run, and the number of entries in it.
+        """
+
+        if numpy is not None:
+            isFree = numpy.concatenate(([False], (numpy.frombuffer(window, dtype=numpy.uint32) & self.entryMask) == 0, [False]))
+            changes = numpy.flatnonzero(isFree[1:] != isFree[:-1])
+            return (changes[0::2].tolist(), (changes[1::2] - changes[0::2]).tolist())
+
+        starts = []
+        lengths = []
+        for match in ZERO_BYTES.finditer(memoryview(window).cast("B")):
+            start = (match.start() + 3) // 4
+            end = match.end() // 4
+            if end > start:
+                starts.append(start)
+                lengths.append(end - start)
+
+        return (starts, lengths)
+
+
+    def getFreeClusterRuns(self, firstClust: int, numClusters: int) -> list:
+
+        """
+        Gets the free clusters from a cluster on, as runs of consecutive clusters, until there are numClusters of them.
+        Allocated clusters are skipped. This is where a deleted FAT32 file's data is most likely to be,
+        as its chain has been freed: files are written to the free clusters after their first cluster.
+
+        Parameters
+        ----------
+        firstClust : int
+            The cluster to start from.
+        numClusters : int
+            The number of free clusters to get.
+
+        Returns
+        -------
+        clustRuns : list[tuple]
+            A list of tuple (firstClustNum, numClusters), in increasing order. Empty if firstClust is not free.
+            Fewer than numClusters clusters if the volume ends first.
+        """
+
+        starts, lengths = self.getFreeRuns()
+
+        clustRuns = []
+        runIndex = bisect.bisect_right(starts, firstClust) - 1
+        if numClusters <= 0 or runIndex < 0 or firstClust >= starts[runIndex] + lengths[runIndex]:
+            return clustRuns
+
+        runStart = firstClust
+        while numClusters > 0 and runIndex < len(starts):
+            runLen = min(numClusters, starts[runIndex] + lengths[runIndex] - runStart)
+            clustRuns.append((runStart, runLen))
+            numClusters -= runLen
+
+            runIndex += 1
+            if runIndex < len(starts):
+                runStart = starts[runIndex]
+
+        return clustRuns
+
+
+    def getDigest(self) -> bytes:
+
+        """
+        Gets the blake2b digest of the whole FAT, reading it one window at a time.
+        In FAT32 the chain of a deleted file is freed, so the digest changes whenever a file (with any clusters) is deleted,
+        unlike the FSInfo free cluster count and next free cluster, which are only hints and are often left as they were.
+
+        Returns
+        -------
+        digest : bytes
+            The DIGEST_SIZE byte digest of the FAT entries.
+        """
+
+        digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+        numWindows = (self.numEntries + WINDOW_ENTRIES - 1) // WINDOW_ENTRIES
+        for windowNum in range(0, numWindows):
+            digest.update(self.getWindow(windowNum))
+
+        return digest.digest()
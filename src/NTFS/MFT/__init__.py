@@ -1 +1,3 @@
-from src.NTFS.MFT import file_record, record_attributes
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("file_record", "record_attributes"))
\ No newline at end of file
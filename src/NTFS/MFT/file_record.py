@@ -4,6 +4,20 @@ from src.NTFS import structures
 from src.NTFS import MFT
 from src import common
 
+
+# The file record segment header (FILE record header).
+RECORD_HEADER = common.layout.Layout("RecordHeader", "little",
+    lsn=common.layout.Field(8, 8),
+    length=common.layout.Field(20, 2),
+    flags=common.layout.Field(22, 2),
+    recordNum=common.layout.Field(0x2C, 4))
+
+# The type and length which start every attribute record.
+ATTRIBUTE_TYPE_AND_LENGTH = common.layout.Layout("AttributeTypeAndLength", "little",
+    attributeType=common.layout.Field(0, 4),
+    attributeSize=common.layout.Field(4, 4))
+
+
 class FileRecord:
 
     """
@@ -64,12 +78,9 @@ class FileRecord:
             Indicates whether the data pointers should be read.
         """
 
-        decoder = common.decode.Decoder()
-
         currentByte = 0
         while currentByte + 7 < len(data):
-            attributeType = decoder.leBytesToDecimal(data, currentByte, currentByte + 3)
-            attributeSize = decoder.leBytesToDecimal(data, currentByte + 4, currentByte + 7)
+            attributeType, attributeSize = ATTRIBUTE_TYPE_AND_LENGTH.unpack(data, currentByte)
             if attributeType == 48:
                 self.fileName = MFT.record_attributes.FileName(data, currentByte)
                 if self.fileName.name == False:
@@ -93,8 +104,12 @@ class RecordHeader:
 
     Attributes
     ----------
+    lsn : int
+        The $LogFile sequence number of the last change to the record.
     length : int
         The length in bytes of the header.
+    recordNum : int
+        The number of the record in the MFT.
     isDeleted : bool
         A flag indicating whether the record entry is associated with a deleted file, or not.
     """
@@ -108,13 +123,13 @@ class RecordHeader:
         The data bytes associated with the record header.
         """
 
-        decoder = common.decode.Decoder()
+        fields = RECORD_HEADER.unpack(data)
 
-        self.length: int = decoder.leBytesToDecimal(data, 20, 20)
+        self.lsn: int = fields.lsn
+        self.length: int = fields.length
+        self.recordNum: int = fields.recordNum
         self.isDeleted: bool = False
-        flags = []
 
-        flags.extend(data[22:24])
-        flags = flags[0]
-        if (data[22]) == 0:
+        # The low byte of the flags is cleared when the file is deleted.
+        if fields.flags & 0xFF == 0:
             self.isDeleted = True
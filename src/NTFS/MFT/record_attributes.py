@@ -3,6 +3,19 @@
 from src import common
 
 
+# The header of a resident attribute, whose content follows the header within the file record.
+RESIDENT_ATTRIBUTE_HEADER = common.layout.Layout("ResidentAttributeHeader", "little",
+    length=common.layout.Field(4, 2),
+    nonResident=common.layout.Field(8, 1),
+    offSetToAttribute=common.layout.Field(0x14, 2))
+
+# The header of a non resident attribute, whose content is described by a run list.
+NON_RESIDENT_ATTRIBUTE_HEADER = common.layout.Layout("NonResidentAttributeHeader", "little",
+    length=common.layout.Field(4, 2),
+    nonResident=common.layout.Field(8, 1),
+    offSetToAttribute=common.layout.Field(0x20, 2))
+
+
 class Data:
 
     """
@@ -29,15 +42,14 @@ class Data:
             The offset where the $DATA attribute begins
         """
 
-        decoder = common.decode.Decoder()
         self.isResident: bool = False
-        if decoder.leBytesToDecimal(data, startByte + 8, startByte + 8) == 0:
+        if data[startByte + 8] == 0:
             self.isResident = True
 
         self.dataRuns = []
-        currentIndex = decoder.leBytesToDecimal(data, startByte + 32, startByte + 32) + startByte
 
         if not self.isResident:
+            currentIndex = NON_RESIDENT_ATTRIBUTE_HEADER.unpack(data, startByte).offSetToAttribute + startByte
             while currentIndex - startByte < attributeSize:
                 self.dataRuns.append(DataRun(data, currentIndex))
                 if self.dataRuns[-1].byteSize > 1:
@@ -75,12 +87,12 @@ class DataRun:
             The index within the $DATA attribute of the first byte in the data run.
         """
 
-        decoder = common.decode.Decoder()
+        # Run headers give the width of each field, so they cannot be described by a fixed layout.
         numClustBytes = (data[index] & 0xF0) >> 4
         numLenBytes = data[index] & 0x0F
         self.byteSize: int = numClustBytes + numLenBytes + 1
 
-        self.numClusters: int = decoder.leBytesToDecimal(data, index + 1, index + numLenBytes)
+        self.numClusters: int = int.from_bytes(data[index + 1 : index + numLenBytes + 1], byteorder="little")
         self.startingCluster: int = int.from_bytes(bytes=data[index + 1 + numLenBytes : index + numLenBytes + numClustBytes + 1], byteorder="little", signed=True)
 
 
@@ -108,8 +120,6 @@ class FileName:
             The starting byte of the $FILE_NAME attribute.
         """
 
-        decoder = common.decode.Decoder()
-
         header = AttributeHeader(data, startByte)
 
         tempName = ""
@@ -117,7 +127,7 @@ class FileName:
 
         self.lenName = data[startByte + (header.offSetToAttribute + 0x40)]
         try:
-            tempName = data[startByte + (header.offSetToAttribute + 0x42) : startByte + (header.offSetToAttribute + 0x42) + (self.lenName * 2)].decode(encoding="utf-16", errors="strict")
+            tempName = bytes(data[startByte + (header.offSetToAttribute + 0x42) : startByte + (header.offSetToAttribute + 0x42) + (self.lenName * 2)]).decode(encoding="utf-16", errors="strict")
         except UnicodeDecodeError:
             tempName = False
 
@@ -153,13 +163,13 @@ class AttributeHeader:
             The starting byte of the attribute header.
         """
 
-        decoder = common.decode.Decoder()
-
         isResident = data[startByte + 8] == 0
 
-        self.length = decoder.leBytesToDecimal(data, startByte + 4, startByte + 5)
         if isResident:
-            self.offSetToAttribute = decoder.leBytesToDecimal(data, startByte + 0x14, startByte + 0x15)
+            fields = RESIDENT_ATTRIBUTE_HEADER.unpack(data, startByte)
 
         elif not isResident:
-            self.offSetToAttribute = decoder.leBytesToDecimal(data, startByte + 0x20, startByte + 0x21)
+            fields = NON_RESIDENT_ATTRIBUTE_HEADER.unpack(data, startByte)
+
+        self.length = fields.length
+        self.offSetToAttribute = fields.offSetToAttribute
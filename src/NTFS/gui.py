@@ -0,0 +1,200 @@
+
+import tkinter as tk
+from tkinter import filedialog, ttk
+
+from src import common
+from src.common import virtual_list
+from src.NTFS import recovery
+from src.NTFS import structures
+
+
+# The time in milliseconds between checks for new results from a background scan.
+SCAN_POLL_INTERVAL = 100
+
+# The orders in which the deleted files can be listed: the key function of a record to sort by, and whether to reverse.
+SORT_ORDERS = {
+    "scan order": (None, False),
+    "name": (lambda record: record[1].lower(), False)}
+
+class App:
+
+    def __init__(self, master: tk.Tk):
+
+        master.title("FDRecover")
+
+        self.master: tk.Tk = master
+        self.numRecovered: int = 0
+        self.recoveryExecutor = common.recovery_executor.RecoveryExecutor()
+
+        allDisks: list[structures.disks.Disk] = structures.disks.getDisks()
+        self.currentDisk: structures.disks.Disk = structures.disks.Disk
+
+        self.outputDirectory: str = ""
+
+        # The scan for deleted files in progress, if any.
+        self.scan: common.background_scan.BackgroundScan = None
+
+        self.topFrame: tk.Frame = tk.Frame(master=master, height=50)
+        self.topFrame.columnconfigure([0, 1, 2], weight=1)
+        self.topFrame.rowconfigure([0, 1, 2, 3, 4], weight=1)
+        self.topFrame.pack(fill=tk.BOTH, side=tk.TOP, expand=True)
+
+        # Disk selector
+        diskVar: tk.StringVar = tk.StringVar(master, "select disk")
+        diskOptions: tk.OptionMenu = tk.OptionMenu(self.topFrame, diskVar, *allDisks, command=self.getDeletedFiles)
+        diskOptions.grid(column=0, row=0, columnspan=2, sticky="w")
+
+        labelSelect: tk.Label = tk.Label(master=self.topFrame, anchor=tk.CENTER, text="Select Files to Recover:")
+        labelSelect.grid(column=1, row=0, sticky="nsew")
+
+        # Shows the deleted files. Only the rows in view are drawn, so it can hold millions of files.
+        self.fileList: virtual_list.VirtualList = virtual_list.VirtualList(self.topFrame, height=30)
+        self.fileList.grid(column=0, row=1, columnspan=3, sticky="nesw")
+
+        selectAllButton: tk.Button = tk.Button(master=self.topFrame, text="Select/Deselect All", command=self.selectAll)
+        selectAllButton.grid(column=2, row=0, sticky="e")
+
+        # When pressed, user can select output directory.
+        getOutputDirectoryButton: tk.Button = tk.Button(master=self.topFrame, text="Select output directory", command=self.getOutputDirectory)
+        getOutputDirectoryButton.grid(column=0, row=2, sticky="w")
+
+        # Displays current output directory.
+        self.outputDirectoryLabel: tk.Label = tk.Label(master=self.topFrame, text="Output dir: ")
+        self.outputDirectoryLabel.grid(column=1, row=2, sticky = "w")
+
+        recoveryButton: tk.Button = tk.Button(master=self.topFrame, text="Recover", command=self.recover)
+        recoveryButton.grid(column=2, row=2, sticky="e")
+
+        # Displays the number of recovered files.
+        self.recoveredLabel: tk.Label = tk.Label(master=self.topFrame, text=f"Recovered {self.numRecovered} files")
+        self.recoveredLabel.grid(column=1, row=3, sticky="w")
+
+        # Shows the progress of the scan for deleted files.
+        self.progressBar: ttk.Progressbar = ttk.Progressbar(master=self.topFrame, orient=tk.HORIZONTAL, mode="determinate")
+        self.progressBar.grid(column=0, row=3, sticky="ew")
+
+        self.scanLabel: tk.Label = tk.Label(master=self.topFrame, text="")
+        self.scanLabel.grid(column=0, row=4, sticky="w")
+
+        # Stops the scan for deleted files. The files found so far can still be recovered.
+        self.cancelButton: tk.Button = tk.Button(master=self.topFrame, text="Cancel scan", command=self.cancelScan, state=tk.DISABLED)
+        self.cancelButton.grid(column=2, row=3, sticky="e")
+
+        # Sorts and filters the deleted files. The filter is applied when Return is pressed.
+        viewFrame: tk.Frame = tk.Frame(master=self.topFrame)
+        viewFrame.grid(column=1, row=4, columnspan=2, sticky="e")
+
+        sortVar: tk.StringVar = tk.StringVar(master, "scan order")
+        sortOptions: tk.OptionMenu = tk.OptionMenu(viewFrame, sortVar, *SORT_ORDERS, command=self.sortFiles)
+        tk.Label(master=viewFrame, text="Sort by:").pack(side=tk.LEFT)
+        sortOptions.pack(side=tk.LEFT)
+
+        self.filterEntry: tk.Entry = tk.Entry(master=viewFrame)
+        self.filterEntry.bind("<Return>", lambda event: self.fileList.filterBy(self.filterEntry.get()))
+        tk.Label(master=viewFrame, text="Filter:").pack(side=tk.LEFT)
+        self.filterEntry.pack(side=tk.LEFT)
+
+
+    def getDeletedFiles(self, disk: structures.disks.Disk):
+
+        if self.currentDisk != disk:
+            self.currentDisk = disk
+
+            # The scan of the previously selected disk is no longer needed.
+            self.cancelScan()
+
+            self.fileList.clear()
+
+            fileRecovery: recovery.recovery.Recovery = recovery.recovery.Recovery()
+
+            bootSector = structures.boot_sector.BootSector(self.currentDisk.diskPath)
+            self.scan = common.background_scan.BackgroundScan(fileRecovery.iterDeletedFileBatches, self.currentDisk.diskPath, bootSector, True)
+            self.cancelButton.config(state=tk.NORMAL)
+            self.scanLabel.config(text="Scanning...")
+            self.master.after(SCAN_POLL_INTERVAL, self.pollScan, self.scan)
+
+        else:
+            return
+
+    def pollScan(self, scan: common.background_scan.BackgroundScan):
+
+        # The scan has been replaced by a scan of another disk.
+        if scan is not self.scan:
+            return
+
+        self.appendResults(scan.poll())
+
+        if scan.state == "running":
+            if scan.fraction is None:
+                self.progressBar.config(mode="indeterminate")
+                self.progressBar.step()
+            else:
+                self.progressBar.config(mode="determinate", value=scan.fraction * 100)
+            self.scanLabel.config(text=f"Scanning... found {len(self.fileList.items)} files")
+            self.master.after(SCAN_POLL_INTERVAL, self.pollScan, scan)
+            return
+
+        self.scan = None
+        self.cancelButton.config(state=tk.DISABLED)
+
+        # Files added during the scan were placed at the end of the list, whatever the sort order.
+        if self.fileList.sortKey is not None:
+            self.fileList.updateView()
+
+        self.progressBar.config(mode="determinate", value=100 if scan.state == "done" else 0)
+        if scan.state == "done":
+            self.scanLabel.config(text=f"Found {len(self.fileList.items)} files")
+        elif scan.state == "cancelled":
+            self.scanLabel.config(text=f"Scan cancelled, found {len(self.fileList.items)} files")
+        else:
+            self.scanLabel.config(text=f"Scan failed: {scan.error}")
+
+    def cancelScan(self):
+        if self.scan is not None:
+            self.scan.cancel()
+
+    def appendResults(self, results: list):
+        if len(results) > 0:
+            self.fileList.appendItems(results, [result[1] for result in results])
+
+    def sortFiles(self, sortOrder: str):
+        sortKey, reverse = SORT_ORDERS[sortOrder]
+        self.fileList.sortBy(sortKey, reverse)
+
+    def selectAll(self):
+        self.fileList.selectAll()
+
+    def getOutputDirectory(self):
+        self.outputDirectory = tk.filedialog.askdirectory(title="Select Output Directory", initialdir="/home")
+        self.outputDirectoryLabel.config(text=f"Output dir: {self.outputDirectory}")
+
+
+    def recover(self):
+
+        fileRecovery = recovery.recovery.Recovery()
+
+        toRecover = self.fileList.getSelected()
+
+        # Every file is accounted for, so that one which fails does not stop the others from being counted.
+        futures = fileRecovery.submitFiles(self.recoveryExecutor, self.currentDisk.diskPath, toRecover, self.outputDirectory)
+        numRecovered, errors = self.recoveryExecutor.getOutcomes(futures)
+        self.numRecovered += numRecovered
+
+        self.fileList.clearSelection()
+
+        # The failures of the last recovery are reported after the total.
+        text = f"Recovered {self.numRecovered} files"
+        if numRecovered < len(futures):
+            text += f", {len(futures) - numRecovered} of the last {len(futures)} failed"
+            if len(errors) > 0:
+                text += f" ({errors[0]})"
+        self.recoveredLabel.config(text=text)
+
+
+
+
+def main():
+    root = tk.Tk()
+    app = App(root)
+    root.mainloop()
+
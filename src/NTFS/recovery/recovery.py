@@ -2,6 +2,7 @@
 
 from math import floor
 
+from src import common
 from src.NTFS import structures
 from src.NTFS import MFT
 
@@ -13,13 +14,21 @@ class Recovery:
 
     Methods
     -------
-    recoverFiles(self, diskName, deletedFiles, outputDir)
+    recoverFiles(self, diskName, deletedFiles, outputDir, executor: recovery_executor.RecoveryExecutor = None)
         Attempts to recover the files that the user has selected.
-    getDeletedFiles(self, diskName, bootSector: structures.boot_sector)
+    submitFiles(self, executor: recovery_executor.RecoveryExecutor, diskName, deletedFiles, outputDir) -> list[Future]
+        Reads the file records of the files that the user has selected, and submits their recovery to executor.
+    recoverFile(self, copyEngine: copy_engine.CopyEngine, runs: list, residentData: bytes, filePath: str) -> bool
+        Recovers a single file, given its resident data or the runs of bytes on disk which contain its data.
+    getDeletedFiles(self, diskName, bootSector: structures.boot_sector, useCache: bool = False)
         Gets a list of all deleted files, as recorded in the MFT.
+    iterDeletedFileBatches(self, diskName, bootSector: structures.boot_sector, useCache: bool = False) -> iterator[tuple]
+        Reads the MFT one cluster at a time, yielding the deleted files found in each cluster as soon as it has been read.
+    getChangeIndicator(self, diskName, bootSector: structures.boot_sector, fileRecord: file_record.FileRecord) -> tuple
+        Gets values which change when the volume is written to.
     """
 
-    def recoverFiles(self, diskName, deletedFiles, outputDir):
+    def recoverFiles(self, diskName, deletedFiles, outputDir, executor: common.recovery_executor.RecoveryExecutor = None):
 
         """
         Attempts to recover the files that the user has selected.
@@ -32,37 +41,119 @@ class Recovery:
             A list of the user selected files to recover.
         outputDir : str
             The path of the output directory.
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files in parallel. If this is None, one is created for these files.
 
         Returns
         -------
         The number of recovered files
         """
 
+        if executor is None:
+            with common.recovery_executor.RecoveryExecutor() as executor:
+                return self.recoverFiles(diskName, deletedFiles, outputDir, executor)
+
+        futures = self.submitFiles(executor, diskName, deletedFiles, outputDir)
+
+        return sum(executor.getResults(futures))
+
+
+    def submitFiles(self, executor: common.recovery_executor.RecoveryExecutor, diskName, deletedFiles, outputDir) -> list:
+
+        """
+        Reads the file records of the files that the user has selected, and submits their recovery to executor.
+
+        Parameters
+        ----------
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files.
+        diskName : str
+            The path of the disk currently in use.
+        deletedFiles : list
+            A list of the user selected files to recover.
+        outputDir : str
+            The path of the output directory.
+
+        Returns
+        -------
+        futures : list[Future]
+            A future for each file in deletedFiles, in order. Its result is True once the file is recovered.
+        """
+
         bootSector = structures.boot_sector.BootSector(diskName)
+        clusterSize = bootSector.sectorsPerCluster * bootSector.sectorSize
 
+        copyEngine = common.copy_engine.CopyEngine(common.block_device.getBlockDevice(diskName))
+
+        futures = []
+
+        numRecovered = 0
         for file in deletedFiles:
             entry = MFT.file_record.FileRecord(file[0], bootSector, True, False)
+            numRecovered += 1
 
-            disk = open(diskName, "rb")
-            recoveredFile = open("%s/recoveredFile_%s" % (outputDir, file[1]), "wb")
+            # Deleted files in different directories may have the same name, and are recovered at the same time,
+            # so each is given its own path.
+            filePath = "%s/recoveredFile_%s_num_%d" % (outputDir, file[1], numRecovered)
 
+            # Each run is (byte offset on disk, length in bytes).
+            # The starting cluster of each data run is relative to the starting cluster of the previous run.
+            runs = []
+            residentData = None
             currentCluster = 0
             if not entry.data.isResident:
-                while len(entry.data.dataRuns) > 0:
-                    currentRun = entry.data.dataRuns.pop(0)
+                for currentRun in entry.data.dataRuns:
                     currentCluster = currentCluster + currentRun.startingCluster
-                    for clusterNum in range(0, currentRun.numClusters):
-                        disk.seek((bootSector.sectorsPerCluster * (currentCluster + clusterNum)) * bootSector.sectorSize)
-                        recoveredFile.write(disk.read(bootSector.sectorSize * bootSector.sectorsPerCluster))
+                    runs.append((clusterSize * currentCluster, clusterSize * currentRun.numClusters))
             else:
-                recoveredFile.write(entry.data.fileData)
+                residentData = entry.data.fileData
+
+            numBytes = sum(run[1] for run in runs)
+            futures.append(executor.submit(self.recoverFile, numBytes, copyEngine, runs, residentData, filePath))
 
-        recoveredFile.close
-        disk.close
-        return len(deletedFiles)
+        return futures
 
 
-    def getDeletedFiles(self, diskName, bootSector: structures.boot_sector):
+    def recoverFile(self, copyEngine: common.copy_engine.CopyEngine, runs: list, residentData: bytes, filePath: str) -> bool:
+
+        """
+        Recovers a single file, given its resident data or the runs of bytes on disk which contain its data.
+
+        Parameters
+        ----------
+        copyEngine : copy_engine.CopyEngine
+            Copies the data of the file from the disk.
+        runs : list[tuple]
+            The data of a non resident file, as tuples (byte offset on disk, length in bytes), in order.
+        residentData : bytes
+            The data of a resident file, which is stored in its file record. None if the file is not resident.
+        filePath : str
+            The path of the recovered file.
+
+        Returns
+        -------
+        Explicit:
+        recovered : bool
+            True once the file is recovered.
+
+        Implicit:
+            Writes the recovered file to filePath.
+        """
+
+        recoveredFile = open(filePath, "wb")
+
+        if residentData is not None:
+            recoveredFile.write(residentData)
+
+        for offset, length in runs:
+            copyEngine.copyRun(recoveredFile, offset, length)
+
+        recoveredFile.close()
+
+        return True
+
+
+    def getDeletedFiles(self, diskName, bootSector: structures.boot_sector, useCache: bool = False):
 
         """
         Gets a list of all deleted files, as recorded in the MFT.
@@ -73,6 +164,9 @@ class Recovery:
             The path of the disk currently in use.
         bootSector : structures.boot_sector.BootSector
             The boot sector object associated with the disk.
+        useCache : bool
+            If True, the result of the previous scan of this volume is returned if the volume has not changed since
+            (see scan_cache.ScanCache), and the result of a new scan is stored.
 
         Returns
         -------
@@ -81,19 +175,59 @@ class Recovery:
 
         """
 
+        return [file for batch, fraction in self.iterDeletedFileBatches(diskName, bootSector, useCache) for file in batch]
+
+
+    def iterDeletedFileBatches(self, diskName, bootSector: structures.boot_sector, useCache: bool = False):
+
+        """
+        Reads the MFT one cluster at a time, yielding the deleted files found in each cluster as soon as it has been read.
+        Used to show the deleted files while the scan continues (see background_scan.BackgroundScan).
+
+        Parameters
+        ----------
+        diskName : str
+            The path of the disk currently in use.
+        bootSector : structures.boot_sector.BootSector
+            The boot sector object associated with the disk.
+        useCache : bool
+            If True, the result of the previous scan of this volume is yielded at once if the volume has not changed since
+            (see scan_cache.ScanCache), and the result of a new, complete scan is stored.
+
+        Returns
+        -------
+        batches : iterator[tuple]
+            Tuples (deletedFiles, fraction), where deletedFiles is a list of the deleted files in a cluster of the MFT,
+            and fraction is the fraction of the MFT read so far.
+        """
+
         clusterSize = bootSector.sectorsPerCluster * bootSector.sectorSize
 
+        # Blocks cached during a previous scan may have changed on disk.
+        device = common.block_device.getBlockDevice(diskName)
+        device.clearCache()
+
         # Read the file record for the MFT, which provides the location on disk of the remainder of the MFT
-        disk = open(diskName, "rb")
-        disk.seek(clusterSize * bootSector.MFTClusterNum)
         # 1024 is the length (in bytes) of a file record
-        fileRecordData = disk.read(1024)
+        fileRecordData = device.read(clusterSize * bootSector.MFTClusterNum, 1024)
         fileRecord = MFT.file_record.FileRecord(fileRecordData, bootSector, readPointers=True, readAllAttr=True)
 
+        scanCache = common.scan_cache.ScanCache()
+        volumeId = "%016x" % bootSector.serialNum
+        changeIndicator = self.getChangeIndicator(diskName, bootSector, fileRecord)
+        if useCache:
+            cachedFiles = scanCache.load("ntfs", volumeId, changeIndicator)
+            if cachedFiles is not None:
+                yield (cachedFiles, 1.0)
+                return
+
         recordsPerCluster = floor(clusterSize / 1024)
 
         deletedFiles = []
 
+        numClusters = sum(run.numClusters for run in fileRecord.data.dataRuns)
+        clustersRead = 0
+
         currentCluster = 0
         while len(fileRecord.data.dataRuns) > 0:
 
@@ -103,13 +237,59 @@ class Recovery:
 
             for clusterOffSet in range(0, currentRun.numClusters):
 
+                # Each cluster of the MFT is read once, and its records are sliced from it.
+                clusterData = device.read(clusterSize * (currentCluster + clusterOffSet), clusterSize)
+                clusterFiles = []
+
                 for record in range(0, recordsPerCluster):
-                    disk.seek(clusterSize * (currentCluster + clusterOffSet) + (1024 * record))
-                    entryData: bytes = disk.read(1024)
+                    entryData: bytes = clusterData[1024 * record:1024 * (record + 1)]
 
                     entry = MFT.file_record.FileRecord(entryData, bootSector, False, True)
                     if entry.header.isDeleted:
                         if entry.fileName is not False:
-                            deletedFiles.append((entryData, entry.fileName.name))
-        disk.close()
-        return deletedFiles
+                            # The record is copied, as entryData may be a view of a memory mapped disk image.
+                            clusterFiles.append((bytes(entryData), entry.fileName.name))
+
+                deletedFiles.extend(clusterFiles)
+                clustersRead += 1
+                yield (clusterFiles, clustersRead / numClusters)
+
+        if useCache:
+            scanCache.store("ntfs", volumeId, changeIndicator, deletedFiles)
+
+
+    def getChangeIndicator(self, diskName, bootSector: structures.boot_sector, fileRecord: MFT.file_record.FileRecord) -> tuple:
+
+        """
+        Gets values which change when the volume is written to: the LSN of the $MFT file record,
+        and the current LSN of the restart area of $LogFile (which increases as changes to any file are logged).
+        Is a helper method for iterDeletedFileBatches.
+
+        Parameters
+        ----------
+        diskName : str
+            The path of the disk currently in use.
+        bootSector : structures.boot_sector.BootSector
+            The boot sector object associated with the disk.
+        fileRecord : file_record.FileRecord
+            The file record of $MFT.
+
+        Returns
+        -------
+        changeIndicator : tuple
+            (LSN of $MFT, current LSN of $LogFile).
+        """
+
+        clusterSize = bootSector.sectorsPerCluster * bootSector.sectorSize
+
+        # $LogFile is file record 2. The first records of the MFT are contiguous.
+        device = common.block_device.getBlockDevice(diskName)
+        logFileRecordData = device.read((clusterSize * bootSector.MFTClusterNum) + (2 * 1024), 1024)
+        logFileRecord = MFT.file_record.FileRecord(logFileRecordData, bootSector, readPointers=True, readAllAttr=True)
+
+        logFileLsn = 0
+        if logFileRecord.data is not False and not logFileRecord.data.isResident and len(logFileRecord.data.dataRuns) > 0:
+            logFileOffset = clusterSize * logFileRecord.data.dataRuns[0].startingCluster
+            logFileLsn = structures.log_file.LogFileRestart(diskName, logFileOffset).currentLsn
+
+        return (fileRecord.header.lsn, logFileLsn)
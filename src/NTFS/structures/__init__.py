@@ -1 +1,3 @@
-from src.NTFS.structures import boot_sector, disks
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("boot_sector", "disks", "log_file"))
\ No newline at end of file
@@ -2,6 +2,15 @@
 
 from src import common
 
+
+# The NTFS boot sector (BPB and NTFS extended BPB).
+NTFS_BOOT_SECTOR = common.layout.Layout("NTFSBootSector", "little",
+    sectorSize=common.layout.Field(0x0B, 2),
+    sectorsPerCluster=common.layout.Field(0x0D, 2),
+    MFTClusterNum=common.layout.Field(0x30, 8),
+    serialNum=common.layout.Field(0x48, 8))
+
+
 class BootSector:
 
     """
@@ -17,6 +26,8 @@ class BootSector:
         The cluster number of the MFT.
         Note that the first cluster is actually number 2
         meaning that this must be accounted for when using this value.
+    serialNum : int
+        The volume serial number. Identifies the volume across scans.
     """
 
     def __init__(self, diskPath):
@@ -28,12 +39,11 @@ class BootSector:
             The path of the disk in use.
         """
 
-        decoder = common.decode.Decoder()
+        data = common.block_device.getBlockDevice(diskPath).readBlock(0, 512)
 
-        disk = open(diskPath, "rb")
-        data = disk.read(512)
-        disk.close
+        fields = NTFS_BOOT_SECTOR.unpack(data)
 
-        self.sectorSize: int = decoder.leBytesToDecimal(data, 0x0B, 0x0C)
-        self.sectorsPerCluster: int = decoder.leBytesToDecimal(data, 0x0D, 0x0E)
-        self.MFTClusterNum: int = decoder.leBytesToDecimal(data, 0x30, 0x37)
+        self.sectorSize: int = fields.sectorSize
+        self.sectorsPerCluster: int = fields.sectorsPerCluster
+        self.MFTClusterNum: int = fields.MFTClusterNum
+        self.serialNum: int = fields.serialNum
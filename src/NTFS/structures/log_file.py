@@ -0,0 +1,61 @@
+from src import common
+
+
+# The restart page header (RESTART_PAGE_HEADER) at the start of each of the two restart pages of $LogFile.
+# "RSTR" in magic indicates a valid restart page.
+RESTART_PAGE_HEADER = common.layout.Layout("RestartPageHeader", "little",
+    magic=common.layout.Field(0x00, 4),
+    systemPageSize=common.layout.Field(0x10, 4),
+    restartAreaOffset=common.layout.Field(0x18, 2))
+
+# The restart area (RESTART_AREA) within a restart page. currentLsn is the sequence number of the last checkpoint.
+RESTART_AREA = common.layout.Layout("RestartArea", "little",
+    currentLsn=common.layout.Field(0x00, 8))
+
+# "RSTR" as a little endian integer.
+RESTART_PAGE_MAGIC = 0x52545352
+
+
+class LogFileRestart:
+
+    """
+    Reads the restart area of the NTFS log ($LogFile).
+    The log has two restart pages, written alternately. The current LSN of the newer one
+    increases whenever the volume is changed and the log is checkpointed.
+
+    Attributes
+    ----------
+    currentLsn : int
+        The largest current LSN of the valid restart pages. 0 if neither is valid.
+    """
+
+    def __init__(self, diskPath: str, offset: int):
+
+        """
+        Parameters
+        ----------
+        diskPath : str
+            The path of the disk in use.
+        offset : int
+            The byte offset of the start of $LogFile from the start of the disk.
+        """
+
+        device = common.block_device.getBlockDevice(diskPath)
+
+        self.currentLsn: int = 0
+
+        # The second restart page follows the first, one system page later.
+        pageOffset = 0
+        for pageNum in range(0, 2):
+            data = device.read(offset + pageOffset, 512)
+            if len(data) < RESTART_PAGE_HEADER.size:
+                break
+
+            header = RESTART_PAGE_HEADER.unpack(data)
+            if header.magic != RESTART_PAGE_MAGIC or header.systemPageSize == 0:
+                break
+
+            if header.restartAreaOffset + RESTART_AREA.size <= len(data):
+                self.currentLsn = max(self.currentLsn, RESTART_AREA.unpack(data, header.restartAreaOffset).currentLsn)
+
+            pageOffset += header.systemPageSize
@@ -0,0 +1,7 @@
+import sys
+
+from src import cli
+
+
+if __name__ == "__main__":
+    sys.exit(cli.main())
@@ -0,0 +1,610 @@
+import argparse
+from concurrent.futures import as_completed
+from datetime import datetime
+import fnmatch
+import json
+import os
+import sys
+import time
+
+from src import common
+from src.EXT import recovery as extRecovery
+from src.EXT import structures as extStructures
+from src.FAT import recovery as fatRecovery
+from src.FAT import structures as fatStructures
+from src.NTFS import MFT as ntfsMFT
+from src.NTFS import recovery as ntfsRecovery
+from src.NTFS import structures as ntfsStructures
+
+
+# The filesystems which can be given with --type, and the disk types used for them by the filesystem packages.
+FILE_SYSTEMS = {"ext2": "ext2", "ext3": "ext3", "ext4": "ext4", "FAT32": "FAT32", "exFAT": "EXFA", "NTFS": "NTFS"}
+
+
+class ExtVolume:
+
+    """
+    Scans an ext2, ext3 or ext4 filesystem for deleted files, and recovers them, for the command line interface.
+    ext3 and ext4 are scanned through their journals, and ext2 by reading its inode tables.
+    Deleted inodes have no name, and their size is only known once they are recovered.
+
+    Attributes
+    ----------
+    diskO : disks.Disk
+        The disk object for the filesystem.
+    fileSystem : str
+        The name of the filesystem.
+    transactions : list[journal.Transaction]
+        The transactions in the journal, newest first. Only used for ext3 and ext4.
+    blockIndex : dict[int, list[tuple]]
+        Maps filesystem block numbers to their copies in the journal. Only used for ext3 and ext4.
+
+    Methods
+    -------
+    iterDeletedFiles(self, useCache: bool) -> iterator[tuple]
+        Yields each deleted file as soon as it is found, with its description.
+    submitFiles(self, executor: recovery_executor.RecoveryExecutor, deletedFiles: list, outputDir: str) -> list[Future]
+        Submits the recovery of deleted files to executor.
+    """
+
+    def __init__(self, diskPath: str, diskType: str):
+
+        """
+        Parameters
+        ----------
+        diskPath : str
+            The path of the disk or disk image.
+        diskType : str
+            "ext2", "ext3" or "ext4".
+        """
+
+        self.diskO: extStructures.disks.Disk = extStructures.disks.Disk(diskPath, diskType)
+        self.fileSystem: str = diskType
+        self.transactions: list = None
+        self.blockIndex: dict = None
+
+
+    def iterDeletedFiles(self, useCache: bool):
+
+        """
+        Yields each deleted file as soon as it is found, with its description.
+
+        Parameters
+        ----------
+        useCache : bool
+            Whether to use and store the results of previous scans (see scan_cache.ScanCache).
+
+        Returns
+        -------
+        deletedFiles : iterator[tuple]
+            Tuples (deleted inode, description). See describeFile for the description.
+        """
+
+        if self.diskO.diskType == "ext2":
+            fileRecovery = extRecovery.recovery_no_journal.FileRecoveryNoJournal()
+            batches = fileRecovery.iterDeletedInodeBatches(self.diskO, True, useCache)
+        else:
+            fileRecovery = extRecovery.recovery_journaled.FileRecoveryJournaled()
+            self.transactions = []
+            self.blockIndex = {}
+            batches = fileRecovery.iterJournalInodeBatches(self.diskO, self.transactions, self.blockIndex, useCache)
+
+        for batch, fraction in batches:
+            for inode in batch:
+                # (inode num, deletion time) in ext2, and (block num of inode table, offset within inode table, deletion time) otherwise.
+                fileId = "inode" + "_".join(str(value) for value in inode[:-1])
+                yield (inode, describeFile(fileId, None, inode[-1], None))
+
+
+    def submitFiles(self, executor: common.recovery_executor.RecoveryExecutor, deletedFiles: list, outputDir: str) -> list:
+
+        """
+        Submits the recovery of deleted files to executor.
+
+        Parameters
+        ----------
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files.
+        deletedFiles : list[tuple]
+            Deleted inodes yielded by iterDeletedFiles.
+        outputDir : str
+            The path of the output directory.
+
+        Returns
+        -------
+        futures : list[Future]
+            A future for each file, in order. Its result is True once the file is recovered.
+        """
+
+        if self.diskO.diskType == "ext2":
+            fileRecovery = extRecovery.recovery_no_journal.FileRecoveryNoJournal()
+            return fileRecovery.submitFiles(executor, self.diskO, deletedFiles, len(deletedFiles), outputDir)
+        else:
+            fileRecovery = extRecovery.recovery_journaled.FileRecoveryJournaled()
+            return fileRecovery.submitFiles(executor, self.diskO, self.transactions, deletedFiles, len(deletedFiles), outputDir,
+            self.blockIndex)
+
+
+class FatVolume:
+
+    """
+    Scans a FAT32 or exFAT filesystem for deleted files, and recovers them, for the command line interface.
+    FAT does not record when files are deleted. The descriptions also give the fraction of each file's clusters
+    which are now allocated to other files ("allocatedFraction"), and the runs of clusters its data is recovered from
+    ("clusterRuns", as [first cluster, length in bytes]).
+
+    Attributes
+    ----------
+    diskO : disks.Disk
+        The disk object for the filesystem.
+    fileSystem : str
+        The name of the filesystem, "FAT32" or "exFAT".
+
+    Methods
+    -------
+    iterDeletedFiles(self, useCache: bool) -> iterator[tuple]
+        Yields each deleted file as soon as it is found, with its description.
+    submitFiles(self, executor: recovery_executor.RecoveryExecutor, deletedFiles: list, outputDir: str) -> list[Future]
+        Submits the recovery of deleted files to executor.
+    """
+
+    def __init__(self, diskPath: str, diskType: str):
+
+        """
+        Parameters
+        ----------
+        diskPath : str
+            The path of the disk or disk image.
+        diskType : str
+            "FAT32" or "EXFA".
+        """
+
+        self.diskO: fatStructures.disks.Disk = fatStructures.disks.Disk(diskPath, diskType)
+        self.fileSystem: str = "exFAT" if diskType == "EXFA" else diskType
+
+
+    def iterDeletedFiles(self, useCache: bool):
+
+        """
+        Yields each deleted file as soon as it is found, with its description.
+
+        Parameters
+        ----------
+        useCache : bool
+            Whether to use and store the results of previous scans (see scan_cache.ScanCache).
+
+        Returns
+        -------
+        deletedFiles : iterator[tuple]
+            Tuples (entry set, description). See describeFile for the description.
+        """
+
+        fileRecovery = fatRecovery.recovery.Recovery()
+        bootSector = fatStructures.boot_sector.BootSector(self.diskO)
+
+        for batch, fraction in fileRecovery.iterDeletedFileBatches(self.diskO, bootSector, useCache):
+            for entrySet in batch:
+                if self.diskO.diskType == "FAT32":
+                    firstCluster = entrySet.startingClust
+                elif len(entrySet.clustRuns) > 0:
+                    firstCluster = entrySet.clustRuns[0][0]
+                else:
+                    firstCluster = 0
+                description = describeFile(f"cluster{firstCluster}", entrySet.name.strip(), None, entrySet.dataLen)
+
+                # The share of the file's clusters reused since, and where its data is read from, for review.
+                if entrySet.allocatedFraction is not None:
+                    description["allocatedFraction"] = entrySet.allocatedFraction
+                if entrySet.clustRuns is not None:
+                    description["clusterRuns"] = [list(clustRun) for clustRun in entrySet.clustRuns]
+
+                yield (entrySet, description)
+
+
+    def submitFiles(self, executor: common.recovery_executor.RecoveryExecutor, deletedFiles: list, outputDir: str) -> list:
+
+        """
+        Submits the recovery of deleted files to executor.
+
+        Parameters
+        ----------
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files.
+        deletedFiles : list
+            Entry sets yielded by iterDeletedFiles.
+        outputDir : str
+            The path of the output directory.
+
+        Returns
+        -------
+        futures : list[Future]
+            A future for each file, in order. Its result is True once the file is recovered.
+        """
+
+        return fatRecovery.recovery.Recovery().submitFiles(executor, self.diskO, deletedFiles, outputDir)
+
+
+class NtfsVolume:
+
+    """
+    Scans an NTFS filesystem for deleted files, and recovers them, for the command line interface.
+    NTFS does not record when files are deleted. The size of a file is the size of the clusters allocated to its data.
+
+    Attributes
+    ----------
+    diskPath : str
+        The path of the disk or disk image.
+    fileSystem : str
+        The name of the filesystem, "NTFS".
+    bootSector : boot_sector.BootSector
+        The boot sector of the filesystem.
+
+    Methods
+    -------
+    iterDeletedFiles(self, useCache: bool) -> iterator[tuple]
+        Yields each deleted file as soon as it is found, with its description.
+    submitFiles(self, executor: recovery_executor.RecoveryExecutor, deletedFiles: list, outputDir: str) -> list[Future]
+        Submits the recovery of deleted files to executor.
+    """
+
+    def __init__(self, diskPath: str, diskType: str):
+
+        """
+        Parameters
+        ----------
+        diskPath : str
+            The path of the disk or disk image.
+        diskType : str
+            "NTFS".
+        """
+
+        self.diskPath: str = diskPath
+        self.fileSystem: str = diskType
+        self.bootSector: ntfsStructures.boot_sector.BootSector = ntfsStructures.boot_sector.BootSector(diskPath)
+
+
+    def iterDeletedFiles(self, useCache: bool):
+
+        """
+        Yields each deleted file as soon as it is found, with its description.
+
+        Parameters
+        ----------
+        useCache : bool
+            Whether to use and store the results of previous scans (see scan_cache.ScanCache).
+
+        Returns
+        -------
+        deletedFiles : iterator[tuple]
+            Tuples ((file record data, name), description). See describeFile for the description.
+        """
+
+        fileRecovery = ntfsRecovery.recovery.Recovery()
+        clusterSize = self.bootSector.sectorsPerCluster * self.bootSector.sectorSize
+
+        for batch, fraction in fileRecovery.iterDeletedFileBatches(self.diskPath, self.bootSector, useCache):
+            for record in batch:
+                fileRecord = ntfsMFT.file_record.FileRecord(record[0], self.bootSector, True, False)
+
+                size = None
+                if fileRecord.data and fileRecord.data.isResident:
+                    size = len(fileRecord.data.fileData)
+                elif fileRecord.data:
+                    size = clusterSize * sum(run.numClusters for run in fileRecord.data.dataRuns)
+
+                yield (record, describeFile(f"record{fileRecord.header.recordNum}", record[1], None, size))
+
+
+    def submitFiles(self, executor: common.recovery_executor.RecoveryExecutor, deletedFiles: list, outputDir: str) -> list:
+
+        """
+        Submits the recovery of deleted files to executor.
+
+        Parameters
+        ----------
+        executor : recovery_executor.RecoveryExecutor
+            The executor which recovers the files.
+        deletedFiles : list[tuple]
+            Records yielded by iterDeletedFiles.
+        outputDir : str
+            The path of the output directory.
+
+        Returns
+        -------
+        futures : list[Future]
+            A future for each file, in order. Its result is True once the file is recovered.
+        """
+
+        return ntfsRecovery.recovery.Recovery().submitFiles(executor, self.diskPath, deletedFiles, outputDir)
+
+
+def describeFile(fileId: str, name: str, deletionTime: int, size: int) -> dict:
+
+    """
+    Describes a deleted file for the JSON Lines output.
+
+    Parameters
+    ----------
+    fileId : str
+        Identifies the file within its filesystem (an inode, first cluster or MFT record).
+    name : str
+        The name of the file. None if the filesystem does not keep it.
+    deletionTime : int
+        The time the file was deleted, in seconds since the epoch. None if the filesystem does not record it.
+    size : int
+        The size of the file in bytes. None if it is not known before recovery.
+
+    Returns
+    -------
+    description : dict
+        The description.
+    """
+
+    description = {"id": fileId, "name": name, "deletionTime": None, "size": size}
+    if deletionTime is not None:
+        description["deletionTime"] = time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(deletionTime))
+        description["deletionTimestamp"] = deletionTime
+
+    return description
+
+
+def matchesFilters(description: dict, args: argparse.Namespace) -> bool:
+
+    """
+    Checks whether a deleted file passes the filters given on the command line.
+    A file whose deletion time, name or size is not known does not pass a filter on that value.
+    A file is only skipped as overwritten if all of its clusters are known to be allocated.
+
+    Parameters
+    ----------
+    description : dict
+        The description of the file, from describeFile.
+    args : argparse.Namespace
+        The command line arguments.
+
+    Returns
+    -------
+    matches : bool
+        True if the file passes every filter.
+    """
+
+    if args.since is not None or args.until is not None:
+        deletionTime = description.get("deletionTimestamp")
+        if deletionTime is None:
+            return False
+        if args.since is not None and deletionTime < args.since:
+            return False
+        if args.until is not None and deletionTime > args.until:
+            return False
+
+    if args.name is not None:
+        if description["name"] is None or not fnmatch.fnmatchcase(description["name"].lower(), args.name.lower()):
+            return False
+
+    if args.min_size is not None or args.max_size is not None:
+        size = description["size"]
+        if size is None:
+            return False
+        if args.min_size is not None and size < args.min_size:
+            return False
+        if args.max_size is not None and size > args.max_size:
+            return False
+
+    if args.skip_overwritten and description.get("allocatedFraction") == 1.0:
+        return False
+
+    return True
+
+
+def parseTime(text: str) -> float:
+
+    """
+    Parses a time given on the command line, as seconds since the epoch or as an ISO 8601 date or date and time
+    (local time unless an offset is given).
+
+    Parameters
+    ----------
+    text : str
+        The time.
+
+    Returns
+    -------
+    timestamp : float
+        The time in seconds since the epoch.
+    """
+
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time: {text!r} (expected an ISO 8601 date or seconds since the epoch)")
+
+
+def openVolume(diskPath: str, fileSystem: str):
+
+    """
+    Opens a disk or disk image for scanning and recovery.
+
+    Parameters
+    ----------
+    diskPath : str
+        The path of the disk or disk image.
+    fileSystem : str
+        A key of FILE_SYSTEMS, or "auto" to detect the filesystem.
+
+    Returns
+    -------
+    volume : ExtVolume, FatVolume or NtfsVolume
+        The volume.
+    """
+
+    if fileSystem == "auto":
+        diskType = common.detect.detectFileSystem(diskPath)
+        if diskType is None:
+            raise ValueError("unrecognized filesystem")
+    else:
+        diskType = FILE_SYSTEMS[fileSystem]
+
+    if diskType in ("ext2", "ext3", "ext4"):
+        return ExtVolume(diskPath, diskType)
+    elif diskType in ("FAT32", "EXFA"):
+        return FatVolume(diskPath, diskType)
+    else:
+        return NtfsVolume(diskPath, diskType)
+
+
+def writeRecord(outputFile, record: dict):
+
+    """
+    Writes a record to the JSON Lines output, and flushes it so that it can be read as soon as it is written.
+
+    Parameters
+    ----------
+    outputFile : file
+        The text file to write to.
+    record : dict
+        The record.
+    """
+
+    outputFile.write(json.dumps(record) + "\n")
+    outputFile.flush()
+
+
+def processDisk(diskPath: str, args: argparse.Namespace, executor: common.recovery_executor.RecoveryExecutor, outputFile) -> bool:
+
+    """
+    Scans a disk for deleted files, writing a "found" record for each file which passes the filters.
+    If an output directory is given, the files found are then recovered, writing a "recovered" record for each as it completes.
+    A "summary" record, or an "error" record if the disk cannot be scanned, is written last.
+
+    Parameters
+    ----------
+    diskPath : str
+        The path of the disk or disk image.
+    args : argparse.Namespace
+        The command line arguments.
+    executor : recovery_executor.RecoveryExecutor
+        The executor which recovers the files.
+    outputFile : file
+        The text file the JSON Lines records are written to.
+
+    Returns
+    -------
+    succeeded : bool
+        False if the disk could not be scanned, or if any file found could not be recovered.
+    """
+
+    try:
+        volume = openVolume(diskPath, args.type)
+
+        numFound = 0
+        matched = []
+        descriptions = []
+        for deletedFile, description in volume.iterDeletedFiles(args.cache):
+            numFound += 1
+            if matchesFilters(description, args):
+                matched.append(deletedFile)
+                descriptions.append(description)
+                writeRecord(outputFile, {"type": "found", "disk": diskPath, "fileSystem": volume.fileSystem, **description})
+
+        numRecovered = 0
+        if args.output is not None and len(matched) > 0:
+            futures = volume.submitFiles(executor, matched, args.output)
+            positions = {future: position for position, future in enumerate(futures)}
+
+            for future in as_completed(futures):
+                record = {"type": "recovered", "disk": diskPath, "id": descriptions[positions[future]]["id"]}
+                try:
+                    record["recovered"] = bool(future.result())
+                except Exception as error:
+                    record["recovered"] = False
+                    record["error"] = str(error)
+                numRecovered += record["recovered"]
+                writeRecord(outputFile, record)
+
+    except Exception as error:
+        writeRecord(outputFile, {"type": "error", "disk": diskPath, "error": str(error)})
+        return False
+
+    writeRecord(outputFile, {"type": "summary", "disk": diskPath, "fileSystem": volume.fileSystem, "found": numFound,
+        "matched": len(matched), "recovered": numRecovered})
+
+    return args.output is None or numRecovered == len(matched)
+
+
+def parseArguments(argv: list) -> argparse.Namespace:
+
+    """
+    Parses the command line arguments.
+
+    Parameters
+    ----------
+    argv : list[str]
+        The arguments, without the program name.
+
+    Returns
+    -------
+    args : argparse.Namespace
+        The parsed arguments.
+    """
+
+    parser = argparse.ArgumentParser(prog="python -m src",
+        description="Finds deleted files on ext2/3/4, FAT32, exFAT and NTFS disks or disk images, and optionally recovers them. "
+        "Writes one JSON object per line to standard output: a \"found\" record for each deleted file which passes the filters, "
+        "a \"recovered\" record for each file recovered, and a \"summary\" (or \"error\") record for each disk.")
+
+    parser.add_argument("disks", nargs="+", metavar="DISK", help="the path of a disk or disk image")
+    parser.add_argument("-t", "--type", choices=["auto", *FILE_SYSTEMS], default="auto",
+        help="the filesystem of the disks (default: detected from each disk)")
+    parser.add_argument("-o", "--output", metavar="DIR", help="recover the files found to this directory (default: only list them)")
+    parser.add_argument("--since", type=parseTime, metavar="TIME", help="only files deleted at or after TIME (ISO 8601 or seconds since the epoch)")
+    parser.add_argument("--until", type=parseTime, metavar="TIME", help="only files deleted at or before TIME")
+    parser.add_argument("--name", metavar="GLOB", help="only files whose name matches GLOB, ignoring case")
+    parser.add_argument("--min-size", type=int, metavar="BYTES", help="only files of at least BYTES bytes")
+    parser.add_argument("--max-size", type=int, metavar="BYTES", help="only files of at most BYTES bytes")
+    parser.add_argument("--skip-overwritten", action="store_true",
+        help="skip FAT32 and exFAT files whose data is certainly overwritten, as their clusters are allocated to other files")
+    parser.add_argument("-j", "--jobs", type=int, default=common.recovery_executor.DEFAULT_WORKERS,
+        help="the number of files recovered at once (default: %(default)s)")
+    parser.add_argument("--cache", action="store_true", help="reuse the results of earlier scans of unchanged volumes, and store new ones")
+
+    args = parser.parse_args(argv)
+
+    # The output directory is created before any disk is scanned, so that a bad path is reported once, rather than as the failure of every file.
+    if args.output is not None:
+        try:
+            os.makedirs(args.output, exist_ok=True)
+        except OSError as error:
+            parser.error(f"cannot create the output directory {args.output}: {error.strerror}")
+
+    return args
+
+
+def main(argv: list = None) -> int:
+
+    """
+    Runs the command line interface.
+
+    Parameters
+    ----------
+    argv : list[str]
+        The arguments, without the program name. If this is None, sys.argv is used.
+
+    Returns
+    -------
+    status : int
+        The exit status: 0 if every disk was scanned and every file found was recovered (with -o), and 1 otherwise.
+    """
+
+    args = parseArguments(sys.argv[1:] if argv is None else argv)
+
+    succeeded = True
+    with common.recovery_executor.RecoveryExecutor(maxWorkers=args.jobs) as executor:
+        for diskPath in args.disks:
+            succeeded = processDisk(diskPath, args, executor, sys.stdout) and succeeded
+
+    return 0 if succeeded else 1
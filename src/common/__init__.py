@@ -1 +1,14 @@
-from src.common import decode
\ No newline at end of file
+from src.common import lazy_import
+
+__getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, (
+    "background_scan",
+    "block_device",
+    "copy_engine",
+    "decode",
+    "detect",
+    "layout",
+    "lazy_import",
+    "persistent_cache",
+    "recovery_executor",
+    "scan_cache",
+    "virtual_list"))
\ No newline at end of file
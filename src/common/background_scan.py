@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+
+
+# The largest number of results sent to the GUI in a single batch.
+BATCH_SIZE = 512
+
+# The longest time in seconds for which results are held back to fill a batch.
+BATCH_INTERVAL = 0.1
+
+
+class BackgroundScan:
+
+    """
+    Runs a scan for deleted files on a worker thread, so that the GUI stays responsive while the disk is read.
+    The scan is a generator function which yields tuples (results: list, fraction: float), where fraction is the
+    fraction of the scan completed so far (or None if it is not known). The results are passed to the GUI in batches
+    through a queue, which the GUI drains with poll from its event loop.
+
+    Attributes
+    ----------
+    state : str
+        "running", "done" once the scan has finished, "cancelled" once it has stopped after cancel was called,
+        or "error" if the scan raised an exception.
+    fraction : float
+        The fraction of the scan completed, as last reported by the scan. None if it is not known.
+    error : Exception
+        The exception raised by the scan, if state is "error".
+
+    Methods
+    -------
+    run(self, scanFunction, args: tuple)
+        Runs the scan, passing its results to the queue in batches.
+    cancel(self)
+        Asks the scan to stop. It stops the next time it yields.
+    poll(self) -> list
+        Gets the results passed to the queue since the last poll, and updates state and fraction.
+    """
+
+    def __init__(self, scanFunction, *args):
+
+        """
+        Parameters
+        ----------
+        scanFunction : function
+            A generator function which yields tuples (results: list, fraction: float).
+        *args
+            The arguments passed to scanFunction.
+        """
+
+        self.state: str = "running"
+        self.fraction: float = None
+        self.error: Exception = None
+
+        self.queue: queue.Queue = queue.Queue()
+        self.cancelled = threading.Event()
+
+        self.thread = threading.Thread(target=self.run, args=(scanFunction, args), name="scan", daemon=True)
+        self.thread.start()
+
+
+    def run(self, scanFunction, args: tuple):
+
+        """
+        Runs the scan on the worker thread, passing its results to the queue in batches.
+        Is a helper method for __init__.
+
+        Parameters
+        ----------
+        scanFunction : function
+            A generator function which yields tuples (results: list, fraction: float).
+        args : tuple
+            The arguments passed to scanFunction.
+        """
+
+        batch = []
+        fraction = None
+        lastSent = time.monotonic()
+
+        try:
+            scan = scanFunction(*args)
+            for results, fraction in scan:
+                if self.cancelled.is_set():
+                    scan.close()
+                    self.queue.put(("cancelled", batch, fraction))
+                    return
+
+                batch.extend(results)
+                if len(batch) >= BATCH_SIZE or time.monotonic() - lastSent >= BATCH_INTERVAL:
+                    self.queue.put(("running", batch, fraction))
+                    batch = []
+                    lastSent = time.monotonic()
+
+        except Exception as error:
+            self.queue.put(("error", batch, error))
+            return
+
+        self.queue.put(("done", batch, 1.0))
+
+
+    def cancel(self):
+
+        """
+        Asks the scan to stop. It stops the next time it yields, and state becomes "cancelled".
+        """
+
+        self.cancelled.set()
+
+
+    def poll(self) -> list:
+
+        """
+        Gets the results passed to the queue since the last poll, and updates state and fraction.
+        Does not block.
+
+        Returns
+        -------
+        results : list
+            The new results, in the order the scan found them.
+        """
+
+        results = []
+
+        while True:
+            try:
+                state, batch, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            results.extend(batch)
+            self.state = state
+            if state == "error":
+                self.error = value
+            else:
+                self.fraction = value
+
+        return results
@@ -0,0 +1,422 @@
+from collections import OrderedDict
+import mmap
+import os
+import stat
+import sys
+import threading
+
+
+class BlockDevice:
+
+    """
+    A reader for a disk (or disk image) which keeps a single open descriptor,
+    reads with positioned reads, and caches recently read metadata blocks.
+
+    Attributes
+    ----------
+    path : str
+        The path of the disk.
+    cacheSize : int
+        The maximum number of blocks held in the block cache.
+    hits : int
+        The number of readBlock calls which were served from the block cache.
+    misses : int
+        The number of readBlock calls which had to read from the disk.
+
+    Methods
+    -------
+    read(self, offset: int, length: int) -> bytes
+        Reads length bytes starting at the byte offset, bypassing the block cache.
+    readFully(self, readFunction, length: int) -> bytes
+        Calls readFunction until length bytes have been read, or the end of the disk is reached.
+    readBlock(self, blockNum: int, blockSize: int) -> bytes
+        Reads a single block through the block cache.
+    clearCache(self)
+        Empties the block cache.
+    close(self)
+        Closes the descriptor associated with the disk.
+    """
+
+    def __init__(self, path: str, cacheSize: int = 4096):
+
+        """
+        Parameters
+        ----------
+        path : str
+            The path of the disk.
+        cacheSize : int
+            The maximum number of blocks held in the block cache.
+        """
+
+        self.path: str = path
+        self.cacheSize: int = cacheSize
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self.fd: int = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        self.cache: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def read(self, offset: int, length: int) -> bytes:
+
+        """
+        Reads length bytes starting at the byte offset, bypassing the block cache.
+        Used for file data and other data which is only read once.
+
+        Parameters
+        ----------
+        offset : int
+            The byte offset from the start of the disk.
+        length : int
+            The number of bytes to read.
+
+        Returns
+        -------
+        data : bytes
+            The bytes which were read. This is shorter than length only at the end of the disk.
+            Subclasses may return any bytes-like object (such as a memoryview).
+        """
+
+        # os.pread is not available on windows. There the seek and read must not be interleaved with other threads.
+        if not hasattr(os, "pread"):
+            with self.lock:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                return self.readFully(lambda received: os.read(self.fd, length - received), length)
+
+        return self.readFully(lambda received: os.pread(self.fd, length - received, offset + received), length)
+
+
+    def readFully(self, readFunction, length: int) -> bytes:
+
+        """
+        Calls readFunction until length bytes have been read, or the end of the disk is reached.
+        A single read may return fewer bytes than requested, even before the end of the disk.
+        Is a helper method for read.
+
+        Parameters
+        ----------
+        readFunction : function
+            Given the number of bytes received so far, reads (some of) the remaining bytes.
+        length : int
+            The number of bytes to read.
+
+        Returns
+        -------
+        data : bytes
+            The bytes which were read.
+        """
+
+        data = readFunction(0)
+        if len(data) == length or len(data) == 0:
+            return data
+
+        parts = [data]
+        received = len(data)
+        while received < length:
+            part = readFunction(received)
+            if len(part) == 0:
+                break
+            parts.append(part)
+            received += len(part)
+
+        return b"".join(parts)
+
+
+    def readBlock(self, blockNum: int, blockSize: int) -> bytes:
+
+        """
+        Reads a single block through the block cache.
+        Used for filesystem metadata (super blocks, descriptors, inode tables, extent nodes, FAT sectors...)
+        which is read repeatedly.
+
+        Parameters
+        ----------
+        blockNum : int
+            The block number, counted in blocks of blockSize from the start of the disk.
+        blockSize : int
+            The size in bytes of the block.
+
+        Returns
+        -------
+        data : bytes
+            The bytes contained in the block.
+        """
+
+        key = (blockNum, blockSize)
+
+        with self.lock:
+            data = self.cache.get(key)
+            if data is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        data = self.read(blockNum * blockSize, blockSize)
+
+        with self.lock:
+            self.cache[key] = data
+            if len(self.cache) > self.cacheSize:
+                self.cache.popitem(last=False)
+
+        return data
+
+
+    def clearCache(self):
+
+        """
+        Empties the block cache.
+        Must be called before rescanning a disk which is in use, as cached blocks may have changed on disk.
+        """
+
+        with self.lock:
+            self.cache.clear()
+
+
+    def close(self):
+
+        """
+        Closes the descriptor associated with the disk.
+        """
+
+        with self.lock:
+            self.cache.clear()
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+
+class MappedBlockDevice(BlockDevice):
+
+    """
+    A reader for a disk image file which memory maps the whole image.
+    Reads return memoryview slices of the mapping, so no data is copied until a parser needs it,
+    and repeated reads are served by the page cache rather than by read system calls.
+
+    Attributes
+    ----------
+    path : str
+        The path of the disk image.
+    cacheSize : int
+        Unused. The page cache serves as the block cache.
+    hits : int
+        The number of readBlock calls.
+    misses : int
+        Always 0.
+    size : int
+        The size in bytes of the disk image.
+
+    Methods
+    -------
+    read(self, offset: int, length: int) -> memoryview
+        Returns length bytes starting at the byte offset, as a view of the mapping.
+    readBlock(self, blockNum: int, blockSize: int) -> memoryview
+        Returns a single block, as a view of the mapping.
+    clearCache(self)
+        Does nothing, as the mapping is always current.
+    close(self)
+        Unmaps the image and closes its descriptor.
+    """
+
+    def __init__(self, path: str, cacheSize: int = 4096):
+
+        """
+        Parameters
+        ----------
+        path : str
+            The path of the disk image.
+        cacheSize : int
+            Unused. Accepted so that both readers are constructed the same way.
+        """
+
+        super().__init__(path, cacheSize)
+
+        self.size: int = os.fstat(self.fd).st_size
+        try:
+            self.map = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, OverflowError):
+            os.close(self.fd)
+            self.fd = None
+            raise
+
+        self.view = memoryview(self.map)
+
+
+    def read(self, offset: int, length: int) -> memoryview:
+
+        """
+        Returns length bytes starting at the byte offset, as a view of the mapping.
+
+        Parameters
+        ----------
+        offset : int
+            The byte offset from the start of the image.
+        length : int
+            The number of bytes to return.
+
+        Returns
+        -------
+        data : memoryview
+            A view of the bytes. This is shorter than length only at the end of the image.
+        """
+
+        return self.view[offset:offset + length]
+
+
+    def readBlock(self, blockNum: int, blockSize: int) -> memoryview:
+
+        """
+        Returns a single block, as a view of the mapping.
+
+        Parameters
+        ----------
+        blockNum : int
+            The block number, counted in blocks of blockSize from the start of the image.
+        blockSize : int
+            The size in bytes of the block.
+
+        Returns
+        -------
+        data : memoryview
+            A view of the bytes contained in the block.
+        """
+
+        self.hits += 1
+        return self.view[blockNum * blockSize:(blockNum + 1) * blockSize]
+
+
+    def clearCache(self):
+
+        """
+        Does nothing, as the mapping always reflects the current contents of the image.
+        """
+
+
+    def close(self):
+
+        """
+        Unmaps the image and closes its descriptor.
+        If parsers still hold views of the mapping, it is instead unmapped once they are released.
+        """
+
+        with self.lock:
+            if self.fd is None:
+                return
+
+            try:
+                self.view.release()
+                self.map.close()
+            except BufferError:
+                pass
+
+            os.close(self.fd)
+            self.fd = None
+
+
+def canMap(path: str) -> bool:
+
+    """
+    Checks whether the disk at path can be memory mapped by MappedBlockDevice.
+    Only regular files (disk images) which fit in the address space are mapped.
+    Block devices, and images larger than the address space, are read with BlockDevice.
+
+    Parameters
+    ----------
+    path : str
+        The path of the disk.
+
+    Returns
+    -------
+    canMap : bool
+        True if the disk should be read with MappedBlockDevice.
+    """
+
+    try:
+        status = os.stat(path)
+    except OSError:
+        return False
+
+    return stat.S_ISREG(status.st_mode) and 0 < status.st_size <= sys.maxsize
+
+
+# The BlockDevice objects which are currently open, by disk path.
+openDevices: dict = {}
+openDevicesLock = threading.Lock()
+
+
+def getBlockDevice(path: str, mapImages: bool = True) -> BlockDevice:
+
+    """
+    Gets the shared BlockDevice for the given disk path, opening it if it is not already open.
+    Disk images are memory mapped when possible, otherwise they are read with positioned reads.
+
+    Parameters
+    ----------
+    path : str
+        The path of the disk.
+    mapImages : bool
+        Whether a disk image which is not already open may be memory mapped.
+
+    Returns
+    -------
+    device : BlockDevice
+        The BlockDevice (or MappedBlockDevice) shared by every reader of this disk.
+    """
+
+    with openDevicesLock:
+        device = openDevices.get(path)
+        if device is None or device.fd is None:
+            device = None
+            if mapImages and canMap(path):
+                try:
+                    device = MappedBlockDevice(path)
+                except (OSError, ValueError, OverflowError):
+                    device = None
+            if device is None:
+                device = BlockDevice(path)
+            openDevices[path] = device
+
+    return device
+
+
+def closeBlockDevices():
+
+    """
+    Closes every open BlockDevice.
+    """
+
+    with openDevicesLock:
+        for device in openDevices.values():
+            device.close()
+        openDevices.clear()
+
+
+def dropKernelCaches(path: str):
+
+    """
+    Flushes the kernel's caches, so that a disk in use by a mounted filesystem is reread as it is on disk.
+    This is only done for block devices, and only when running as root: disk images are reread through BlockDevice.clearCache,
+    and dropping the caches needs privileges which a normal user scanning images does not have.
+    It is best effort, and skipped if the caches cannot be dropped.
+
+    Parameters
+    ----------
+    path : str
+        The path of the disk.
+    """
+
+    try:
+        isBlockDevice = stat.S_ISBLK(os.stat(path).st_mode)
+    except OSError:
+        return
+
+    if not isBlockDevice or not hasattr(os, "geteuid") or os.geteuid() != 0:
+        return
+
+    os.sync()
+    try:
+        with open("/proc/sys/vm/drop_caches", "w") as dropCaches:
+            dropCaches.write("3")
+    except (PermissionError, FileNotFoundError):
+        pass
@@ -0,0 +1,210 @@
+import errno
+import os
+import threading
+
+from src.common import block_device
+
+
+# The size in bytes of the buffer used when data must be copied through user space.
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+# The errors with which copy_file_range and sendfile report that they cannot be used with the given descriptors.
+UNSUPPORTED_ERRORS = (errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF, errno.ESPIPE)
+
+
+class CopyEngine:
+
+    """
+    Copies runs of bytes from a disk into (recovered) files, using the fastest method available.
+    In order of preference, runs are copied with os.copy_file_range (in the kernel, disk images only),
+    os.sendfile (in the kernel, disks and disk images), by writing views of a memory mapped image,
+    or by reading into a reusable buffer.
+    Methods which fail because they are unsupported for the disk are not tried again.
+    An engine may be shared by threads recovering files in parallel.
+
+    Attributes
+    ----------
+    device : block_device.BlockDevice
+        The disk which data is copied from.
+    bufferSize : int
+        The size in bytes of the reusable buffers, and the largest amount copied by a single call.
+    useCopyFileRange : bool
+        Whether os.copy_file_range is still to be tried.
+    useSendFile : bool
+        Whether os.sendfile is still to be tried.
+
+    Methods
+    -------
+    copyRun(self, outputFile, offset: int, length: int) -> int
+        Copies length bytes starting at the byte offset of the disk to the end of outputFile.
+    copyKernel(self, copyFunction, outputFd: int, offset: int, length: int) -> int
+        Copies as much of the run as possible with copy_file_range or sendfile.
+    copyBuffered(self, outputFile, offset: int, length: int) -> int
+        Copies the run through user space.
+    """
+
+    def __init__(self, device: block_device.BlockDevice, bufferSize: int = COPY_BUFFER_SIZE):
+
+        """
+        Parameters
+        ----------
+        device : block_device.BlockDevice
+            The disk which data is copied from.
+        bufferSize : int
+            The size in bytes of the reusable buffer.
+        """
+
+        self.device = device
+        self.bufferSize: int = bufferSize
+        self.useCopyFileRange: bool = hasattr(os, "copy_file_range")
+        self.useSendFile: bool = hasattr(os, "sendfile")
+
+        # Each thread copying through user space has its own reusable buffer.
+        self.buffers = threading.local()
+
+
+    def copyRun(self, outputFile, offset: int, length: int) -> int:
+
+        """
+        Copies length bytes starting at the byte offset of the disk to the end of outputFile.
+
+        Parameters
+        ----------
+        outputFile : file
+            The file being recovered, opened for writing in binary mode (not in append mode,
+            which the kernel copies do not support).
+        offset : int
+            The byte offset of the run from the start of the disk.
+        length : int
+            The number of bytes to copy.
+
+        Returns
+        -------
+        copied : int
+            The number of bytes copied. This is less than length only at the end of the disk.
+        """
+
+        if length <= 0:
+            return 0
+
+        copied = 0
+
+        # Data buffered by the file object must be written before the kernel writes to the descriptor.
+        if self.useCopyFileRange or self.useSendFile:
+            outputFile.flush()
+
+        # If a kernel copy is still enabled after copying, it stopped short only at the end of the disk.
+        if self.useCopyFileRange:
+            copied += self.copyKernel("copy_file_range", outputFile.fileno(), offset, length)
+            if self.useCopyFileRange:
+                return copied
+
+        if self.useSendFile:
+            copied += self.copyKernel("sendfile", outputFile.fileno(), offset + copied, length - copied)
+            if self.useSendFile:
+                return copied
+
+        return copied + self.copyBuffered(outputFile, offset + copied, length - copied)
+
+
+    def copyKernel(self, copyFunction: str, outputFd: int, offset: int, length: int) -> int:
+
+        """
+        Copies as much of the run as possible with copy_file_range or sendfile.
+        If the method is unsupported for these descriptors, it is disabled for later runs.
+        Is a helper method for copyRun.
+
+        Parameters
+        ----------
+        copyFunction : str
+            "copy_file_range" or "sendfile".
+        outputFd : int
+            The descriptor of the file being recovered.
+        offset : int
+            The byte offset of the run from the start of the disk.
+        length : int
+            The number of bytes to copy.
+
+        Returns
+        -------
+        copied : int
+            The number of bytes copied.
+        """
+
+        copied = 0
+        while copied < length:
+            count = min(self.bufferSize, length - copied)
+            try:
+                if copyFunction == "copy_file_range":
+                    sent = os.copy_file_range(self.device.fd, outputFd, count, offset + copied)
+                else:
+                    sent = os.sendfile(outputFd, self.device.fd, offset + copied, count)
+            except OSError as error:
+                if error.errno not in UNSUPPORTED_ERRORS:
+                    raise
+                if copyFunction == "copy_file_range":
+                    self.useCopyFileRange = False
+                else:
+                    self.useSendFile = False
+                break
+
+            # 0 indicates the end of the disk.
+            if sent == 0:
+                break
+            copied += sent
+
+        return copied
+
+
+    def copyBuffered(self, outputFile, offset: int, length: int) -> int:
+
+        """
+        Copies the run through user space. Views of a memory mapped image are written directly,
+        other disks are read into a buffer which is reused for every run copied by the thread.
+        Is a helper method for copyRun.
+
+        Parameters
+        ----------
+        outputFile : file
+            The file being recovered.
+        offset : int
+            The byte offset of the run from the start of the disk.
+        length : int
+            The number of bytes to copy.
+
+        Returns
+        -------
+        copied : int
+            The number of bytes copied.
+        """
+
+        copied = 0
+
+        if isinstance(self.device, block_device.MappedBlockDevice):
+            while copied < length:
+                data = self.device.read(offset + copied, min(self.bufferSize, length - copied))
+                if len(data) == 0:
+                    break
+                outputFile.write(data)
+                copied += len(data)
+
+            return copied
+
+        view = getattr(self.buffers, "view", None)
+        if view is None:
+            view = memoryview(bytearray(self.bufferSize))
+            self.buffers.view = view
+
+        while copied < length:
+            count = min(self.bufferSize, length - copied)
+            if hasattr(os, "preadv"):
+                received = os.preadv(self.device.fd, [view[0:count]], offset + copied)
+                data = view[0:received]
+            else:
+                data = self.device.read(offset + copied, count)
+            if len(data) == 0:
+                break
+            outputFile.write(data)
+            copied += len(data)
+
+        return copied
@@ -40,16 +40,7 @@ class Decoder:
             The decimal form of the little endian bytes which were converted.
         """
 
-        num: int = 0
-        count: int = 0
-
-        for i in range(lower, upper + 1):
-            if count > 0:
-                num += (data[i] * pow(16, count))
-            else:
-                num += data[i]
-
-            count += 2
+        num: int = int.from_bytes(data[lower:upper + 1], "little")
 
         return num
 
@@ -79,18 +70,9 @@ class Decoder:
         num : int
             The decimal form of the little endian bytes which were converted.
         """
-        
-        newBytes: bytearray = bytearray()
-
-        for i in range(LSLower, LSUpper + 1):
-            newBytes.append(data[i])
 
-        for i in range(MSLower, MSUpper + 1):
-            newBytes.append(data[i])
-
-        decoder = Decoder()
-
-        num: int = decoder.leBytesToDecimal(newBytes, 0, len(newBytes) - 1)
+        num: int = (int.from_bytes(data[LSLower:LSUpper + 1], "little")
+            + (int.from_bytes(data[MSLower:MSUpper + 1], "little") << (8 * (LSUpper + 1 - LSLower))))
 
         return num
 
@@ -115,16 +97,7 @@ class Decoder:
             The decimal form of the big endian bytes which were converted.
         """
 
-        num: int = 0
-        count = (upper - lower) * 2
-        
-        for i in range(lower, upper + 1):
-            if count > 0:
-                num += (data[i] * pow(16, count))
-            else:
-                num += data[i]
-
-            count -= 2
+        num: int = int.from_bytes(data[lower:upper + 1], "big")
 
         return num
 
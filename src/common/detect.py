@@ -0,0 +1,73 @@
+from src.common import block_device, layout
+
+
+# The fields of the ext2/3/4 super block (at byte 1024) which identify the filesystem and its features.
+EXT_SUPER_BLOCK = layout.Layout("ExtSuperBlockFeatures", "little",
+    magic=layout.Field(0x38, 2),
+    compatFeatures=layout.Field(0x5C, 4),
+    incompatFeatures=layout.Field(0x60, 4),
+    roCompatFeatures=layout.Field(0x64, 4))
+
+# The magic number of the ext2/3/4 super block.
+EXT_MAGIC = 0xEF53
+
+# The has_journal compatible feature, present in ext3 and ext4.
+EXT_COMPAT_HAS_JOURNAL = 0x4
+
+# The incompatible features which only ext4 has: extents, 64bit and flex_bg.
+EXT4_INCOMPAT_FEATURES = 0x40 | 0x80 | 0x200
+
+# The read-only compatible features which only ext4 has: huge_file, gdt_csum, dir_nlink, extra_isize and metadata_csum.
+EXT4_RO_COMPAT_FEATURES = 0x8 | 0x10 | 0x20 | 0x40 | 0x400
+
+# The OEM names in bytes 3 to 11 of the exFAT and NTFS boot sectors.
+EXFAT_OEM_NAME = b"EXFAT   "
+NTFS_OEM_NAME = b"NTFS    "
+
+# The filesystem type in bytes 82 to 90 of the FAT32 boot sector (BS_FilSysType).
+FAT32_TYPE = b"FAT32   "
+
+# The signature in the last 2 bytes of a boot sector.
+BOOT_SIGNATURE = b"\x55\xAA"
+
+
+def detectFileSystem(diskPath: str) -> str:
+
+    """
+    Identifies the filesystem of a disk or disk image from its super block or boot sector.
+
+    Parameters
+    ----------
+    diskPath : str
+        The path of the disk or disk image.
+
+    Returns
+    -------
+    fileSystem : str
+        The disk type used for the filesystem by the filesystem packages:
+        "ext2", "ext3" or "ext4" (EXT), "FAT32" or "EXFA" (FAT), or "NTFS" (NTFS).
+        None if the filesystem is not one of these.
+    """
+
+    device = block_device.getBlockDevice(diskPath)
+
+    bootSector = device.read(0, 512)
+    if len(bootSector) == 512:
+        if bootSector[3:11] == EXFAT_OEM_NAME:
+            return "EXFA"
+        if bootSector[3:11] == NTFS_OEM_NAME:
+            return "NTFS"
+        if bootSector[82:90] == FAT32_TYPE and bootSector[510:512] == BOOT_SIGNATURE:
+            return "FAT32"
+
+    superBlock = device.read(1024, 1024)
+    if len(superBlock) == 1024:
+        fields = EXT_SUPER_BLOCK.unpack(superBlock)
+        if fields.magic == EXT_MAGIC:
+            if fields.incompatFeatures & EXT4_INCOMPAT_FEATURES or fields.roCompatFeatures & EXT4_RO_COMPAT_FEATURES:
+                return "ext4"
+            if fields.compatFeatures & EXT_COMPAT_HAS_JOURNAL:
+                return "ext3"
+            return "ext2"
+
+    return None
@@ -0,0 +1,229 @@
+from collections import namedtuple
+import struct
+
+
+# struct format characters for the integer widths which struct can unpack natively.
+INT_FORMATS: dict = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+class Field:
+
+    """
+    Describes a single unsigned integer field within an on-disk structure.
+
+    Attributes
+    ----------
+    offset : int
+        The byte offset of the field (or of its low order part) from the start of the structure.
+    width : int
+        The width in bytes of the field (or of its low order part).
+    highOffset : int
+        The byte offset of the high order part of the field, if the field is split
+        into a low and high part (as many ext4 64bit fields are). None otherwise.
+    highWidth : int
+        The width in bytes of the high order part of the field. 0 if the field is not split.
+    """
+
+    def __init__(self, offset: int, width: int, highOffset: int = None, highWidth: int = 0):
+
+        """
+        Parameters
+        ----------
+        offset : int
+            The byte offset of the field (or of its low order part).
+        width : int
+            The width in bytes of the field (or of its low order part).
+        highOffset : int
+            The byte offset of the high order part of the field, if it has one.
+        highWidth : int
+            The width in bytes of the high order part of the field, if it has one.
+        """
+
+        self.offset: int = offset
+        self.width: int = width
+        self.highOffset: int = highOffset
+        self.highWidth: int = highWidth if highOffset is not None else 0
+
+
+class Layout:
+
+    """
+    Describes the fields of an on-disk structure once, and decodes all of them with a single
+    precompiled struct.Struct call.
+
+    Fields are given by name, and the decoded values are returned as a namedtuple with those names.
+    Fields split into a low and high part are recombined as low + (high << (8 * width)).
+    Fields with widths struct cannot unpack natively (3, 6 bytes, ...) are read as bytes
+    and converted with int.from_bytes.
+
+    Attributes
+    ----------
+    name : str
+        The name of the structure. Used as the namedtuple type name.
+    byteOrder : str
+        "little" or "big". All fields in a layout share a byte order.
+    size : int
+        The number of bytes from the start of the structure to the end of its last field.
+    record : type
+        The namedtuple type returned by unpack.
+
+    Methods
+    -------
+    unpack(self, data: bytes, offset: int = 0)
+        Decodes every field of the structure starting at offset within data.
+    iterUnpack(self, data: bytes, stride: int, start: int = 0, count: int = None)
+        Decodes a table of these structures which are stride bytes apart.
+    assemble(self, raw: tuple, assembly: tuple) -> int
+        Rebuilds a single field from its parts in the raw struct output.
+    """
+
+    def __init__(self, name: str, byteOrder: str, **fields: Field):
+
+        """
+        Parameters
+        ----------
+        name : str
+            The name of the structure being described.
+        byteOrder : str
+            "little" or "big".
+        **fields : Field
+            The fields of the structure, by attribute name.
+        """
+
+        if byteOrder not in ("little", "big"):
+            raise ValueError(f"{name}: byteOrder must be 'little' or 'big', not {byteOrder!r}")
+
+        self.name: str = name
+        self.byteOrder: str = byteOrder
+        self.record = namedtuple(name, fields.keys())
+
+        # Each part is (offset, width, field index, isHighPart).
+        parts: list = []
+        for index, field in enumerate(fields.values()):
+            parts.append((field.offset, field.width, index, False))
+            if field.highOffset is not None:
+                parts.append((field.highOffset, field.highWidth, index, True))
+        parts.sort()
+
+        structFormat = "<" if byteOrder == "little" else ">"
+        position = 0
+        for offset, width, index, isHigh in parts:
+            if offset < position:
+                raise ValueError(f"{name}: field {self.record._fields[index]} overlaps the previous field")
+            if offset > position:
+                structFormat += f"{offset - position}x"
+            structFormat += INT_FORMATS.get(width, f"{width}s")
+            position = offset + width
+
+        self.size: int = position
+        self.struct = struct.Struct(structFormat)
+
+        # When every field is a single natively sized part, and the parts are already in field order,
+        # the raw struct output can be used as the record directly.
+        self.isDirect = (all(width in INT_FORMATS for _, width, _, _ in parts)
+            and [part[2] for part in parts] == list(range(len(fields)))
+            and len(parts) == len(fields))
+
+        # Otherwise, each field is rebuilt from (low part index, low width, high part index) in the raw output.
+        lowParts: dict = {}
+        highParts: dict = {}
+        for rawIndex, (offset, width, index, isHigh) in enumerate(parts):
+            if isHigh:
+                highParts[index] = (rawIndex, width)
+            else:
+                lowParts[index] = (rawIndex, width)
+        self.assembly: tuple = tuple((lowParts[index][0], lowParts[index][1], highParts.get(index, (None, 0))[0],
+            highParts.get(index, (None, 0))[1]) for index in range(len(fields)))
+
+
+    def unpack(self, data: bytes, offset: int = 0):
+
+        """
+        Decodes every field of the structure starting at offset within data.
+
+        Parameters
+        ----------
+        data : bytes
+            The data which contains the structure. Any buffer (bytes, bytearray, memoryview) is accepted.
+        offset : int
+            The byte offset of the structure within data.
+
+        Returns
+        -------
+        record : namedtuple
+            The decoded fields, by name.
+        """
+
+        raw = self.struct.unpack_from(data, offset)
+
+        if self.isDirect:
+            return self.record._make(raw)
+
+        return self.record._make([self.assemble(raw, assembly) for assembly in self.assembly])
+
+
+    def iterUnpack(self, data: bytes, stride: int, start: int = 0, count: int = None):
+
+        """
+        Decodes a table of these structures which are stride bytes apart.
+
+        Parameters
+        ----------
+        data : bytes
+            The data which contains the table.
+        stride : int
+            The distance in bytes between the start of consecutive structures.
+        start : int
+            The byte offset of the first structure within data.
+        count : int
+            The number of structures to decode. If None, as many as fit in data are decoded.
+
+        Returns
+        -------
+        records : iterator[namedtuple]
+            The decoded structures, in order.
+        """
+
+        if count is None:
+            count = max(0, (len(data) - start - self.size) // stride + 1)
+
+        unpackFrom = self.struct.unpack_from
+        if self.isDirect:
+            make = self.record._make
+            return (make(unpackFrom(data, offset)) for offset in range(start, start + (count * stride), stride))
+
+        return (self.unpack(data, offset) for offset in range(start, start + (count * stride), stride))
+
+
+    def assemble(self, raw: tuple, assembly: tuple) -> int:
+
+        """
+        Rebuilds a single field from its parts in the raw struct output.
+        Is a helper method for unpack.
+
+        Parameters
+        ----------
+        raw : tuple
+            The raw output of the compiled struct.
+        assembly : tuple
+            (low part index, low part width, high part index, high part width) for the field.
+
+        Returns
+        -------
+        value : int
+            The decoded field.
+        """
+
+        lowIndex, lowWidth, highIndex, highWidth = assembly
+
+        value = raw[lowIndex]
+        if lowWidth not in INT_FORMATS:
+            value = int.from_bytes(value, self.byteOrder)
+
+        if highIndex is not None:
+            high = raw[highIndex]
+            if highWidth not in INT_FORMATS:
+                high = int.from_bytes(high, self.byteOrder)
+            value += high << (8 * lowWidth)
+
+        return value
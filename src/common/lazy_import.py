@@ -0,0 +1,42 @@
+import importlib
+
+
+def lazySubmodules(packageName: str, submodules: tuple) -> tuple:
+
+    """
+    Makes the submodules of a package load when they are first used, instead of when the package is imported (PEP 562).
+    Used in the __init__ of each package, as
+
+        __getattr__, __dir__, __all__ = lazy_import.lazySubmodules(__name__, ("submodule", ...))
+
+    so that package.submodule, from package import submodule, and from package import * work as if the submodules
+    had been imported by the __init__. Importing a package then costs almost nothing, and a submodule
+    (and the modules it depends on, such as tkinter) is only loaded by the programs which use it.
+
+    Parameters
+    ----------
+    packageName : str
+        The name of the package (__name__ in its __init__).
+    submodules : tuple[str]
+        The names of the submodules to load lazily.
+
+    Returns
+    -------
+    functions : tuple
+        (__getattr__, __dir__, __all__) for the package.
+    """
+
+    def getAttribute(name: str):
+
+        # Only called when name is not yet an attribute of the package. Importing the submodule makes it one,
+        # so each submodule is only looked up here once.
+        if name in submodules:
+            return importlib.import_module(f"{packageName}.{name}")
+
+        raise AttributeError(f"module {packageName!r} has no attribute {name!r}")
+
+    def listAttributes() -> list:
+        package = importlib.import_module(packageName)
+        return sorted(set(vars(package)).union(submodules))
+
+    return (getAttribute, listAttributes, list(submodules))
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+
+
+# Incremented whenever the format of cached values changes, so that older caches are ignored.
+CACHE_VERSION = 1
+
+# The cache directory when running as root (as FDRecovery must to read disks) on linux.
+# The home directory under sudo may still be the invoking user's, so it is not used.
+ROOT_CACHE_DIRECTORY = "/var/cache/fdrecovery"
+
+
+def getCacheDirectory() -> str:
+
+    """
+    Gets the directory in which FDRecovery keeps its caches.
+    This is ROOT_CACHE_DIRECTORY when running as root, $XDG_CACHE_HOME/fdrecovery (~/.cache/fdrecovery) for other users
+    on linux, and %LOCALAPPDATA%\\fdrecovery on windows.
+
+    Returns
+    -------
+    cacheDirectory : str
+        The path of the cache directory. It may not exist yet.
+    """
+
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        return ROOT_CACHE_DIRECTORY
+
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        base = os.environ["LOCALAPPDATA"]
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+    return os.path.join(base, "fdrecovery")
+
+
+def isTrusted(fileStat: os.stat_result) -> bool:
+
+    """
+    Checks whether a cache file or directory can only have been written by the current user.
+    Cached values are unpickled, which can run arbitrary code, so values written by anyone else must not be loaded.
+    Always True on windows, where the cache is in the user's own profile.
+
+    Parameters
+    ----------
+    fileStat : os.stat_result
+        The status of the file or directory (not following symbolic links).
+
+    Returns
+    -------
+    isTrusted : bool
+        True if it is owned by the effective user, and is not writable by its group or by others.
+    """
+
+    if not hasattr(os, "geteuid"):
+        return True
+
+    return fileStat.st_uid == os.geteuid() and fileStat.st_mode & (stat.S_IWGRP | stat.S_IWOTH) == 0
+
+
+class PersistentCache:
+
+    """
+    Stores values between runs of FDRecovery, one file per key.
+    Values are pickled, and written atomically, so that an interrupted write never leaves a partial value.
+    A value which cannot be read (missing, corrupt, or from another version) is treated as absent, as is a value
+    which another user could have written (see isTrusted), since unpickling it could run their code.
+
+    Attributes
+    ----------
+    name : str
+        The name of the cache. Each cache has its own subdirectory.
+    directory : str
+        The path of the directory containing the cached values.
+
+    Methods
+    -------
+    getPath(self, key: str) -> str
+        Gets the path of the file containing the value for key.
+    load(self, key: str)
+        Gets the value stored for key, or None if there is none.
+    store(self, key: str, value)
+        Stores value for key, replacing any previous value.
+    remove(self, key: str)
+        Removes the value stored for key, if there is one.
+    """
+
+    def __init__(self, name: str, directory: str = None):
+
+        """
+        Parameters
+        ----------
+        name : str
+            The name of the cache.
+        directory : str
+            The directory containing all caches. If this is None, getCacheDirectory() is used.
+        """
+
+        self.name: str = name
+        self.directory: str = os.path.join(directory or getCacheDirectory(), name)
+
+
+    def getPath(self, key: str) -> str:
+
+        """
+        Gets the path of the file containing the value for key.
+        Keys are hashed, so that any string may be used as a key.
+
+        Parameters
+        ----------
+        key : str
+            The key.
+
+        Returns
+        -------
+        path : str
+            The path of the file.
+        """
+
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".pickle")
+
+
+    def load(self, key: str):
+
+        """
+        Gets the value stored for key.
+
+        Parameters
+        ----------
+        key : str
+            The key.
+
+        Returns
+        -------
+        value
+            The stored value, or None if there is none (or it cannot be read).
+        """
+
+        try:
+            # The directories are checked up to the one containing all caches, so that no other user can replace the file.
+            for directory in (os.path.dirname(self.directory), self.directory):
+                if not isTrusted(os.lstat(directory)):
+                    return None
+
+            fd = os.open(self.getPath(key), os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_BINARY", 0))
+            with os.fdopen(fd, "rb") as cacheFile:
+                if not isTrusted(os.fstat(cacheFile.fileno())):
+                    return None
+                version, storedKey, value = pickle.load(cacheFile)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError, ImportError):
+            return None
+
+        if version != CACHE_VERSION or storedKey != key:
+            return None
+
+        return value
+
+
+    def store(self, key: str, value):
+
+        """
+        Stores value for key, replacing any previous value.
+        Failure to write the cache (a read only home directory, for example) is ignored.
+
+        Parameters
+        ----------
+        key : str
+            The key.
+        value
+            The value. It must be picklable.
+        """
+
+        try:
+            # Only the user may write to the cache directories, or the values in them would not be loaded.
+            os.makedirs(os.path.dirname(self.directory), mode=0o700, exist_ok=True)
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+            # The value is written to a temporary file in the same directory, which then replaces the old value.
+            fd, temporaryPath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as cacheFile:
+                    pickle.dump((CACHE_VERSION, key, value), cacheFile, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temporaryPath, self.getPath(key))
+            except BaseException:
+                os.unlink(temporaryPath)
+                raise
+        except OSError:
+            pass
+
+
+    def remove(self, key: str):
+
+        """
+        Removes the value stored for key, if there is one.
+
+        Parameters
+        ----------
+        key : str
+            The key.
+        """
+
+        try:
+            os.unlink(self.getPath(key))
+        except FileNotFoundError:
+            pass
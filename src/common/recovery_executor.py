@@ -0,0 +1,225 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import threading
+
+
+# The default number of files recovered at once.
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+# The default limit on the number of bytes of the files being recovered at once.
+DEFAULT_MAX_BYTES_IN_FLIGHT = 512 * 1024 * 1024
+
+
+class RecoveryExecutor:
+
+    """
+    Recovers files in parallel on a pool of worker threads.
+    The total size of the files being recovered at once is bounded, so that a few very large files
+    do not occupy every worker and every buffer at the same time as each other.
+
+    Attributes
+    ----------
+    maxWorkers : int
+        The number of worker threads.
+    maxBytesInFlight : int
+        The limit on the total size of the files being recovered at once.
+        A single file larger than this limit is recovered alone.
+    bytesInFlight : int
+        The total size of the files currently being recovered.
+
+    Methods
+    -------
+    submit(self, recoverFunction, numBytes: int, *args) -> Future
+        Schedules recoverFunction(*args), which recovers a single file of numBytes bytes.
+    run(self, recoverFunction, numBytes: int, args: tuple)
+        Recovers a single file on a worker thread, holding its bytes in flight while doing so.
+    reserve(self, numBytes: int)
+        Waits until numBytes more bytes may be in flight, then reserves them.
+    release(self, numBytes: int)
+        Releases bytes reserved by reserve.
+    getResults(futures: list) -> list
+        Waits for each of the futures, returning their results in order.
+    getOutcomes(futures: list) -> tuple
+        Waits for each of the futures, counting the files recovered and collecting the errors of those which failed.
+    shutdown(self, wait: bool = True)
+        Stops the worker threads once the submitted files are recovered.
+    """
+
+    def __init__(self, maxWorkers: int = DEFAULT_WORKERS, maxBytesInFlight: int = DEFAULT_MAX_BYTES_IN_FLIGHT):
+
+        """
+        Parameters
+        ----------
+        maxWorkers : int
+            The number of worker threads.
+        maxBytesInFlight : int
+            The limit on the total size of the files being recovered at once.
+        """
+
+        self.maxWorkers: int = maxWorkers
+        self.maxBytesInFlight: int = maxBytesInFlight
+        self.bytesInFlight: int = 0
+
+        self.condition = threading.Condition()
+        self.pool = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="recovery")
+
+
+    def submit(self, recoverFunction, numBytes: int, *args) -> Future:
+
+        """
+        Schedules recoverFunction(*args), which recovers a single file of numBytes bytes.
+        Does not block. The file is recovered once a worker is free and numBytes may be in flight.
+
+        Parameters
+        ----------
+        recoverFunction : function
+            Recovers a single file.
+        numBytes : int
+            The (estimated) size of the file in bytes.
+        *args
+            The arguments passed to recoverFunction.
+
+        Returns
+        -------
+        future : Future
+            The future for the result of recoverFunction.
+        """
+
+        return self.pool.submit(self.run, recoverFunction, numBytes, args)
+
+
+    def run(self, recoverFunction, numBytes: int, args: tuple):
+
+        """
+        Recovers a single file on a worker thread, holding its bytes in flight while doing so.
+        Is a helper method for submit.
+
+        Parameters
+        ----------
+        recoverFunction : function
+            Recovers a single file.
+        numBytes : int
+            The (estimated) size of the file in bytes.
+        args : tuple
+            The arguments passed to recoverFunction.
+
+        Returns
+        -------
+        result
+            The result of recoverFunction.
+        """
+
+        self.reserve(numBytes)
+        try:
+            return recoverFunction(*args)
+        finally:
+            self.release(numBytes)
+
+
+    def reserve(self, numBytes: int):
+
+        """
+        Waits until numBytes more bytes may be in flight, then reserves them.
+
+        Parameters
+        ----------
+        numBytes : int
+            The number of bytes to reserve.
+        """
+
+        with self.condition:
+            # When nothing is in flight, any file may start, however large.
+            while self.bytesInFlight > 0 and self.bytesInFlight + numBytes > self.maxBytesInFlight:
+                self.condition.wait()
+            self.bytesInFlight += numBytes
+
+
+    def release(self, numBytes: int):
+
+        """
+        Releases bytes reserved by reserve.
+
+        Parameters
+        ----------
+        numBytes : int
+            The number of bytes to release.
+        """
+
+        with self.condition:
+            self.bytesInFlight -= numBytes
+            self.condition.notify_all()
+
+
+    @staticmethod
+    def getResults(futures: list) -> list:
+
+        """
+        Waits for each of the futures, returning their results in order.
+        If a file could not be recovered, the exception raised while recovering it is raised here.
+
+        Parameters
+        ----------
+        futures : list[Future]
+            The futures returned by submit.
+
+        Returns
+        -------
+        results : list
+            The result of each future.
+        """
+
+        return [future.result() for future in futures]
+
+
+    @staticmethod
+    def getOutcomes(futures: list) -> tuple:
+
+        """
+        Waits for each of the futures, counting the files recovered and collecting the errors of those which failed.
+        Unlike getResults, a file which could not be recovered does not stop the results of the others from being collected,
+        so it is used where every file must be accounted for, such as when recovering from a window.
+
+        Parameters
+        ----------
+        futures : list[Future]
+            The futures returned by submit.
+
+        Returns
+        -------
+        outcomes : tuple
+            (numRecovered, errors): the number of futures whose result is True, and the message of each exception raised
+            while recovering a file, in order. Files whose result is False (not found) failed without an exception.
+        """
+
+        numRecovered = 0
+        errors = []
+
+        for future in futures:
+            try:
+                numRecovered += bool(future.result())
+            except Exception as error:
+                errors.append(str(error))
+
+        return (numRecovered, errors)
+
+
+    def shutdown(self, wait: bool = True):
+
+        """
+        Stops the worker threads once the submitted files are recovered.
+
+        Parameters
+        ----------
+        wait : bool
+            Whether to wait for the submitted files to be recovered before returning.
+        """
+
+        self.pool.shutdown(wait=wait)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        self.shutdown()
@@ -0,0 +1,110 @@
+from src.common import persistent_cache
+
+
+# The name of the persistent cache holding the deleted files found by previous scans, by volume.
+SCAN_CACHE_NAME = "scans"
+
+
+class ScanCache:
+
+    """
+    Keeps the deleted files found by scans of each volume, so that a volume which has not changed is not scanned again.
+    A volume is identified by its UUID or serial number, and each result is stored with a change indicator:
+    a tuple of values read from the volume's metadata which change when the volume is written to
+    (write times, mount counts, free counts, log sequence numbers).
+    A result is only returned while the volume's change indicator is unchanged, so results are invalidated
+    automatically when the volume changes.
+
+    Attributes
+    ----------
+    cache : persistent_cache.PersistentCache
+        The persistent cache in which results are stored.
+
+    Methods
+    -------
+    getKey(self, scanType: str, volumeId: str) -> str
+        Gets the key under which the results of a scan of a volume are stored.
+    load(self, scanType: str, volumeId: str, changeIndicator: tuple)
+        Gets the stored result of a scan of a volume, if the volume has not changed since.
+    store(self, scanType: str, volumeId: str, changeIndicator: tuple, result)
+        Stores the result of a scan of a volume.
+    """
+
+    def __init__(self, directory: str = None):
+
+        """
+        Parameters
+        ----------
+        directory : str
+            The directory containing all caches. If this is None, persistent_cache.getCacheDirectory() is used.
+        """
+
+        self.cache = persistent_cache.PersistentCache(SCAN_CACHE_NAME, directory)
+
+
+    def getKey(self, scanType: str, volumeId: str) -> str:
+
+        """
+        Gets the key under which the results of a scan of a volume are stored.
+
+        Parameters
+        ----------
+        scanType : str
+            The kind of scan, as the same volume may be scanned in different ways (for example "ext2 sequential").
+        volumeId : str
+            The UUID or serial number of the volume.
+
+        Returns
+        -------
+        key : str
+            The key.
+        """
+
+        return f"{scanType}:{volumeId}"
+
+
+    def load(self, scanType: str, volumeId: str, changeIndicator: tuple):
+
+        """
+        Gets the stored result of a scan of a volume, if the volume has not changed since.
+
+        Parameters
+        ----------
+        scanType : str
+            The kind of scan.
+        volumeId : str
+            The UUID or serial number of the volume.
+        changeIndicator : tuple
+            The current change indicator of the volume.
+
+        Returns
+        -------
+        result
+            The stored result, or None if there is none, or the volume has changed since it was stored.
+        """
+
+        value = self.cache.load(self.getKey(scanType, volumeId))
+        if value is None or value[0] != changeIndicator:
+            return None
+
+        return value[1]
+
+
+    def store(self, scanType: str, volumeId: str, changeIndicator: tuple, result):
+
+        """
+        Stores the result of a scan of a volume, replacing any previous result.
+
+        Parameters
+        ----------
+        scanType : str
+            The kind of scan.
+        volumeId : str
+            The UUID or serial number of the volume.
+        changeIndicator : tuple
+            The change indicator of the volume when it was scanned.
+        result
+            The result of the scan. It must be picklable.
+        """
+
+        self.cache.store(self.getKey(scanType, volumeId), (changeIndicator, result))
@@ -0,0 +1,359 @@
+import array
+import tkinter as tk
+from tkinter import font
+
+
+class VirtualList(tk.Frame):
+
+    """
+    A scrollable list of selectable rows, for lists of deleted files too long for a tk.Listbox.
+    The rows are kept in a backing list, and only the rows in view are placed in the Listbox, so the cost of
+    drawing the list does not grow with its length.
+    Sorting and filtering change the view, an array of indices into the backing list; the rows themselves are not copied.
+    The selection is kept as a set of indices into the backing list, so it is unaffected by sorting, filtering and scrolling.
+
+    Attributes
+    ----------
+    items : list
+        The backing list: the object each row stands for (for example a deleted inode or entry set), in the order added.
+    labels : list[str]
+        The text shown for each row. The indices of this list correspond to the indices of items.
+    view : array.array
+        The indices of the items shown, in the order shown.
+    selected : set[int]
+        The indices of the selected items. Only items in view are selected: hiding a row with the filter deselects it.
+    sortKey : function
+        The function of an item by which the view is sorted. None if the view is in the order the items were added.
+    sortReverse : bool
+        Whether the view is sorted in descending order.
+    filterText : str
+        Only the rows whose label contains this text (ignoring case) are shown.
+    top : int
+        The position in view of the first row shown.
+    numRows : int
+        The number of rows which fit in the Listbox.
+    listBox : tk.Listbox
+        Shows the rows in view.
+    scrollBar : tk.Scrollbar
+        Scrolls through the whole view.
+
+    Methods
+    -------
+    clear(self)
+        Removes all rows.
+    appendItems(self, items: list, labels: list)
+        Adds rows to the end of the backing list.
+    sortBy(self, sortKey, reverse: bool = False)
+        Sorts the view by a key function of the items.
+    filterBy(self, filterText: str)
+        Shows only the rows whose label contains filterText.
+    updateView(self)
+        Rebuilds the view from the backing list, applying the filter and the sort order.
+    getSelected(self) -> list
+        Gets the selected items, in the order shown.
+    selectAll(self)
+        Selects every row in view, or clears the selection if any row is selected.
+    clearSelection(self)
+        Deselects all rows.
+    render(self)
+        Places the rows in view in the Listbox.
+    yview(self, *args)
+        Scrolls the list. Called by the scroll bar.
+    onClick(self, event)
+        Selects or deselects the row clicked.
+    onScroll(self, event)
+        Scrolls the list with the mouse wheel.
+    onResize(self, event)
+        Updates numRows when the Listbox changes size.
+    """
+
+    def __init__(self, master: tk.Misc, height: int = 30):
+
+        """
+        Parameters
+        ----------
+        master : tk.Misc
+            The widget containing the list.
+        height : int
+            The number of rows shown before the list is resized.
+        """
+
+        super().__init__(master=master)
+
+        self.items: list = []
+        self.labels: list[str] = []
+        self.view: array.array = array.array("q")
+        self.selected: set = set()
+        self.sortKey = None
+        self.sortReverse: bool = False
+        self.filterText: str = ""
+        self.top: int = 0
+        self.numRows: int = height
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        # The selection is drawn by render, so the Listbox's own selection bindings are replaced by onClick.
+        self.listBox: tk.Listbox = tk.Listbox(master=self, exportselection=False, selectmode=tk.MULTIPLE, activestyle="none", height=height)
+        self.listBox.grid(column=0, row=0, sticky="nesw")
+
+        self.scrollBar: tk.Scrollbar = tk.Scrollbar(master=self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollBar.grid(column=1, row=0, sticky="ns")
+
+        self.listBox.bind("<Button-1>", self.onClick)
+        self.listBox.bind("<B1-Motion>", lambda event: "break")
+        self.listBox.bind("<MouseWheel>", self.onScroll)
+        self.listBox.bind("<Button-4>", self.onScroll)
+        self.listBox.bind("<Button-5>", self.onScroll)
+        self.listBox.bind("<Configure>", self.onResize)
+
+
+    def clear(self):
+
+        """
+        Removes all rows, and the selection.
+        """
+
+        self.items = []
+        self.labels = []
+        self.view = array.array("q")
+        self.selected = set()
+        self.top = 0
+        self.render()
+
+
+    def appendItems(self, items: list, labels: list):
+
+        """
+        Adds rows to the end of the backing list.
+        The rows which pass the filter are added to the end of the view, whatever the sort order,
+        so that the rows in view do not move while a scan is adding rows. Call updateView to sort them.
+
+        Parameters
+        ----------
+        items : list
+            The objects the new rows stand for.
+        labels : list[str]
+            The text shown for each new row.
+        """
+
+        start = len(self.items)
+        self.items.extend(items)
+        self.labels.extend(labels)
+
+        filterText = self.filterText.lower()
+        self.view.extend(index for index in range(start, len(self.items)) if filterText in self.labels[index].lower())
+
+        self.render()
+
+
+    def sortBy(self, sortKey, reverse: bool = False):
+
+        """
+        Sorts the view by a key function of the items.
+
+        Parameters
+        ----------
+        sortKey : function
+            Gets the value of an item by which it is sorted. If this is None, the items are shown in the order they were added.
+        reverse : bool
+            Whether to sort in descending order.
+        """
+
+        self.sortKey = sortKey
+        self.sortReverse = reverse
+        self.updateView()
+
+
+    def filterBy(self, filterText: str):
+
+        """
+        Shows only the rows whose label contains filterText, ignoring case.
+        Selected rows which are hidden are deselected, so that only the rows shown are recovered.
+
+        Parameters
+        ----------
+        filterText : str
+            The text to look for. All rows are shown if this is empty.
+        """
+
+        self.filterText = filterText
+        self.updateView()
+
+
+    def updateView(self):
+
+        """
+        Rebuilds the view from the backing list, applying the filter and the sort order, and scrolls to the top.
+        Selected rows which the filter hides are deselected.
+        """
+
+        filterText = self.filterText.lower()
+        if filterText == "":
+            indices = range(0, len(self.items))
+        else:
+            indices = [index for index in range(0, len(self.items)) if filterText in self.labels[index].lower()]
+
+        if self.sortKey is not None:
+            items = self.items
+            sortKey = self.sortKey
+            indices = sorted(indices, key=lambda index: sortKey(items[index]), reverse=self.sortReverse)
+
+        self.view = array.array("q", indices)
+        self.selected.intersection_update(self.view)
+        self.top = 0
+        self.render()
+
+
+    def getSelected(self) -> list:
+
+        """
+        Gets the selected items, in the order shown. Items hidden by the filter are never included.
+
+        Returns
+        -------
+        selected : list
+            The selected items.
+        """
+
+        return [self.items[index] for index in self.view if index in self.selected]
+
+
+    def selectAll(self):
+
+        """
+        Selects every row in view. If any row is selected, deselects all rows instead.
+        """
+
+        if len(self.selected) > 0:
+            self.selected = set()
+        else:
+            self.selected = set(self.view)
+        self.render()
+
+
+    def clearSelection(self):
+
+        """
+        Deselects all rows.
+        """
+
+        self.selected = set()
+        self.render()
+
+
+    def render(self):
+
+        """
+        Places the rows in view in the Listbox, and updates the scroll bar.
+        Is a helper method for every method which changes the rows shown.
+        """
+
+        self.top = max(0, min(self.top, len(self.view) - self.numRows))
+        rows = self.view[self.top:self.top + self.numRows]
+
+        self.listBox.delete(0, tk.END)
+        if len(rows) > 0:
+            self.listBox.insert(0, *[self.labels[index] for index in rows])
+        for row, index in enumerate(rows):
+            if index in self.selected:
+                self.listBox.selection_set(row)
+
+        if len(self.view) == 0:
+            self.scrollBar.set(0, 1)
+        else:
+            self.scrollBar.set(self.top / len(self.view), min(1, (self.top + self.numRows) / len(self.view)))
+
+
+    def yview(self, *args):
+
+        """
+        Scrolls the list. Called by the scroll bar, with the arguments of tk.Listbox.yview.
+
+        Parameters
+        ----------
+        *args
+            ("moveto", fraction) to scroll so that fraction of the view is above the first row shown, or
+            ("scroll", number, "units" or "pages") to scroll by a number of rows or pages.
+        """
+
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.view))
+        elif args[0] == "scroll":
+            numRows = int(args[1])
+            if args[2] == "pages":
+                numRows *= self.numRows
+            self.top += numRows
+
+        self.render()
+
+
+    def onClick(self, event: tk.Event) -> str:
+
+        """
+        Selects or deselects the row clicked.
+
+        Parameters
+        ----------
+        event : tk.Event
+            The mouse click.
+
+        Returns
+        -------
+        "break", so that the Listbox does not change its own selection.
+        """
+
+        row = self.listBox.nearest(event.y)
+        if 0 <= row and self.top + row < len(self.view):
+            index = self.view[self.top + row]
+            if index in self.selected:
+                self.selected.remove(index)
+            else:
+                self.selected.add(index)
+            self.render()
+
+        return "break"
+
+
+    def onScroll(self, event: tk.Event) -> str:
+
+        """
+        Scrolls the list with the mouse wheel, 3 rows at a time.
+
+        Parameters
+        ----------
+        event : tk.Event
+            The mouse wheel event. On X11 the wheel sends button 4 (up) and button 5 (down) instead.
+
+        Returns
+        -------
+        "break", so that the Listbox does not scroll its own rows.
+        """
+
+        if event.num == 4 or event.delta > 0:
+            self.yview("scroll", -3, "units")
+        else:
+            self.yview("scroll", 3, "units")
+
+        return "break"
+
+
+    def onResize(self, event: tk.Event):
+
+        """
+        Updates numRows when the Listbox changes size, so that the rows shown fill it.
+
+        Parameters
+        ----------
+        event : tk.Event
+            The configure event, with the new height of the Listbox.
+        """
+
+        # Each row of a Listbox is the height of a line of its font, plus 1 pixel and the selection border above and below.
+        lineHeight = font.Font(font=self.listBox.cget("font")).metrics("linespace") + 1 + (2 * int(self.listBox.cget("selectborderwidth")))
+        border = 2 * (int(self.listBox.cget("borderwidth")) + int(self.listBox.cget("highlightthickness")))
+
+        numRows = max(1, (event.height - border) // lineHeight)
+        if numRows != self.numRows:
+            self.numRows = numRows
+            self.render()
@@ -0,0 +1,89 @@
+import statistics
+import subprocess
+import sys
+import time
+
+
+# The most time in milliseconds an entry point may add to the startup of the Python interpreter.
+STARTUP_BUDGET_MS = 50
+
+# The number of times each entry point is started. The median time is compared to the budget.
+NUM_RUNS = 15
+
+# The code run for each entry point which must start within the budget, in a new interpreter.
+ENTRY_POINTS = {
+    "command line interface": "import src.cli; src.cli.parseArguments(['disk'])",
+    "EXT recovery": "import src.EXT.recovery.recovery_journaled, src.EXT.recovery.recovery_no_journal",
+    "FAT recovery": "import src.FAT.recovery.recovery",
+    "NTFS recovery": "import src.NTFS.recovery.recovery"}
+
+# Modules which no entry point may load: they are only needed by the windows.
+FORBIDDEN_MODULES = ("tkinter", "_tkinter")
+
+
+def timeCode(code: str) -> float:
+
+    """
+    Runs code in a new interpreter, and times it.
+
+    Parameters
+    ----------
+    code : str
+        The code to run.
+
+    Returns
+    -------
+    milliseconds : float
+        The time from starting the interpreter to its exit.
+    """
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return 1000 * (time.perf_counter() - start)
+
+
+def getLoadedModules(code: str) -> set:
+
+    """
+    Runs code in a new interpreter, and gets the modules it loaded.
+
+    Parameters
+    ----------
+    code : str
+        The code to run.
+
+    Returns
+    -------
+    modules : set[str]
+        The names of the modules in sys.modules after running code.
+    """
+
+    result = subprocess.run([sys.executable, "-c", code + "\nimport sys\nprint('\\n'.join(sys.modules))"],
+        check=True, capture_output=True, text=True)
+    return set(result.stdout.split())
+
+
+def checkStartup():
+
+    # The time taken by the interpreter alone is subtracted from the time of each entry point.
+    baseline = statistics.median(timeCode("pass") for run in range(0, NUM_RUNS))
+    print(f"interpreter: {baseline:.1f} ms")
+
+    withinBudget = True
+    for name, code in ENTRY_POINTS.items():
+        startupTime = statistics.median(timeCode(code) for run in range(0, NUM_RUNS)) - baseline
+        forbidden = getLoadedModules(code).intersection(FORBIDDEN_MODULES)
+
+        status = "ok"
+        if startupTime > STARTUP_BUDGET_MS:
+            status = f"over the budget of {STARTUP_BUDGET_MS} ms"
+        if len(forbidden) > 0:
+            status = "loads " + ", ".join(sorted(forbidden))
+        withinBudget = withinBudget and status == "ok"
+
+        print(f"{name}: {startupTime:.1f} ms, {status}")
+
+    return 0 if withinBudget else 1
+
+if __name__ == "__main__":
+    sys.exit(checkStartup())